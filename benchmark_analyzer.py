@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the build log analyzer in monitor_and_fix_builds.py
+Generates synthetic GitHub Actions / Xcode job logs and measures the throughput,
+peak memory and per-signature cost of ERROR_PATTERNS matching
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import resource
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from monitor_and_fix_builds import (
+    ERROR_PATTERNS, STATE_DIR, BuildMonitor, GitHubClient, LogMatcher, SignatureEngine, StateStore,
+)
+
+MB = 1024 * 1024
+PLACEMENTS = ('head', 'tail', 'scattered', 'none')
+# Share of the log that 'head' and 'tail' hits are placed in
+EDGE_FRACTION = 0.05
+READ_SIZE = MB
+
+# A realistic line that each signature matches; signatures missing here get their literal text
+HIT_LINES = {
+    "No such module 'Firebase'":
+        "/Users/runner/work/flirtframe-app/flirtframe-app/Sources/Services/FirebaseService.swift:9:8: "
+        "error: No such module 'Firebase'",
+    "Could not find module 'FirebaseCore'":
+        "/Users/runner/work/flirtframe-app/flirtframe-app/Sources/App/FlirtFrameApp.swift:2:8: "
+        "error: Could not find module 'FirebaseCore' for target 'arm64-apple-ios'",
+    "error: no such file or directory: '@/":
+        "clang: error: no such file or directory: '@/Users/runner/work/flirtframe-app/build/Objects.LinkFileList'",
+    "The file .* couldn't be opened because there is no such file":
+        "error: The file “Info.plist” couldn't be opened because there is no such file. "
+        "(in target 'FlirtFrame' from project 'FlirtFrame')",
+    "failed to produce diagnostic for expression":
+        "/Users/runner/work/flirtframe-app/flirtframe-app/Sources/Views/CameraView.swift:142:25: "
+        "error: failed to produce diagnostic for expression; please submit a bug report",
+    "Command PhaseScriptExecution failed":
+        "error: Command PhaseScriptExecution failed with a nonzero exit code",
+    "No account for team":
+        "error: No account for team \"ABCDE12345\". Add a new account in the Accounts preference pane",
+    "error: An empty identity is not valid":
+        "error: An empty identity is not valid when signing a binary for the product type 'Application'. "
+        "(in target 'FlirtFrame' from project 'FlirtFrame')",
+}
+
+NOISE_LINES = [
+    "CompileSwift normal arm64 /Users/runner/work/flirtframe-app/flirtframe-app/Sources/Views/{name}.swift "
+    "(in target 'FlirtFrame' from project 'FlirtFrame')",
+    "    cd /Users/runner/work/flirtframe-app/flirtframe-app",
+    "    /Applications/Xcode_15.2.app/Contents/Developer/Toolchains/XcodeDefault.xctoolchain/usr/bin/swift-frontend "
+    "-frontend -c -primary-file /Users/runner/work/flirtframe-app/flirtframe-app/Sources/Views/{name}.swift "
+    "-emit-module-path /Users/runner/Library/Developer/Xcode/DerivedData/FlirtFrame-{hash}/Build/"
+    "Intermediates.noindex/FlirtFrame.build/Release-iphoneos/FlirtFrame.build/Objects-normal/arm64/{name}.swiftmodule "
+    "-target arm64-apple-ios16.0 -enable-objc-interop -sdk /Applications/Xcode_15.2.app/Contents/Developer/"
+    "Platforms/iPhoneOS.platform/Developer/SDKs/iPhoneOS17.2.sdk -O -module-name FlirtFrame",
+    "SwiftDriverJobDiscovery normal arm64 Compiling {name}.swift (in target 'FlirtFrame' from project 'FlirtFrame')",
+    "/Users/runner/work/flirtframe-app/flirtframe-app/Sources/Views/{name}.swift:{line}:{col}: "
+    "warning: variable 'result' was never mutated; consider changing to 'let' constant",
+    "/Users/runner/work/flirtframe-app/flirtframe-app/Sources/Views/{name}.swift:{line}:{col}: "
+    "note: did you mean to use 'await'?",
+    "Ld /Users/runner/Library/Developer/Xcode/DerivedData/FlirtFrame-{hash}/Build/Products/Release-iphoneos/"
+    "FlirtFrame.app/FlirtFrame normal (in target 'FlirtFrame' from project 'FlirtFrame')",
+    "ProcessInfoPlistFile /Users/runner/Library/Developer/Xcode/DerivedData/FlirtFrame-{hash}/Build/Products/"
+    "Release-iphoneos/FlirtFrame.app/Info.plist /Users/runner/work/flirtframe-app/flirtframe-app/Info.plist",
+    "CodeSign /Users/runner/Library/Developer/Xcode/DerivedData/FlirtFrame-{hash}/Build/Products/Release-iphoneos/"
+    "FlirtFrame.app (in target 'FlirtFrame' from project 'FlirtFrame')",
+    "Copy /Users/runner/Library/Developer/Xcode/DerivedData/FlirtFrame-{hash}/Build/Products/Release-iphoneos/"
+    "{name}.swiftmodule/arm64-apple-ios.swiftdoc",
+    "##[group]Run xcodebuild -project FlirtFrame.xcodeproj -scheme FlirtFrame -configuration Release",
+    "##[endgroup]",
+    "export PATH=/Applications/Xcode_15.2.app/Contents/Developer/usr/bin:/usr/local/bin:/usr/bin:/bin",
+]
+
+VIEW_NAMES = ['CameraView', 'ChatView', 'ProfileView', 'SettingsView', 'MatchListView', 'PaywallView',
+              'OnboardingView', 'SuggestionCard', 'PhotoPicker', 'ConversationStore']
+
+
+def hit_line(pattern: str) -> str:
+    """A log line matched by a signature"""
+    return HIT_LINES.get(pattern) or pattern.replace('.*', ' x ').replace('.+', ' x ')
+
+
+def corpus_path(directory: str, size_mb: float, density: float, placement: str, seed: int) -> str:
+    return os.path.join(directory, f"xcode-{size_mb:g}mb-{placement}-{density:g}per-mb-seed{seed}.log")
+
+
+def write_corpus(path: str, size: int, density: float, placement: str, seed: int = 0,
+                 patterns: Optional[Dict[str, Dict]] = None) -> int:
+    """Write a synthetic timestamped job log of about ``size`` bytes and return the hits placed
+
+    ``density`` is the number of signature hits per MB; they are spread over
+    the first or last EDGE_FRACTION of the log, over all of it ('scattered'),
+    or left out ('none'). Hits cycle through the signature table.
+    """
+    patterns = patterns if patterns is not None else ERROR_PATTERNS
+    rng = random.Random(seed)
+    hits = 0 if placement == 'none' else max(1, round(density * size / MB))
+    if placement == 'head':
+        window = (0, int(size * EDGE_FRACTION))
+    elif placement == 'tail':
+        window = (int(size * (1 - EDGE_FRACTION)), size)
+    else:
+        window = (0, size)
+    targets = sorted(rng.randrange(window[0], max(window[0] + 1, window[1])) for _ in range(hits))
+    signatures = [hit_line(pattern) for pattern in patterns]
+
+    started = datetime(2024, 5, 1, 10, 0, 0, tzinfo=timezone.utc).timestamp()
+    written = placed = 0
+    buffer: List[str] = []
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        while written < size:
+            stamp = datetime.fromtimestamp(started + written / 50000, timezone.utc)
+            prefix = stamp.strftime('%Y-%m-%dT%H:%M:%S') + f".{rng.randrange(10 ** 7):07d}Z "
+            if placed < len(targets) and written >= targets[placed]:
+                text = signatures[placed % len(signatures)]
+                placed += 1
+            else:
+                text = rng.choice(NOISE_LINES).format(
+                    name=rng.choice(VIEW_NAMES), line=rng.randrange(1, 400), col=rng.randrange(1, 80),
+                    hash=''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(28)))
+            line = prefix + text + '\n'
+            buffer.append(line)
+            written += len(line.encode('utf-8'))
+            if len(buffer) >= 4096:
+                f.write(''.join(buffer))
+                buffer.clear()
+        f.write(''.join(buffer))
+    os.replace(path + '.tmp', path)
+    return placed
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (MB if sys.platform == 'darwin' else 1024)
+
+
+def _run_case(path: str, mode: str) -> Dict:
+    """Benchmark process: analyze one corpus file and report time, matches and memory"""
+    rss_before = _peak_rss_mb()
+    size = os.path.getsize(path)
+    if mode == 'stream':
+        # The job log path: bounded-memory chunks through a LogStream
+        matcher = LogMatcher()
+        stream = matcher.stream('benchmark')
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                stream.feed(chunk)
+        stream.close()
+        elapsed = time.perf_counter() - started
+        found = len(matcher.found)
+    else:
+        monitor = BuildMonitor(GitHubClient(), state=StateStore(':memory:'))
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            logs = f.read()
+        started = time.perf_counter()
+        found = len(monitor.analyze_logs(logs))
+        elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 4),
+        'mb_per_s': round(size / MB / elapsed, 2) if elapsed else None,
+        'signatures_found': found,
+        'rss_start_mb': round(rss_before, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def run_case(path: str, mode: str) -> Dict:
+    """Run a case in a fresh interpreter so its peak RSS is its own"""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_run_case, path, mode).result()
+
+
+def pattern_costs(path: str, repeat: int = 3) -> Tuple[Dict[str, Dict], Dict]:
+    """Cost of every signature on its own, and of the whole table, over one corpus"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    size_mb = len(text.encode('utf-8')) / MB
+
+    def best(engine: SignatureEngine) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            engine.scan(text)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    costs = {}
+    for pattern, info in ERROR_PATTERNS.items():
+        seconds = best(SignatureEngine({pattern: info}))
+        costs[pattern] = {'ms': round(seconds * 1000, 2), 'mb_per_s': round(size_mb / seconds, 2)}
+    median = statistics.median(cost['ms'] for cost in costs.values()) or 1e-9
+    for cost in costs.values():
+        cost['relative'] = round(cost['ms'] / median, 2)
+    table = best(SignatureEngine(ERROR_PATTERNS))
+    return costs, {'ms': round(table * 1000, 2), 'mb_per_s': round(size_mb / table, 2)}
+
+
+def find_regressions(results: Dict, baseline: Optional[Dict], threshold: float,
+                     max_pattern_ratio: float) -> List[str]:
+    """Throughput or signature costs worse than the baseline (or than the table median)"""
+    problems = []
+    for pattern, cost in results['patterns'].items():
+        if cost['relative'] > max_pattern_ratio:
+            problems.append(f"signature {pattern!r} costs {cost['relative']}x the median signature "
+                            f"(limit {max_pattern_ratio}x)")
+    if not baseline:
+        return problems
+
+    floor = 1 - threshold
+    old_cases = {case['name']: case for case in baseline.get('cases', [])}
+    for case in results['cases']:
+        old = old_cases.get(case['name'])
+        if old and old.get('mb_per_s') and case['mb_per_s'] < old['mb_per_s'] * floor:
+            problems.append(f"{case['name']}: {case['mb_per_s']} MB/s, baseline {old['mb_per_s']} MB/s")
+    old_patterns = baseline.get('patterns', {})
+    if old_patterns:
+        # A signature new since the baseline must not be slower than the slowest one it had
+        slowest = min(cost['mb_per_s'] for cost in old_patterns.values())
+        for pattern, cost in results['patterns'].items():
+            reference = old_patterns.get(pattern, {}).get('mb_per_s', slowest)
+            if cost['mb_per_s'] < reference * floor:
+                problems.append(f"signature {pattern!r}: {cost['mb_per_s']} MB/s, baseline {reference} MB/s")
+    old_table = baseline.get('table', {}).get('mb_per_s')
+    if old_table and results['table']['mb_per_s'] < old_table * floor:
+        problems.append(f"signature table: {results['table']['mb_per_s']} MB/s, baseline {old_table} MB/s")
+    return problems
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ERROR_PATTERNS matching on synthetic Xcode job logs")
+    parser.add_argument('--sizes', default='1,16,128',
+                        help="comma-separated log sizes in MB, up to 1024 (default: 1,16,128)")
+    parser.add_argument('--placements', default=','.join(PLACEMENTS),
+                        help=f"comma-separated hit placements out of {', '.join(PLACEMENTS)} (default: all)")
+    parser.add_argument('--density', type=float, default=1.0,
+                        help="signature hits per MB of log (default: 1)")
+    parser.add_argument('--modes', default='stream,analyze_logs',
+                        help="stream (job log chunks) and/or analyze_logs (whole text) (default: both)")
+    parser.add_argument('--max-in-memory-mb', type=float, default=256,
+                        help="skip analyze_logs for larger logs, which it holds in memory twice (default: 256)")
+    parser.add_argument('--pattern-sample-mb', type=float, default=16,
+                        help="size of the scattered log used for per-signature costs (default: 16)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus-dir', default=os.path.join(STATE_DIR, 'benchmark'),
+                        help="where generated logs are kept and reused")
+    parser.add_argument('--output', default=os.path.join(STATE_DIR, 'benchmark', 'results.json'),
+                        help="JSON results file")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="earlier results file (from the same host) to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="fail when throughput drops by more than this fraction of the baseline (default: 0.2)")
+    parser.add_argument('--max-pattern-ratio', type=float, default=5.0,
+                        help="fail when one signature costs more than this multiple of the median (default: 5)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.makedirs(args.corpus_dir, exist_ok=True)
+    sizes = [float(size) for size in args.sizes.split(',') if size]
+    placements = [placement for placement in args.placements.split(',') if placement]
+    modes = [mode for mode in args.modes.split(',') if mode]
+    for placement in placements:
+        if placement not in PLACEMENTS:
+            print(f"Unknown placement: {placement}")
+            return 2
+
+    def corpus(size_mb: float, placement: str) -> str:
+        path = corpus_path(args.corpus_dir, size_mb, args.density, placement, args.seed)
+        if not os.path.exists(path):
+            print(f"Generating {path}...")
+            write_corpus(path, int(size_mb * MB), args.density, placement, args.seed)
+        return path
+
+    results: Dict = {
+        'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'density_per_mb': args.density,
+        'signatures': len(ERROR_PATTERNS),
+        'cases': [],
+    }
+    print(f"{'case':<40} {'MB/s':>9} {'seconds':>9} {'peak RSS':>10} {'found':>6}")
+    for size_mb in sizes:
+        for placement in placements:
+            path = corpus(size_mb, placement)
+            for mode in modes:
+                if mode == 'analyze_logs' and size_mb > args.max_in_memory_mb:
+                    continue
+                name = f"{mode}/{size_mb:g}MB/{placement}"
+                case = {'name': name, 'mode': mode, 'size_mb': size_mb, 'placement': placement,
+                        **run_case(path, mode)}
+                results['cases'].append(case)
+                print(f"{name:<40} {case['mb_per_s']:>9} {case['seconds']:>9} "
+                      f"{case['peak_rss_mb']:>8} MB {case['signatures_found']:>6}")
+
+    results['patterns'], results['table'] = pattern_costs(corpus(args.pattern_sample_mb, 'scattered'))
+    print(f"\nSignature costs over {args.pattern_sample_mb:g} MB (whole table: {results['table']['mb_per_s']} MB/s)")
+    for pattern, cost in sorted(results['patterns'].items(), key=lambda item: -item[1]['ms']):
+        print(f"  {cost['ms']:>9} ms {cost['mb_per_s']:>9} MB/s {cost['relative']:>6}x  {pattern}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    results['regressions'] = find_regressions(results, baseline, args.threshold, args.max_pattern_ratio)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if results['regressions']:
+        print("\n❌ Performance regressions:")
+        for problem in results['regressions']:
+            print(f"  {problem}")
+        return 1
+    print("✅ No performance regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
-from huggingface_hub import hf_hub_download, list_repo_files
-import shutil, zipfile, os, pathlib
+from huggingface_hub import list_repo_files
+import pathlib
+from model_cache import ModelCache
+from model_fetch import fetch_all, hf_download, log
 
 MODELS = [
   ("apple/coreml-llava-v1.5-3b", "LLaVA_4b.mlmodelc"),
@@ -9,42 +11,38 @@ MODELS = [
 
 dest = pathlib.Path("Models")
 dest.mkdir(exist_ok=True)
+cache = ModelCache(str(dest / ".cache"))
+
+def fetch(repo, target):
+    """List a repository and download its .mlmodelc zip (runs in the fetch pool)"""
+    # First try to find the right filename
+    files = list_repo_files(repo)
+    zip_files = [f for f in files if f.endswith('.zip') and 'mlmodelc' in f.lower()]
+    
+    if zip_files:
+        filename = zip_files[0]
+        log(f"  {repo}: found {filename}")
+    else:
+        filename = f"{target}.zip"
+        
+    # Multi-GB bundles come down over several ranged connections, once; later runs use the cache
+    return cache.fetch(f"hf:{repo}/{filename}", lambda: hf_download(repo, filename, str(dest / ".downloads")))
+
+# Download everything concurrently, then extract one model at a time
+downloads = fetch_all({target: (lambda repo=repo, target=target: fetch(repo, target))
+                       for repo, target in MODELS})
 
 for repo, target in MODELS:
-    print(f"▶︎ Downloading {repo}")
+    print(f"▶︎ Extracting {repo}")
     try:
-        # First try to find the right filename
-        files = list_repo_files(repo)
-        zip_files = [f for f in files if f.endswith('.zip') and 'mlmodelc' in f.lower()]
-        
-        if zip_files:
-            filename = zip_files[0]
-            print(f"  Found: {filename}")
-        else:
-            filename = f"{target}.zip"
-            
-        zip_path = hf_hub_download(repo, filename=filename, repo_type="model")
+        zip_path, error = downloads[target]
+        if error:
+            raise error
         print(f"  Downloaded to: {zip_path}")
         
-        target_dir = dest / target
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-            
-        with zipfile.ZipFile(zip_path) as z:
-            # Extract to temp dir first
-            temp_dir = dest / f"temp_{target}"
-            z.extractall(temp_dir)
-            
-            # Find the mlmodelc directory
-            mlmodelc_dirs = list(temp_dir.rglob("*.mlmodelc"))
-            if mlmodelc_dirs:
-                # Move the first found mlmodelc to target location
-                shutil.move(str(mlmodelc_dirs[0]), str(target_dir))
-                shutil.rmtree(temp_dir)
-                print(f"  ✓ Extracted to {target}")
-            else:
-                print(f"  ✗ No .mlmodelc found in zip")
-                shutil.rmtree(temp_dir)
+        # The .mlmodelc is extracted into the cache once and linked into Models/
+        count = cache.install_archive(zip_path, str(dest / target))
+        print(f"  ✓ Installed {count} files to {target}")
                 
     except Exception as e:
         print(f"  ✗ Failed: {e}")
@@ -1,5 +1,7 @@
-from huggingface_hub import hf_hub_download, list_repo_files
-import shutil, zipfile, os, pathlib
+from huggingface_hub import list_repo_files
+import os, pathlib
+from model_cache import ModelCache
+from model_fetch import download_file, fetch_all, hf_download, log
 
 # Try public alternatives
 MODELS = [
@@ -10,58 +12,83 @@ MODELS = [
 
 dest = pathlib.Path("Models")
 dest.mkdir(exist_ok=True)
+cache = ModelCache(str(dest / ".cache"))
+downloads_dir = dest / ".downloads"
 
 print("Trying public Core ML models from coreml-community...")
 
+MOBILENET_URL = "https://docs-assets.developer.apple.com/coreml/models/Image/ImageClassification/MobileNetV2/MobileNetV2.mlmodel"
+
+def fetch(repo):
+    """List a repository and download its first Core ML file (runs in the fetch pool)"""
+    # List files in repo
+    files = list_repo_files(repo)
+    log(f"  {repo}: {len(files)} files found")
+    
+    # Look for mlmodel or mlmodelc files
+    ml_files = [f for f in files if '.mlmodel' in f or '.mlmodelc' in f or '.mlpackage' in f]
+    if not ml_files:
+        return None
+    
+    # Download the first suitable file
+    filename = ml_files[0]
+    log(f"  {repo}: downloading {filename}")
+    return filename, cache.fetch(f"hf:{repo}/{filename}", lambda: hf_download(repo, filename, str(downloads_dir)))
+
+def fetch_mobilenet():
+    """Download MobileNetV2 into the cache (runs in the fetch pool)"""
+    path = downloads_dir / "MobileNetV2.mlmodel"
+    downloads_dir.mkdir(exist_ok=True)
+    download_file(MOBILENET_URL, str(path))
+    return str(path)
+
+# Also try downloading from Apple's public models
+mobilenet_path = dest / "MobileNetV2.mlmodel"
+jobs = {repo: (lambda repo=repo: fetch(repo)) for repo, _ in MODELS}
+jobs["MobileNetV2"] = lambda: cache.fetch(MOBILENET_URL, fetch_mobilenet)
+
+# Download everything concurrently, then put the models in place one at a time
+downloads = fetch_all(jobs)
+
 for repo, target in MODELS:
-    print(f"\n▶︎ Trying {repo}")
+    print(f"\n▶︎ Installing {repo}")
     try:
-        # List files in repo
-        files = list_repo_files(repo)
-        print(f"  Files found: {len(files)}")
-        
-        # Look for mlmodel or mlmodelc files
-        ml_files = [f for f in files if '.mlmodel' in f or '.mlmodelc' in f or '.mlpackage' in f]
+        found, error = downloads[repo]
+        if error:
+            raise error
         
-        if ml_files:
-            # Download the first suitable file
-            filename = ml_files[0]
-            print(f"  Downloading: {filename}")
-            
-            file_path = hf_hub_download(repo, filename=filename, repo_type="model")
+        if found:
+            filename, file_path = found
             print(f"  Downloaded to: {file_path}")
             
             target_dir = dest / target
-            if target_dir.exists():
-                shutil.rmtree(target_dir)
-            target_dir.mkdir()
             
             # Copy or extract based on file type
             if filename.endswith('.zip'):
-                with zipfile.ZipFile(file_path) as z:
-                    z.extractall(target_dir)
+                # Archives without a .mlmodelc directory are taken whole, as before
+                cache.install_archive(file_path, str(target_dir), whole_archive=True)
             else:
-                # For .mlmodel files, create a simple mlmodelc structure
-                shutil.copy(file_path, target_dir / "model.mlmodel")
+                # For .mlmodel files, create a simple mlmodelc structure linked to the cached file
+                manifest = {'files': {"model.mlmodel": os.path.basename(file_path)}}
+                cache.link_tree(manifest, str(target_dir))
                 
             print(f"  ✓ Saved to {target}")
             
     except Exception as e:
         print(f"  ✗ Failed: {e}")
 
-# Also try downloading from Apple's public models
-print("\n▶︎ Downloading MobileNetV2 from Apple...")
-try:
-    import urllib.request
-    url = "https://docs-assets.developer.apple.com/coreml/models/Image/ImageClassification/MobileNetV2/MobileNetV2.mlmodel"
-    mobilenet_path = dest / "MobileNetV2.mlmodel"
-    urllib.request.urlretrieve(url, mobilenet_path)
+print("\n▶︎ MobileNetV2 from Apple...")
+mobilenet_blob, error = downloads["MobileNetV2"]
+if error:
+    print(f"  ✗ Failed: {error}")
+else:
+    cache.link_file(os.path.basename(mobilenet_blob), str(mobilenet_path))
     print("  ✓ Downloaded MobileNetV2.mlmodel")
-except Exception as e:
-    print(f"  ✗ Failed: {e}")
 
 print("\n✅  Final Models directory contents:")
 for item in sorted(dest.iterdir()):
+    if item.name.startswith('.'):
+        continue
     size = ""
     if item.is_file():
         size = f" ({item.stat().st_size / 1024 / 1024:.1f} MB)"
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+Local fake GitHub Actions API for offline end-to-end tests of the build monitor
+Replays recorded cassettes or serves synthetic run histories, with injectable
+latency, 304 responses and rate limits
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import http.server
+import statistics
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+from benchmark_analyzer import NOISE_LINES, VIEW_NAMES, hit_line
+from monitor_and_fix_builds import (
+    ERROR_PATTERNS, REPO_NAME, REPO_OWNER, BuildMonitor, GitHubClient, PollScheduler, ResponseCache, StateStore,
+)
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+BLOB_PREFIX = '/_blobs/'
+
+
+def iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def json_response(data: Any, status: int = 200) -> Response:
+    return status, {'Content-Type': 'application/json; charset=utf-8'}, json.dumps(data).encode('utf-8')
+
+
+class Cassette:
+    """Recorded HTTP interactions, replayed in recording order per request
+
+    Stored as JSON: ``{"version": 1, "meta": {...}, "interactions": [...]}``
+    where every interaction has ``method``, ``path`` (path and query on the
+    API host, or a /_blobs/ path for redirected log downloads), ``status``,
+    ``headers``, ``body`` and the body ``encoding`` (utf-8 or base64).
+    Repeated requests for the same path get its recorded answers in order,
+    the last one repeating; a path recorded with a different query is used
+    when there is no exact match.
+    """
+
+    VERSION = 1
+    KEPT_HEADERS = ('Content-Type', 'Location', 'Link')
+
+    def __init__(self, interactions: Optional[List[Dict]] = None, meta: Optional[Dict] = None):
+        self.interactions: List[Dict] = interactions or []
+        self.meta: Dict = meta or {}
+        self._served: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"unsupported cassette version: {data.get('version')}")
+        return cls(data.get('interactions', []), data.get('meta', {}))
+
+    def save(self, path: str):
+        with self._lock:
+            data = {'version': self.VERSION, 'meta': self.meta, 'interactions': list(self.interactions)}
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+
+    def add(self, method: str, path: str, status: int, headers: Dict[str, str], body: bytes):
+        try:
+            text, encoding = body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        kept = {name: value for name, value in headers.items() if name.title() in self.KEPT_HEADERS}
+        with self._lock:
+            self.interactions.append({
+                'method': method, 'path': path, 'status': status, 'headers': kept,
+                'body': text, 'encoding': encoding, 'recorded_at': iso(time.time()),
+            })
+
+    def workflows(self) -> List[str]:
+        """Workflow file names that appear in recorded requests"""
+        names = set()
+        for interaction in self.interactions:
+            parts = urlsplit(interaction['path']).path.split('/actions/workflows/')
+            if len(parts) == 2:
+                names.add(parts[1].split('/')[0])
+        return sorted(names)
+
+    def respond(self, method: str, path: str, headers: Dict[str, str]) -> Optional[Response]:
+        route = urlsplit(path).path
+        exact = [i for i in self.interactions if i['method'] == method and i['path'] == path]
+        candidates = exact or [i for i in self.interactions
+                               if i['method'] == method and urlsplit(i['path']).path == route]
+        if not candidates:
+            return None
+        key = (method, path if exact else route)
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        interaction = candidates[min(served, len(candidates) - 1)]
+        body = interaction['body'].encode('utf-8') if interaction['encoding'] == 'utf-8' \
+            else base64.b64decode(interaction['body'])
+        return interaction['status'], dict(interaction['headers']), body
+
+
+class SyntheticHistory:
+    """Workflow runs generated from the wall clock for a fake repository
+
+    A new run starts every ``run_interval`` seconds, cycling through the
+    workflows; it is queued for ``queue_time`` seconds, in progress for
+    ``run_duration`` seconds and then completes, failing with probability
+    ``failure_rate``. ``history`` runs already completed before the server
+    started. Failed runs have a failed build job whose timestamped Xcode log
+    (about ``log_size`` bytes) holds a known signature in its failing step,
+    or with probability ``unknown_rate`` an error no signature matches.
+    """
+
+    def __init__(self, owner: str = REPO_OWNER, repo: str = REPO_NAME,
+                 workflows: Tuple[str, ...] = ('build-flirtframe-app.yml',),
+                 run_interval: float = 30.0, queue_time: float = 2.0, run_duration: float = 10.0,
+                 failure_rate: float = 0.5, unknown_rate: float = 0.1, log_size: int = 256 * 1024,
+                 history: int = 10, seed: int = 0, started: Optional[float] = None):
+        self.owner = owner
+        self.repo = repo
+        self.workflows = list(workflows)
+        self.run_interval = run_interval
+        self.queue_time = queue_time
+        self.run_duration = run_duration
+        self.failure_rate = failure_rate
+        self.unknown_rate = unknown_rate
+        self.log_size = log_size
+        self.history = history
+        self.seed = seed
+        self.started = time.time() if started is None else started
+        self._logs: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+    # Run k starts at started + k * run_interval; k < 0 are the pre-existing history
+    def _index(self, run_id: int) -> int:
+        return run_id - 1000 - self.history
+
+    def _run_id(self, index: int) -> int:
+        return index + 1000 + self.history
+
+    def created(self, index: int) -> float:
+        return self.started + index * self.run_interval
+
+    def completed_at(self, run_id: int) -> float:
+        """Wall-clock time a run completed (or will complete)"""
+        return self.created(self._index(run_id)) + self.queue_time + self.run_duration
+
+    def failed(self, index: int) -> bool:
+        return random.Random(f"{self.seed}-{index}").random() < self.failure_rate
+
+    def run(self, index: int, now: float) -> Optional[Dict]:
+        created = self.created(index)
+        if index < -self.history or created > now:
+            return None
+        started = created + self.queue_time
+        completed = started + self.run_duration
+        workflow = self.workflows[index % len(self.workflows)]
+        run_id = self._run_id(index)
+        run = {
+            'id': run_id,
+            'name': workflow.rsplit('.', 1)[0],
+            'path': f".github/workflows/{workflow}",
+            'head_branch': 'main',
+            'event': 'push',
+            'run_number': index + self.history + 1,
+            'run_attempt': 1,
+            'created_at': iso(created),
+            'run_started_at': iso(started),
+            # Changes only on status transitions, like the real field
+            'updated_at': iso(created if now < started else started if now < completed else completed),
+            'status': 'queued' if now < started else 'in_progress' if now < completed else 'completed',
+            'conclusion': None,
+            'html_url': f"https://github.com/{self.owner}/{self.repo}/actions/runs/{run_id}",
+        }
+        if now >= completed:
+            run['conclusion'] = 'failure' if self.failed(index) else 'success'
+        return run
+
+    def runs(self, now: float, workflow: Optional[str] = None) -> List[Dict]:
+        """Visible runs, newest first"""
+        newest = int((now - self.started) // self.run_interval)
+        runs = [self.run(index, now) for index in range(newest, -self.history - 1, -1)]
+        return [run for run in runs if run and (workflow is None or run['path'].endswith('/' + workflow))]
+
+    def jobs(self, run: Dict, now: float) -> List[Dict]:
+        index = self._index(run['id'])
+        started = self.created(index) + self.queue_time
+        if now < started:
+            return []
+        completed = started + self.run_duration
+        done = now >= completed
+        jobs = []
+        for offset, name in enumerate(('lint', 'build')):
+            job_id = run['id'] * 10 + offset
+            failing = done and name == 'build' and run['conclusion'] == 'failure'
+            steps = [
+                {'name': 'Set up job', 'number': 1, 'status': 'completed', 'conclusion': 'success',
+                 'started_at': iso(started), 'completed_at': iso(started + 1)},
+                {'name': 'Build', 'number': 2, 'status': 'completed' if done else 'in_progress',
+                 'conclusion': ('failure' if failing else 'success') if done else None,
+                 'started_at': iso(started + 1), 'completed_at': iso(completed - 1) if done else None},
+                {'name': 'Complete job', 'number': 3, 'status': 'completed' if done else 'queued',
+                 'conclusion': 'success' if done else None,
+                 'started_at': iso(completed - 1) if done else None, 'completed_at': iso(completed) if done else None},
+            ]
+            jobs.append({
+                'id': job_id,
+                'run_id': run['id'],
+                'name': name,
+                'status': 'completed' if done else 'in_progress',
+                'conclusion': ('failure' if failing else 'success') if done else None,
+                'started_at': iso(started),
+                'completed_at': iso(completed) if done else None,
+                'steps': steps,
+            })
+        return jobs
+
+    def log(self, job_id: int) -> bytes:
+        """Deterministic job log with timestamps matching the job's steps"""
+        with self._lock:
+            if job_id in self._logs:
+                return self._logs[job_id]
+        run_id, offset = divmod(job_id, 10)
+        index = self._index(run_id)
+        rng = random.Random(f"{self.seed}-log-{job_id}")
+        started = self.created(index) + self.queue_time
+        failing = offset == 1 and self.failed(index)
+        lines = []
+        size = 0
+        while size < self.log_size:
+            # Timestamps advance through the Build step (second 1 to run_duration - 1)
+            moment = started + 1 + (self.run_duration - 2) * size / self.log_size
+            stamp = datetime.fromtimestamp(moment, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+            text = rng.choice(NOISE_LINES).format(
+                name=rng.choice(VIEW_NAMES), line=rng.randrange(1, 400), col=rng.randrange(1, 80),
+                hash=''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(28)))
+            line = f"{stamp}.{rng.randrange(10 ** 7):07d}Z {text}\n"
+            lines.append(line)
+            size += len(line)
+        if failing:
+            stamp = iso(started + self.run_duration - 1.5)[:-1]
+            if rng.random() < self.unknown_rate:
+                error = "error: linker command failed with exit code 1 (use -v to see invocation)"
+            else:
+                error = hit_line(rng.choice(list(ERROR_PATTERNS)))
+            lines.append(f"{stamp}.0000000Z {error}\n")
+            lines.append(f"{stamp}.0000001Z ** BUILD FAILED **\n")
+            lines.append(f"{stamp}.0000002Z ##[error]Process completed with exit code 65.\n")
+        body = ''.join(lines).encode('utf-8')
+        with self._lock:
+            self._logs[job_id] = body
+            if len(self._logs) > 256:
+                self._logs.pop(next(iter(self._logs)))
+        return body
+
+    def respond(self, method: str, path: str, headers: Dict[str, str]) -> Optional[Response]:
+        now = time.time()
+        parts = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        route = parts.path
+        if path.startswith(BLOB_PREFIX + 'logs/'):
+            return 200, {'Content-Type': 'text/plain; charset=utf-8'}, self.log(int(route.rsplit('/', 1)[1]))
+
+        prefix = f"/repos/{self.owner}/{self.repo}/actions/"
+        if method != 'GET' or not route.startswith(prefix):
+            return None
+        rest = route[len(prefix):].strip('/').split('/')
+        if rest[0] == 'workflows' and len(rest) == 3 and rest[2] == 'runs':
+            return self._page(self.runs(now, rest[1]), query)
+        if rest == ['runs']:
+            runs = self.runs(now)
+            created = query.get('created', '')
+            if created.startswith('>='):
+                runs = [run for run in runs if run['created_at'] >= created[2:]]
+            elif '..' in created:
+                first, last = created.split('..', 1)
+                runs = [run for run in runs if first <= run['created_at'] <= last]
+            if query.get('status'):
+                runs = [run for run in runs if query['status'] in (run['status'], run['conclusion'])]
+            return self._page(runs, query)
+        if rest[0] == 'runs' and len(rest) >= 2 and rest[1].isdigit():
+            run = self.run(self._index(int(rest[1])), now)
+            if run is None:
+                return json_response({'message': 'Not Found'}, 404)
+            if len(rest) == 2:
+                return json_response(run)
+            if rest[2:] == ['jobs']:
+                jobs = self.jobs(run, now)
+                return json_response({'total_count': len(jobs), 'jobs': jobs})
+        if rest[0] == 'jobs' and len(rest) == 3 and rest[2] == 'logs' and rest[1].isdigit():
+            job_id = int(rest[1])
+            run = self.run(self._index(job_id // 10), now)
+            if run is None or run['status'] != 'completed':
+                return json_response({'message': 'Not Found'}, 404)
+            return 302, {'Location': f"{BLOB_PREFIX}logs/{job_id}"}, b''
+        return json_response({'message': 'Not Found'}, 404)
+
+    @staticmethod
+    def _page(runs: List[Dict], query: Dict[str, str]) -> Response:
+        per_page = min(100, int(query.get('per_page', 30)))
+        page = max(1, int(query.get('page', 1)))
+        return json_response({'total_count': len(runs),
+                              'workflow_runs': runs[(page - 1) * per_page:page * per_page]})
+
+
+class UpstreamRecorder:
+    """Forwards requests to the real API and records every answer into a cassette
+
+    Log downloads are redirected by GitHub to short-lived storage URLs; those
+    are fetched here and served from a /_blobs/ path instead, so replays need
+    no network. Conditional headers are not forwarded, so every recorded
+    answer has a body; the fake server produces 304s itself.
+    """
+
+    def __init__(self, upstream: str, cassette: Cassette, timeout: float = 60.0):
+        self.upstream = upstream.rstrip('/')
+        self.cassette = cassette
+        self.timeout = timeout
+
+        class NoRedirect(urllib.request.HTTPRedirectHandler):
+            def redirect_request(self, *args, **kwargs):
+                return None
+
+        self._opener = urllib.request.build_opener(NoRedirect)
+
+    def _fetch(self, url: str, headers: Dict[str, str], follow: bool) -> Response:
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            opener = urllib.request.urlopen if follow else self._opener.open
+            with opener(request, timeout=self.timeout) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    def respond(self, method: str, path: str, headers: Dict[str, str]) -> Optional[Response]:
+        if path.startswith(BLOB_PREFIX):
+            # Fetched and recorded with the redirect that points here
+            return self.cassette.respond(method, path, headers)
+        if method != 'GET':
+            return None
+        forwarded = {name: value for name, value in headers.items()
+                     if name.lower() in ('authorization', 'accept', 'user-agent', 'x-github-api-version')}
+        status, response_headers, body = self._fetch(self.upstream + path, forwarded, follow=False)
+        location = response_headers.get('Location')
+        if 300 <= status < 400 and location:
+            # Storage URLs are pre-signed: fetch without the API token
+            blob = BLOB_PREFIX + hashlib.sha1(path.encode('utf-8')).hexdigest()
+            blob_status, blob_headers, blob_body = self._fetch(urljoin(self.upstream + path, location), {},
+                                                               follow=True)
+            self.cassette.add('GET', blob, blob_status, blob_headers, blob_body)
+            response_headers = {'Location': blob}
+            body = b''
+        self.cassette.add(method, path, status, response_headers, body)
+        passed = {name: value for name, value in response_headers.items()
+                  if name.title() in Cassette.KEPT_HEADERS or name.lower().startswith('x-ratelimit-')}
+        return status, passed, body
+
+
+class QuietHTTPServer(http.server.ThreadingHTTPServer):
+    """Threading HTTP server that does not print a traceback for every client that hangs up"""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeGitHubServer:
+    """HTTP server in front of a cassette, synthetic history or recorder
+
+    Every API answer gets an ETag, and a request whose If-None-Match matches
+    it is answered 304 without counting against the rate limit, as GitHub
+    does; ``not_modified_rate`` additionally answers that share of
+    conditional requests 304 even though the content changed, as a stale
+    edge cache would. API requests are limited to ``rate_limit`` per
+    ``rate_window`` seconds (0 disables) with X-RateLimit-* headers and 403
+    answers once exhausted. Every answer is delayed by ``latency`` seconds
+    plus up to ``jitter`` seconds. Log blobs honour Range requests.
+    """
+
+    def __init__(self, source: Any, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, rate_limit: int = 5000,
+                 rate_window: float = 3600.0, not_modified_rate: float = 0.0, seed: int = 0):
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.not_modified_rate = not_modified_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_reset = time.time() + rate_window
+        self._used = 0
+        self.stats = {'requests': 0, 'api_requests': 0, 'not_modified': 0, 'injected_not_modified': 0,
+                      'rate_limited': 0, 'bytes_sent': 0}
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = server.handle('GET', self.path, dict(self.headers))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (ConnectionResetError, BrokenPipeError):
+                    # The monitor closes log streams early once it has what it needs
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = QuietHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host = self.server.server_address[0]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='fake-github').start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _rate_headers(self) -> Dict[str, str]:
+        return {'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Remaining': str(max(0, self.rate_limit - self._used)),
+                'X-RateLimit-Reset': str(int(self._window_reset)),
+                'X-RateLimit-Used': str(self._used)}
+
+    def handle(self, method: str, path: str, headers: Dict[str, str]) -> Response:
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        headers = {name.lower(): value for name, value in headers.items()}
+        with self._lock:
+            self.stats['requests'] += 1
+        if path.startswith(BLOB_PREFIX):
+            return self._count(self._blob(method, path, headers))
+
+        with self._lock:
+            self.stats['api_requests'] += 1
+            now = time.time()
+            if now >= self._window_reset:
+                self._window_reset = now + self.rate_window
+                self._used = 0
+            limited = bool(self.rate_limit) and self._used >= self.rate_limit
+            if limited:
+                self.stats['rate_limited'] += 1
+                rate = self._rate_headers()
+        if limited:
+            status, response_headers, body = json_response(
+                {'message': 'API rate limit exceeded', 'documentation_url': 'https://docs.github.com/rest'}, 403)
+            return self._count((status, {**response_headers, **rate}, body))
+
+        answer = self.source.respond(method, path, headers)
+        status, response_headers, body = answer or json_response({'message': 'Not Found'}, 404)
+        response_headers = dict(response_headers)
+        conditional = headers.get('if-none-match')
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            response_headers['ETag'] = etag
+            if conditional == etag or (conditional and self._random.random() < self.not_modified_rate):
+                with self._lock:
+                    self.stats['not_modified'] += 1
+                    if conditional != etag:
+                        self.stats['injected_not_modified'] += 1
+                    rate = self._rate_headers() if self.rate_limit else {}
+                etag_header = {'ETag': conditional if conditional != etag else etag}
+                return self._count((304, {**etag_header, **rate}, b''))
+        with self._lock:
+            self._used += 1
+            if self.rate_limit:
+                response_headers.update(self._rate_headers())
+        return self._count((status, response_headers, body))
+
+    def _blob(self, method: str, path: str, headers: Dict[str, str]) -> Response:
+        answer = self.source.respond(method, path, headers)
+        if answer is None:
+            return json_response({'message': 'Not Found'}, 404)
+        status, response_headers, body = answer
+        # Like GitHub's blob storage, a Range header that does not parse is ignored
+        match = re.match(r'bytes=(\d*)-(\d*)$', headers.get('range', ''))
+        if status != 200 or not match:
+            return answer
+        size = len(body)
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:
+            start, end = max(0, size - int(match.group(2) or 0)), size - 1
+        if start >= size or start > end:
+            return 416, {'Content-Range': f"bytes */{size}"}, b''
+        return 206, {**response_headers, 'Content-Range': f"bytes {start}-{end}/{size}"}, body[start:end + 1]
+
+    def _count(self, response: Response) -> Response:
+        with self._lock:
+            self.stats['bytes_sent'] += len(response[2])
+        return response
+
+
+def build_source(args: argparse.Namespace) -> Any:
+    if args.cassette:
+        return Cassette.load(args.cassette)
+    return SyntheticHistory(args.owner, args.repo, tuple(args.workflows.split(',')),
+                            run_interval=args.run_interval, run_duration=args.run_duration,
+                            failure_rate=args.failure_rate, log_size=int(args.log_kb * 1024),
+                            history=args.history, seed=args.seed)
+
+
+def build_server(args: argparse.Namespace, source: Any) -> FakeGitHubServer:
+    return FakeGitHubServer(source, args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                            rate_limit=args.rate_limit, rate_window=args.rate_window,
+                            not_modified_rate=args.not_modified_rate, seed=args.seed)
+
+
+def run_bench(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the monitor for a bounded number of cycles against a fake server and report what it cost"""
+    source = build_source(args)
+    server = build_server(args, source)
+    server.start()
+    workflows = source.workflows() if isinstance(source, Cassette) else source.workflows
+    owner, repo = (source.meta.get('repository') or f"{args.owner}/{args.repo}").split('/', 1) \
+        if isinstance(source, Cassette) else (source.owner, source.repo)
+    started = time.time()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='fake-github-bench-') as workdir:
+        # The monitor discovers workflows and writes fixes relative to the working directory
+        os.makedirs(os.path.join(workdir, '.github', 'workflows'))
+        for workflow in workflows:
+            with open(os.path.join(workdir, '.github', 'workflows', workflow), 'w') as f:
+                f.write(f"name: {workflow}\n")
+        os.chdir(workdir)
+        try:
+            client = GitHubClient('fake-token', server.url, owner, repo,
+                                  cache=ResponseCache(os.path.join(workdir, 'http_cache.json')))
+            scheduler = PollScheduler(args.interval, args.interval, args.interval, jitter=0.0)
+            monitor = BuildMonitor(client, max_workers=args.concurrency, scheduler=scheduler,
+                                   state=StateStore(os.path.join(workdir, 'monitor.db')), dry_run=True)
+            monitor.focus_failed_steps = not args.full_scan
+            monitor.monitor_and_fix(repo_wide=args.repo_wide, max_cycles=args.cycles)
+            report = monitor.run_report()
+        finally:
+            os.chdir(cwd)
+            server.stop()
+
+    detections = report['detections']
+    if isinstance(source, SyntheticHistory):
+        # The server knows exact completion times; updated_at only has whole seconds
+        for detection in detections:
+            detection['latency'] = detection['detected_at'] - source.completed_at(detection['run_id'])
+        detected = {detection['run_id'] for detection in detections}
+        failed = [run for run in source.runs(time.time())
+                  if run['conclusion'] == 'failure' and source.completed_at(run['id']) >= started]
+        report['missed_runs'] = sorted(run['id'] for run in failed if run['id'] not in detected)
+    # Failures that were already there when monitoring started say nothing about latency
+    fresh = [d['latency'] for d in detections if d['latency'] is not None and d['detected_at'] - d['latency'] >= started]
+    if fresh:
+        report['detection_latency'] = {'mean': statistics.mean(fresh), 'median': statistics.median(fresh),
+                                       'max': max(fresh), 'runs': len(fresh)}
+    report['server'] = server.stats
+    report['elapsed'] = time.time() - started
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake GitHub Actions API for offline build monitor tests")
+    parser.add_argument('command', choices=('serve', 'record', 'bench'),
+                        help="serve a cassette or synthetic history, record a cassette through a proxy, "
+                             "or run the monitor for --cycles cycles against a fake server")
+    parser.add_argument('--cassette', metavar='PATH',
+                        help="cassette to replay (serve/bench) or to write (record)")
+    parser.add_argument('--upstream', default='https://api.github.com', help="API to record from")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help="listen port (default: any free port)")
+    parser.add_argument('--latency', type=float, default=0.0, help="added latency per request in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency of up to this many ms")
+    parser.add_argument('--rate-limit', type=int, default=5000,
+                        help="API requests allowed per window, 0 for no limit (default: 5000)")
+    parser.add_argument('--rate-window', type=float, default=3600.0, help="rate limit window in seconds")
+    parser.add_argument('--not-modified-rate', type=float, default=0.0,
+                        help="share of conditional requests answered 304 even when content changed")
+    parser.add_argument('--owner', default=REPO_OWNER)
+    parser.add_argument('--repo', default=REPO_NAME)
+    parser.add_argument('--workflows', default='build-flirtframe-app.yml',
+                        help="comma-separated workflow files of the synthetic history")
+    parser.add_argument('--run-interval', type=float, default=30.0, help="seconds between synthetic runs")
+    parser.add_argument('--run-duration', type=float, default=10.0, help="seconds a synthetic run takes")
+    parser.add_argument('--failure-rate', type=float, default=0.5)
+    parser.add_argument('--log-kb', type=float, default=256, help="size of synthetic job logs in KB")
+    parser.add_argument('--history', type=int, default=10, help="synthetic runs completed before start")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cycles', type=int, default=10, help="monitor cycles for bench (default: 10)")
+    parser.add_argument('--interval', type=float, default=5.0, help="bench poll interval in seconds")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repo-wide', action='store_true')
+    parser.add_argument('--full-scan', action='store_true')
+    parser.add_argument('--output', metavar='PATH', help="write the bench report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.command == 'bench':
+        report = run_bench(args)
+        print(f"\n📊 {report['cycles']} cycle(s) in {report['elapsed']:.1f}s: {report['api_calls']} API call(s), "
+              f"{report['bytes_received'] / 1048576:.2f} MB received, "
+              f"{report['server']['not_modified']} not modified, {report['server']['rate_limited']} rate limited")
+        for detection in report['detections']:
+            latency = f"{detection['latency']:.1f}s" if detection['latency'] is not None else "unknown time"
+            print(f"   run {detection['run_id']}: detected {latency} after completion, "
+                  f"{detection['api_calls']} call(s), {detection['bytes'] / 1024:.0f} KB, "
+                  f"errors: {', '.join(detection['errors']) or 'none known'}")
+        if report.get('missed_runs'):
+            print(f"   missed failed runs: {', '.join(map(str, report['missed_runs']))}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        return 0
+
+    if args.command == 'record':
+        if not args.cassette:
+            print("record needs --cassette")
+            return 2
+        cassette = Cassette(meta={'repository': f"{args.owner}/{args.repo}", 'upstream': args.upstream,
+                                  'recorded_at': iso(time.time())})
+        server = FakeGitHubServer(UpstreamRecorder(args.upstream, cassette), args.host, args.port, rate_limit=0)
+    else:
+        server = build_server(args, build_source(args))
+    server.start()
+    print(f"Fake GitHub API on {server.url} (run the monitor with GITHUB_API_URL={server.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if args.command == 'record':
+            cassette.save(args.cassette)
+            print(f"Recorded {len(cassette.interactions)} interaction(s) to {args.cassette}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
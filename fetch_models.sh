@@ -11,6 +11,8 @@ mkdir -p Models
 cd Models
 DEST_DIR=$(pwd)
 export DEST_DIR
+SCRIPT_DIR=$(dirname "$DEST_DIR")
+export SCRIPT_DIR
 cd /tmp
 
 echo "▶︎ Installing python deps (huggingface_hub)"
@@ -32,9 +34,27 @@ except ImportError:
 
 dest_dir = os.environ.get("DEST_DIR", "./Models")
 
+# Prefer the segmented downloader and shared model cache next to this script;
+# hf_hub_download otherwise
+sys.path.insert(0, os.environ.get("SCRIPT_DIR", "."))
+try:
+    from model_cache import ModelCache
+    from model_fetch import hf_download
+    cache = ModelCache(os.path.join(dest_dir, ".cache"))
+except ImportError:
+    cache = None
+
 def download_model(repo_id, filename, local_name):
     try:
         print(f"▶︎ Downloading {repo_id}/{filename}")
+        if cache and filename.endswith('.zip'):
+            # Extracted into the cache once, linked into Models/
+            zip_path = cache.fetch(f"hf:{repo_id}/{filename}",
+                                   lambda: hf_download(repo_id, filename, os.path.join(dest_dir, ".downloads")))
+            cache.install_archive(zip_path, os.path.join(dest_dir, local_name))
+            print(f"  ✔︎ Extracted to {local_name}")
+            return True
+
         path = hf_hub_download(repo_id=repo_id, filename=filename)
         
         # If it's a zip file, extract it
@@ -116,7 +136,7 @@ ls -lh "$DEST_DIR"
 ############################################
 cd "$DEST_DIR/.."
 if command -v zip >/dev/null 2>&1; then
-    zip -r checkpoint-models.zip Models
+    zip -r checkpoint-models.zip Models -x 'Models/.downloads/*' 'Models/.cache/*'
     echo "📦 checkpoint-models.zip written"
 else
     echo "⚠️  zip command not found, skipping checkpoint"
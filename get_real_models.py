@@ -3,31 +3,38 @@
 Alternative: Download pre-converted Core ML models from various sources
 """
 import os
-import requests
-import zipfile
 import shutil
 from pathlib import Path
+from model_cache import ModelCache
+from model_fetch import DownloadError, download_file as fetch_file, load_checksums, save_checksums
+
+# sha256sum-style manifest; files listed here are verified, new ones are recorded
+CHECKSUMS_FILE = "Models/checksums.sha256"
 
 def download_file(url, filename):
-    """Download a file with progress indicator"""
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(filename, 'wb') as f:
-        downloaded = 0
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    percent = (downloaded / total_size) * 100
-                    print(f"\rDownloading {filename}: {percent:.1f}%", end='')
-    print()
+    """Download a file into the model cache with resume and SHA-256 verification, then link it to filename"""
+    checksums = load_checksums(CHECKSUMS_FILE)
+    name = os.path.basename(filename)
+
+    def fetch():
+        part = os.path.join("Models", ".downloads", name)
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        fetch_file(url, part, sha256=checksums.get(name))
+        return part
+
+    digest = os.path.basename(cache.fetch(url, fetch))
+    if checksums.get(name, digest) != digest:
+        raise DownloadError(f"{name}: cached SHA-256 {digest} does not match {checksums[name]}")
+    cache.link_file(digest, filename)
+    if name not in checksums:
+        checksums[name] = digest
+        save_checksums(CHECKSUMS_FILE, checksums)
 
 print("🔍 Searching for pre-converted Core ML models...\n")
 
 models_dir = Path("Models")
 models_dir.mkdir(exist_ok=True)
+cache = ModelCache(str(models_dir / ".cache"))
 
 # Option 1: Try to get CLIP model (vision-language)
 print("1. Downloading CLIP vision model...")
@@ -65,7 +72,9 @@ for mlmodel in models_dir.glob("*.mlmodel"):
     mlmodelc_name = mlmodel.stem + ".mlmodelc"
     mlmodelc_path = models_dir / mlmodelc_name
     mlmodelc_path.mkdir(exist_ok=True)
-    shutil.copy(mlmodel, mlmodelc_path / "model.mlmodel")
+    # Linked to the cached blob rather than copied; files from other scripts are added first
+    digest = cache.put(str(mlmodel), move=False)
+    cache.link_file(digest, str(mlmodelc_path / "model.mlmodel"))
     print(f"✓ Created {mlmodelc_name}")
 
 # Rename to match expected names
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Content-addressed model cache shared by the model fetch scripts
+Downloads and extracted .mlmodelc trees are stored once by SHA-256;
+Models/<name>.mlmodelc is assembled from reflinks, hardlinks or copies of it
+"""
+
+import os
+import sys
+import json
+import atexit
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model_fetch import extract_mlmodelc, file_sha256, replace_directory
+
+CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "Models/.cache")
+CACHE_MAX_BYTES = int(float(os.environ.get("MODEL_CACHE_MAX_GB", "20")) * 1024 ** 3)
+# MODEL_CACHE_HARDLINKS=0 installs copies where reflinks are unavailable, keeping the cache immutable
+CACHE_HARDLINKS = os.environ.get("MODEL_CACHE_HARDLINKS", "1") != "0"
+
+# Linux ioctl for a copy-on-write clone of a whole file (btrfs, xfs)
+FICLONE = 0x40049409
+# (source device, destination device) pairs a reflink already failed on
+_no_reflink = set()
+
+
+def _reflink(source: str, destination: str):
+    """Copy-on-write clone of source, raising OSError where the filesystem cannot do it"""
+    if sys.platform == 'darwin':
+        # APFS clonefile through cp
+        result = subprocess.run(['cp', '-c', source, destination], capture_output=True)
+        if result.returncode != 0:
+            raise OSError(result.stderr.decode('utf-8', 'replace').strip() or "cp -c failed")
+        return
+    import fcntl
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+
+
+def link_or_copy(source: str, destination: str, hardlink: bool = True) -> str:
+    """Reflink source to destination, else hardlink it (if allowed), else copy it
+
+    Returns the method used. A reflink shares disk blocks but not the
+    inode, so writing to either file never changes the other; a hardlink
+    is the same file under two names.
+    """
+    devices = (os.stat(source).st_dev, os.stat(os.path.dirname(os.path.abspath(destination))).st_dev)
+    if devices not in _no_reflink:
+        try:
+            _reflink(source, destination)
+            return 'reflink'
+        except (OSError, ImportError):
+            _no_reflink.add(devices)
+    if hardlink:
+        try:
+            os.link(source, destination)
+            return 'hardlink'
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+    return 'copy'
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ModelCache:
+    """Content-addressed store of model files with least-recently-used eviction
+
+    Every file lives once under ``blobs/<aa>/<sha256>``, read-only. Keys
+    (a URL, ``hf:<repo>/<file>``, or ``tree:<archive digest>``) name a
+    blob; a tree key names a JSON manifest blob listing the files of an
+    extracted .mlmodelc. Installing a model links those blobs into place,
+    so the same bytes are never written twice. The store is trimmed to
+    ``max_bytes`` by deleting the least recently used blobs that nothing
+    outside the cache links to; blobs still linked from Models/ would
+    free no space and are kept.
+
+    Every blob this object hands out (from put, get, fetch or tree) is
+    pinned for the calling process until ``release`` or exit, so another
+    fetcher's trim cannot delete it between download and install.
+
+    Installed files are reflinks where the filesystem supports them and
+    hardlinks otherwise. A hardlinked file *is* the cache blob: it is
+    read-only, and anything that forces a write into it (root, or a chmod
+    first) changes the cached copy for every model using it. Set
+    ``hardlinks`` off (MODEL_CACHE_HARDLINKS=0) to get copies instead.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blobs (
+        digest TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        digest TEXT NOT NULL,
+        kind TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS pins (
+        digest TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        PRIMARY KEY (digest, pid)
+    );
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 hardlinks: bool = CACHE_HARDLINKS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hardlinks = hardlinks
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(self.SCHEMA)
+        atexit.register(self.release)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def _touch(self, digests: List[str]):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("UPDATE blobs SET last_used = ? WHERE digest = ?", ((now, d) for d in digests))
+
+    def pin(self, digests: List[str]):
+        """Keep blobs from eviction, by any process, until this process releases them or exits"""
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO pins (digest, pid) VALUES (?, ?)",
+                                 ((digest, os.getpid()) for digest in digests))
+
+    def release(self, digests: Optional[List[str]] = None):
+        """Unpin blobs held by this process, all of them by default"""
+        with self._lock, self._db:
+            if digests is None:
+                self._db.execute("DELETE FROM pins WHERE pid = ?", (os.getpid(),))
+            else:
+                self._db.executemany("DELETE FROM pins WHERE digest = ? AND pid = ?",
+                                     ((digest, os.getpid()) for digest in digests))
+
+    def put(self, path: str, key: Optional[str] = None, move: bool = True, kind: str = 'file',
+            evict: bool = True) -> str:
+        """Add a file to the store and return its digest
+
+        With ``move`` the file is renamed into the store (or dropped if
+        the content is already there); otherwise it is linked or copied
+        and left where it is (never hardlinked: the caller may still write
+        to it). Unless ``evict`` is off, the store is then trimmed to its cap.
+        """
+        digest = file_sha256(path)
+        blob = self.blob_path(digest)
+        # Pinned before the existence check, so a concurrent trim cannot remove the blob in between
+        self.pin([digest])
+        if os.path.exists(blob):
+            if move:
+                os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.tmp-{os.getpid()}-{threading.get_ident()}"
+            if move:
+                os.replace(path, tmp)
+            else:
+                link_or_copy(path, tmp, hardlink=False)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, blob)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO blobs (digest, size, last_used) VALUES (?, ?, ?)",
+                             (digest, os.path.getsize(blob), time.time()))
+            if key:
+                self._db.execute("INSERT OR REPLACE INTO entries (key, digest, kind) VALUES (?, ?, ?)",
+                                 (key, digest, kind))
+        if evict:
+            self.enforce_limit(keep=[digest])
+        return digest
+
+    def get(self, key: str) -> Optional[str]:
+        """Blob path stored under key, or None if it is unknown or was evicted"""
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.pin([row[0]])
+        if not os.path.exists(self.blob_path(row[0])):
+            self.release([row[0]])
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        self._touch([row[0]])
+        return self.blob_path(row[0])
+
+    def fetch(self, key: str, download: Callable[[], str]) -> str:
+        """Blob path for key, calling ``download`` on a miss
+
+        ``download`` returns the path of the file it wrote; that file is
+        moved into the store.
+        """
+        path = self.get(key)
+        if path:
+            print(f"{key} found in the model cache")
+            return path
+        return self.blob_path(self.put(download(), key))
+
+    def tree(self, key: str) -> Optional[Dict]:
+        """Manifest stored under a tree key, if all of its files are still cached"""
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        digests = list(manifest['files'].values())
+        self.pin(digests)
+        if not all(os.path.exists(self.blob_path(digest)) for digest in digests):
+            return None
+        self._touch(digests)
+        return manifest
+
+    def add_tree(self, directory: str, key: str) -> Dict:
+        """Move every file under directory into the store and record the manifest under key"""
+        manifest: Dict = {'files': {}, 'dirs': []}
+        for current, dirs, files in os.walk(directory):
+            relative = os.path.relpath(current, directory)
+            for name in dirs:
+                manifest['dirs'].append(os.path.normpath(os.path.join(relative, name)).replace(os.sep, '/'))
+            for name in files:
+                path = os.path.join(current, name)
+                manifest['files'][os.path.normpath(os.path.join(relative, name)).replace(os.sep, '/')] = \
+                    self.put(path, evict=False)
+        shutil.rmtree(directory)
+        fd, path = tempfile.mkstemp(dir=os.path.join(self.root, 'tmp'), suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, sort_keys=True)
+        digest = self.put(path, key, kind='tree', evict=False)
+        # Nothing links to the new files yet, so none of them may go in this trim
+        self.enforce_limit(keep=[digest] + list(manifest['files'].values()))
+        return manifest
+
+    def link_tree(self, manifest: Dict, target: str) -> Dict[str, int]:
+        """Build target from cached blobs and swap it into place; returns counts per link method"""
+        parent, name = os.path.split(os.path.abspath(target))
+        os.makedirs(parent, exist_ok=True)
+        staging = os.path.join(parent, f".{name}.partial-{os.getpid()}")
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        methods: Dict[str, int] = {}
+        try:
+            for relative in manifest.get('dirs', []):
+                os.makedirs(os.path.join(staging, *relative.split('/')), exist_ok=True)
+            for relative, digest in manifest['files'].items():
+                path = os.path.join(staging, *relative.split('/'))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                method = link_or_copy(self.blob_path(digest), path, self.hardlinks)
+                methods[method] = methods.get(method, 0) + 1
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        replace_directory(staging, target)
+        self._touch(list(manifest['files'].values()))
+        return methods
+
+    def link_file(self, digest: str, target: str) -> str:
+        """Link a cached blob to target, replacing any existing file; returns the method used"""
+        if os.path.exists(target) and os.path.samefile(target, self.blob_path(digest)):
+            # Renaming a link over another link to the same file would leave both behind
+            if self.hardlinks:
+                self._touch([digest])
+                return 'hardlink'
+            os.remove(target)
+        tmp = f"{target}.tmp-{os.getpid()}"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        method = link_or_copy(self.blob_path(digest), tmp, self.hardlinks)
+        os.replace(tmp, target)
+        self._touch([digest])
+        return method
+
+    def install_archive(self, zip_path: str, target: str, whole_archive: bool = False) -> int:
+        """Install the .mlmodelc of a zip at target, extracting it only once per archive
+
+        Returns the number of files in the installed model.
+        """
+        digest = os.path.basename(zip_path)
+        if os.path.abspath(zip_path) != os.path.abspath(self.blob_path(digest)):
+            digest = file_sha256(zip_path)
+        key = f"tree:{digest}" + (":whole" if whole_archive else "")
+        manifest = self.tree(key)
+        if manifest is None:
+            staging = os.path.join(self.root, 'tmp', digest)
+            extract_mlmodelc(zip_path, staging, whole_archive=whole_archive)
+            manifest = self.add_tree(staging, key)
+        methods = self.link_tree(manifest, target)
+        if 'copy' in methods and self.hardlinks:
+            print(f"  {methods['copy']} file(s) of {os.path.basename(target)} copied: "
+                  f"the cache is on another filesystem or cannot be linked")
+        return len(manifest['files'])
+
+    def enforce_limit(self, keep: Optional[List[str]] = None) -> Tuple[int, int]:
+        """Evict least recently used blobs until the store fits in max_bytes
+
+        Returns (blobs evicted, bytes freed). Blobs in ``keep``, blobs
+        pinned by a running process, and blobs with other hard links are
+        never evicted. Pins left by processes that have exited are dropped.
+        """
+        keep = set(keep or [])
+        with self._lock, self._db:
+            pids = [pid for (pid,) in self._db.execute("SELECT DISTINCT pid FROM pins").fetchall()]
+            self._db.executemany("DELETE FROM pins WHERE pid = ?", ((pid,) for pid in pids if not _alive(pid)))
+            rows = self._db.execute("SELECT digest, size FROM blobs ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        evicted, freed = 0, 0
+        for digest, size in rows:
+            if total - freed <= self.max_bytes:
+                break
+            if digest in keep or self._links(digest) > 1 or not self._evict(digest):
+                continue
+            evicted += 1
+            freed += size
+        return evicted, freed
+
+    def _evict(self, digest: str) -> bool:
+        """Delete an unpinned blob; False if it is pinned
+
+        The pin check, file removal and index update happen in one write
+        transaction, which a pin from another process has to wait for.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._db.execute("SELECT 1 FROM pins WHERE digest = ?", (digest,)).fetchone():
+                    self._db.rollback()
+                    return False
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._db.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return True
+
+    def _links(self, digest: str) -> int:
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink
+        except FileNotFoundError:
+            return 0
+
+    def usage(self) -> Dict[str, int]:
+        """Blob and key counts, total bytes, bytes shared with installed models, and the cap"""
+        with self._lock:
+            rows = self._db.execute("SELECT digest, size FROM blobs").fetchall()
+            entries = dict(self._db.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind").fetchall())
+        linked = sum(size for digest, size in rows if self._links(digest) > 1)
+        return {
+            'blobs': len(rows),
+            'bytes': sum(size for _, size in rows),
+            'linked_bytes': linked,
+            'files': entries.get('file', 0),
+            'trees': entries.get('tree', 0),
+            'max_bytes': self.max_bytes,
+        }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared model cache")
+    parser.add_argument('command', choices=('usage', 'prune'),
+                        help="report cache usage, or evict least recently used blobs down to the cap")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--max-gb', type=float, help="size cap in GB (default: MODEL_CACHE_MAX_GB or 20)")
+    parser.add_argument('--json', action='store_true', help="print usage as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    max_bytes = int(args.max_gb * 1024 ** 3) if args.max_gb is not None else CACHE_MAX_BYTES
+    cache = ModelCache(args.cache_dir, max_bytes)
+    if args.command == 'prune':
+        evicted, freed = cache.enforce_limit()
+        print(f"🧹 Evicted {evicted} blob(s), freed {freed / 1048576:.1f} MB")
+    usage = cache.usage()
+    if args.json:
+        print(json.dumps(usage, indent=2))
+        return 0
+    print(f"📦 Model cache {cache.root}: {usage['blobs']} blob(s), {usage['bytes'] / 1048576:.1f} MB "
+          f"of {usage['max_bytes'] / 1048576:.0f} MB")
+    print(f"   {usage['linked_bytes'] / 1048576:.1f} MB linked from installed models, "
+          f"{(usage['bytes'] - usage['linked_bytes']) / 1048576:.1f} MB evictable")
+    print(f"   {usage['files']} download(s), {usage['trees']} extracted model(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
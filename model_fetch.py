@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Shared download helpers for the Core ML model fetch scripts
+Set HF_ENDPOINT to point huggingface_hub and hf_download at a local mirror
+(model_mirror.py) for testing
+"""
+import os
+import re
+import json
+import stat
+import sys
+import time
+import shutil
+import hashlib
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Models fetched at once; each one is mostly waiting on the network
+MAX_WORKERS = int(os.environ.get("MODEL_DOWNLOAD_WORKERS", "4"))
+CHUNK_SIZE = 1024 * 1024
+# Seconds between progress line updates
+PROGRESS_INTERVAL = 0.25
+# Seconds between each model's progress lines while several download at once
+PROGRESS_LINE_INTERVAL = 2.0
+
+_print_lock = threading.Lock()
+# Downloads reporting progress, and whether a redrawn line is still open
+_active_progress: List['Progress'] = []
+_open_line = False
+
+
+class _StripAuthRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follow redirects, but drop Authorization when one leaves the host
+
+    Hugging Face answers resolve URLs with a redirect to a CDN or presigned
+    S3 URL; the token must not reach that host (and breaks signed URLs)
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new is not None and urllib.parse.urlsplit(newurl).netloc != urllib.parse.urlsplit(req.full_url).netloc:
+            new.remove_header('Authorization')
+        return new
+
+
+_opener = urllib.request.build_opener(_StripAuthRedirectHandler)
+
+
+def log(message: str):
+    """Print from worker threads without interleaving lines"""
+    global _open_line
+    with _print_lock:
+        if _open_line:
+            print()
+            _open_line = False
+        print(message, flush=True)
+
+
+def fetch_all(jobs: Dict[str, Callable[[], Any]],
+              workers: int = MAX_WORKERS) -> Dict[str, Tuple[Any, Optional[BaseException]]]:
+    """Run every named fetch job in a bounded thread pool
+
+    Progress and failures are reported per job as they finish. Returns
+    ``{name: (result, error)}`` in the order of ``jobs`` once all are done,
+    so callers can run their extract/move steps afterwards in a fixed order.
+    """
+    results: Dict[str, Tuple[Any, Optional[BaseException]]] = {}
+    if not jobs:
+        return results
+    started = time.perf_counter()
+    workers = max(1, min(workers, len(jobs)))
+    log(f"⇣ Fetching {len(jobs)} model(s) with {workers} worker(s)")
+    started_at: Dict[str, float] = {}
+
+    def run(name: str, job: Callable[[], Any]) -> Any:
+        started_at[name] = time.perf_counter()
+        log(f"  … {name}")
+        return job()
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="fetch") as pool:
+        futures = {pool.submit(run, name, job): name for name, job in jobs.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            elapsed = time.perf_counter() - started_at.get(name, started)
+            try:
+                results[name] = (future.result(), None)
+                log(f"  ✓ [{done}/{len(jobs)}] {name} ({elapsed:.1f}s)")
+            except Exception as e:
+                results[name] = (None, e)
+                log(f"  ✗ [{done}/{len(jobs)}] {name} ({elapsed:.1f}s): {e}")
+
+    failed = sum(1 for _, error in results.values() if error)
+    log(f"⇣ Fetched {len(jobs) - failed}/{len(jobs)} in {time.perf_counter() - started:.1f}s")
+    return {name: results[name] for name in jobs}
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or does not verify"""
+
+
+class Progress:
+    """Download progress output
+
+    A lone download on a terminal redraws one line at most every
+    PROGRESS_INTERVAL seconds. While several run at once (or output is not a
+    terminal) every model prints whole lines instead, at most every
+    PROGRESS_LINE_INTERVAL seconds, so they do not overwrite each other.
+    """
+
+    def __init__(self, label: str, total: int = 0, done: int = 0):
+        self.label = label
+        self.total = total
+        self.done = done
+        self.started = time.perf_counter()
+        self._initial = done
+        self._shown = 0.0
+        with _print_lock:
+            _active_progress.append(self)
+
+    def update(self, amount: int):
+        self.done += amount
+        now = time.perf_counter()
+        if now - self._shown >= (PROGRESS_INTERVAL if self._inline() else PROGRESS_LINE_INTERVAL):
+            self._shown = now
+            self._draw(now)
+
+    def _inline(self) -> bool:
+        return _active_progress == [self] and sys.stdout.isatty()
+
+    def _draw(self, now: float, final: bool = False):
+        global _open_line
+        rate = (self.done - self._initial) / max(now - self.started, 1e-6) / 1048576
+        if self.total:
+            status = f"{self.done / self.total * 100:5.1f}% of {self.total / 1048576:.1f} MB"
+        else:
+            status = f"{self.done / 1048576:.1f} MB"
+        line = f"Downloading {self.label}: {status} at {rate:.1f} MB/s"
+        with _print_lock:
+            if self._inline():
+                print(f"\r{line}", end='\n' if final else '', flush=True)
+                _open_line = not final
+            else:
+                print(f"\n{line}" if _open_line else line, flush=True)
+                _open_line = False
+
+    def finish(self):
+        self._draw(time.perf_counter(), final=True)
+        with _print_lock:
+            _active_progress.remove(self)
+
+    def __enter__(self) -> 'Progress':
+        return self
+
+    def __exit__(self, *exc_info):
+        # A failed download must not keep counting as active
+        self.finish()
+
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_checksums(path: str) -> Dict[str, str]:
+    """Read a sha256sum-style manifest (``<hex>  <name>`` per line)"""
+    checksums = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.strip().split(None, 1)
+                if len(parts) == 2:
+                    checksums[parts[1].lstrip('*')] = parts[0].lower()
+    except FileNotFoundError:
+        pass
+    return checksums
+
+
+def save_checksums(path: str, checksums: Dict[str, str]):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        for name in sorted(checksums):
+            f.write(f"{checksums[name]}  {name}\n")
+    os.replace(tmp, path)
+
+
+def _total_size(response, offset: int) -> int:
+    """Full size of the remote file from a 200 or 206 response, 0 if unknown"""
+    content_range = response.headers.get('Content-Range', '')
+    match = re.match(r'bytes \d+-\d+/(\d+)', content_range)
+    if match:
+        return int(match.group(1))
+    length = response.headers.get('Content-Length')
+    return int(length) + (offset if response.status == 206 else 0) if length else 0
+
+
+def download_file(url: str, filename: str, size: Optional[int] = None, sha256: Optional[str] = None,
+                  retries: int = 3, timeout: float = 60.0, headers: Optional[Dict[str, str]] = None) -> str:
+    """Download a URL to filename, resuming an interrupted attempt and verifying the result
+
+    Data goes to ``<filename>.part`` in large buffered writes; a later call
+    (or a retry after a dropped connection) continues it with an HTTP Range
+    request, and starts over if the server ignores the range. The finished
+    file must have ``size`` bytes (or the size the server announced) and,
+    if given, the ``sha256`` digest; only then is it renamed into place.
+    A part file that fails verification is deleted. Returns the digest.
+    """
+    if sha256 and os.path.exists(filename) and file_sha256(filename) == sha256.lower():
+        log(f"{filename} already downloaded and verified")
+        return sha256.lower()
+
+    part = filename + '.part'
+    digest = hashlib.sha256()
+    offset = 0
+    if os.path.exists(part):
+        # Hash what is already there so the digest covers the whole file
+        with open(part, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                offset += len(chunk)
+    total = size or 0
+
+    for attempt in range(retries + 1):
+        if total and offset >= total:
+            break
+        request_headers = {**(headers or {}), **({'Range': f'bytes={offset}-'} if offset else {})}
+        try:
+            with _opener.open(urllib.request.Request(url, headers=request_headers),
+                                        timeout=timeout) as response:
+                if offset and response.status != 206:
+                    # Range not honoured: the body is the whole file again
+                    log(f"Server ignored the resume request for {filename}, starting over")
+                    offset, digest = 0, hashlib.sha256()
+                total = size or _total_size(response, offset) or total
+                with Progress(filename, total, offset) as progress, \
+                        open(part, 'ab' if offset else 'wb', buffering=CHUNK_SIZE) as f:
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        digest.update(chunk)
+                        offset += len(chunk)
+                        progress.update(len(chunk))
+            if not total or offset >= total:
+                break
+            log(f"Connection closed at {offset} of {total} bytes")
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # Nothing left to fetch: the part file is already complete
+                match = re.match(r'bytes \*/(\d+)', e.headers.get('Content-Range', ''))
+                total = size or (int(match.group(1)) if match else offset)
+                break
+            raise DownloadError(f"HTTP {e.code} for {url}") from e
+        except (OSError, urllib.error.URLError) as e:
+            if attempt == retries:
+                raise DownloadError(f"{url}: {e} (partial data kept in {part})") from e
+            log(f"Download of {filename} interrupted ({e}), resuming from {offset} bytes")
+            time.sleep(min(2 ** attempt, 30))
+
+    if total and offset > total:
+        os.remove(part)
+        raise DownloadError(f"{filename}: got {offset} bytes, more than the expected {total}")
+    if total and offset != total:
+        raise DownloadError(f"{filename}: got {offset} bytes, expected {total} (partial data kept in {part})")
+    hexdigest = digest.hexdigest()
+    if sha256 and hexdigest != sha256.lower():
+        os.remove(part)
+        raise DownloadError(f"{filename}: SHA-256 {hexdigest} does not match expected {sha256.lower()}")
+    os.replace(part, filename)
+    return hexdigest
+
+
+# Files below this size are not worth splitting
+MIN_SEGMENT = 8 * 1024 * 1024
+CONNECTIONS = int(os.environ.get("MODEL_DOWNLOAD_CONNECTIONS", "4"))
+
+
+def _probe(url: str, headers: Dict[str, str], timeout: float) -> Tuple[int, bool]:
+    """(size, accepts byte ranges) of a URL, from a one-byte range request"""
+    request = urllib.request.Request(url, headers={**headers, 'Range': 'bytes=0-0'})
+    with _opener.open(request, timeout=timeout) as response:
+        if response.status == 206:
+            return _total_size(response, 0), True
+        return int(response.headers.get('Content-Length') or 0), False
+
+
+def _pwrite(fd: int, data: bytes, position: int, lock: threading.Lock):
+    if hasattr(os, 'pwrite'):
+        while data:
+            written = os.pwrite(fd, data, position)
+            data, position = data[written:], position + written
+    else:
+        with lock:
+            os.lseek(fd, position, os.SEEK_SET)
+            os.write(fd, data)
+
+
+def download_segmented(url: str, filename: str, connections: int = CONNECTIONS,
+                       size: Optional[int] = None, sha256: Optional[str] = None,
+                       headers: Optional[Dict[str, str]] = None, retries: int = 3,
+                       timeout: float = 60.0, min_segment: int = MIN_SEGMENT) -> str:
+    """Download a large file over several connections, one byte range each
+
+    The output is preallocated as ``<filename>.part`` and every segment is
+    written at its own offset with positional writes as it arrives. A
+    failed segment is retried from where it stopped without touching the
+    others, and how far each segment got is kept in ``<filename>.part.json``
+    so a later call only fetches what is missing. Servers without Range
+    support, and small files, go through download_file instead. Size and
+    optional SHA-256 are verified before the rename into place; returns the
+    digest.
+    """
+    headers = headers or {}
+    try:
+        total, ranges = _probe(url, headers, timeout)
+    except urllib.error.HTTPError as e:
+        raise DownloadError(f"HTTP {e.code} for {url}") from e
+    except (OSError, urllib.error.URLError) as e:
+        raise DownloadError(f"{url}: {e}") from e
+    if size and total and size != total:
+        raise DownloadError(f"{filename}: server has {total} bytes, expected {size}")
+    part = filename + '.part'
+    state_path = part + '.json'
+    if not ranges or not total or total < 2 * min_segment or connections <= 1:
+        if os.path.exists(state_path):
+            # A sparse part file from a segmented attempt cannot be resumed as a stream
+            os.remove(state_path)
+            if os.path.exists(part):
+                os.remove(part)
+        return download_file(url, filename, size=size or total or None, sha256=sha256,
+                             retries=retries, timeout=timeout, headers=headers)
+    if os.path.exists(filename) and os.path.getsize(filename) == total:
+        if not sha256 or file_sha256(filename) == sha256.lower():
+            log(f"{filename} already downloaded")
+            return sha256.lower() if sha256 else file_sha256(filename)
+
+    # [start, next byte to fetch, end] per segment
+    segments: List[List[int]] = []
+    if os.path.exists(part) and os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('url') == url and state.get('size') == total:
+            segments = state.get('segments', [])
+    if not segments:
+        if os.path.exists(part):
+            os.remove(part)
+        # Enough segments for every connection to stay busy while a slow one finishes
+        segment_size = max(min_segment, -(-total // (connections * 4)))
+        segments = [[start, start, min(start + segment_size, total) - 1] for start in range(0, total, segment_size)]
+
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+    progress = Progress(os.path.basename(filename), total, sum(pos - start for start, pos, _ in segments))
+    lock = threading.Lock()
+    no_ranges = threading.Event()
+
+    def save_state():
+        with lock:
+            with open(state_path + '.tmp', 'w') as f:
+                json.dump({'url': url, 'size': total, 'segments': segments}, f)
+            os.replace(state_path + '.tmp', state_path)
+
+    def fetch(segment: List[int]):
+        start, _, end = segment
+        try:
+            for attempt in range(retries + 1):
+                request = urllib.request.Request(url, headers={**headers, 'Range': f'bytes={segment[1]}-{end}'})
+                try:
+                    with _opener.open(request, timeout=timeout) as response:
+                        if response.status != 206:
+                            # The server stopped honouring ranges; a body from offset 0 must not be written here
+                            no_ranges.set()
+                            raise DownloadError(f"{url} ignored the byte range request")
+                        while segment[1] <= end:
+                            chunk = response.read(min(CHUNK_SIZE, end - segment[1] + 1))
+                            if not chunk:
+                                break
+                            _pwrite(fd, chunk, segment[1], lock)
+                            segment[1] += len(chunk)
+                            with lock:
+                                progress.update(len(chunk))
+                    if segment[1] > end:
+                        return
+                    raise OSError(f"connection closed at byte {segment[1]}")
+                except urllib.error.HTTPError as e:
+                    if attempt == retries or e.code < 500:
+                        raise DownloadError(f"HTTP {e.code} for bytes {start}-{end} of {url}") from e
+                except (OSError, urllib.error.URLError) as e:
+                    if attempt == retries or no_ranges.is_set():
+                        raise DownloadError(f"bytes {start}-{end} of {url}: {e}") from e
+                time.sleep(min(2 ** attempt, 30))
+        finally:
+            # Written bytes are on disk already; record how far this segment got
+            save_state()
+
+    try:
+        os.ftruncate(fd, total)
+        with ThreadPoolExecutor(max(1, connections), thread_name_prefix="segment") as pool:
+            errors = [future.exception() for future in
+                      [pool.submit(fetch, segment) for segment in segments if segment[1] <= segment[2]]]
+    finally:
+        progress.finish()
+        os.close(fd)
+    failures = [error for error in errors if error]
+    if no_ranges.is_set():
+        log(f"{url} stopped accepting byte ranges, downloading it in one piece")
+        for path in (part, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return download_file(url, filename, size=total, sha256=sha256, retries=retries,
+                             timeout=timeout, headers=headers)
+    if failures:
+        raise DownloadError(f"{len(failures)} segment(s) of {filename} failed, progress is kept for the next attempt: "
+                            f"{failures[0]}")
+
+    hexdigest = file_sha256(part)
+    if sha256 and hexdigest != sha256.lower():
+        os.remove(part)
+        os.remove(state_path)
+        raise DownloadError(f"{filename}: SHA-256 {hexdigest} does not match expected {sha256.lower()}")
+    os.replace(part, filename)
+    os.remove(state_path)
+    return hexdigest
+
+
+def hf_file_url(repo: str, filename: str, revision: str = "main") -> str:
+    """Resolve URL of a file in a Hugging Face model repository (honours HF_ENDPOINT)"""
+    endpoint = os.environ.get("HF_ENDPOINT", "https://huggingface.co").rstrip('/')
+    return f"{endpoint}/{repo}/resolve/{revision}/{urllib.parse.quote(filename)}"
+
+
+def hf_download(repo: str, filename: str, directory: str = "Models/.downloads",
+                connections: int = CONNECTIONS) -> str:
+    """Download a file from a Hugging Face repository with download_segmented
+
+    Uses HF_TOKEN for gated repositories. The file is kept under
+    ``directory/<owner>--<name>/`` so an interrupted run resumes it.
+    """
+    headers = {'User-Agent': 'flirtframe-model-fetch'}
+    if os.environ.get("HF_TOKEN"):
+        headers['Authorization'] = f"Bearer {os.environ['HF_TOKEN']}"
+    target_dir = os.path.join(directory, repo.replace('/', '--'))
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, os.path.basename(filename))
+    download_segmented(hf_file_url(repo, filename), path, connections=connections, headers=headers)
+    return path
+
+
+def _mlmodelc_prefix(names: List[str]) -> Optional[str]:
+    """Archive path of the shallowest ``*.mlmodelc`` directory, with a trailing slash"""
+    best = None
+    for name in names:
+        parts = name.split('/')
+        if parts[0] == '__MACOSX':
+            continue
+        for depth, part in enumerate(parts[:-1]):
+            if part.endswith('.mlmodelc'):
+                if best is None or depth < best.count('/') - 1:
+                    best = '/'.join(parts[:depth + 1]) + '/'
+                break
+    return best
+
+
+def extract_mlmodelc(zip_path: str, target: str, whole_archive: bool = False) -> int:
+    """Extract only the ``.mlmodelc`` subtree of a zip archive to target
+
+    Members are picked from the central directory, so nothing outside the
+    subtree is read or written. They stream into a staging directory next
+    to target, which then replaces target with a rename. Paths that would
+    leave the staging directory, and symlinks, are rejected. With
+    ``whole_archive`` an archive without an .mlmodelc directory is
+    extracted whole instead of failing. Returns the number of files written.
+    """
+    target = os.path.abspath(target)
+    parent, name = os.path.split(target)
+    with zipfile.ZipFile(zip_path) as archive:
+        members = archive.infolist()
+        prefix = _mlmodelc_prefix([member.filename for member in members])
+        if prefix is None:
+            if not whole_archive:
+                raise DownloadError(f"no .mlmodelc directory in {zip_path}")
+            prefix = ''
+        staging = os.path.join(parent, f".{name}.partial-{os.getpid()}")
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        written = 0
+        try:
+            for member in members:
+                if not member.filename.startswith(prefix) or member.filename.startswith('__MACOSX/'):
+                    continue
+                relative = member.filename[len(prefix):]
+                if not relative:
+                    continue
+                normalized = posixpath.normpath(relative)
+                if (relative.startswith('/') or '\\' in relative or normalized == '..'
+                        or normalized.startswith('../')):
+                    raise DownloadError(f"unsafe path in {zip_path}: {member.filename}")
+                if stat.S_ISLNK(member.external_attr >> 16):
+                    raise DownloadError(f"symlink in {zip_path}: {member.filename}")
+                path = os.path.join(staging, *normalized.split('/'))
+                if member.is_dir():
+                    os.makedirs(path, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with archive.open(member) as source, open(path, 'wb') as destination:
+                    shutil.copyfileobj(source, destination, CHUNK_SIZE)
+                written += 1
+            if not written:
+                raise DownloadError(f"{prefix or zip_path} has no files")
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    replace_directory(staging, target)
+    return written
+
+
+def replace_directory(staging: str, target: str):
+    """Put a fully written staging directory in place of target"""
+    # A directory cannot be replaced in one rename, so move the old one aside first
+    parent, name = os.path.split(os.path.abspath(target))
+    previous = os.path.join(parent, f".{name}.old-{os.getpid()}")
+    if os.path.lexists(target):
+        os.replace(target, previous)
+    os.replace(staging, target)
+    if os.path.lexists(previous):
+        if os.path.isdir(previous) and not os.path.islink(previous):
+            shutil.rmtree(previous)
+        else:
+            os.remove(previous)
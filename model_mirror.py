@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Local file server for testing the model downloaders offline
+Serves a directory over HTTP with byte ranges, Hugging Face style resolve
+URLs and repository listings, and injectable slow, failing or range-less
+responses
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.server
+from typing import Any, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+# /<owner>/<repo>/resolve/<revision>/<path> maps to <root>/<owner>/<repo>/<path>
+RESOLVE_PATH = re.compile(r'^/([^/]+/[^/]+)/resolve/[^/]+/(.+)$')
+# Hub API calls behind list_repo_files: the recursive tree listing, or model
+# info with its siblings (older huggingface_hub releases)
+TREE_PATH = re.compile(r'^/api/models/([^/]+/[^/]+)/tree/[^/]+(?:/(.*))?$')
+INFO_PATH = re.compile(r'^/api/models/([^/]+/[^/]+)(?:/revision/[^/]+)?$')
+
+
+class MirrorServer(http.server.ThreadingHTTPServer):
+    """HTTP server for a model directory with fault injection
+
+    ``bandwidth`` caps each response in bytes per second; ``slow_rate`` is
+    the share of responses throttled further to ``slow_bandwidth``;
+    ``fail_rate`` the share cut off partway through the body, and
+    ``error_rate`` the share answered with a 503. With ``ranges`` off the
+    Range header is ignored and the whole file is sent with a 200.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: str, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 bandwidth: float = 0.0, slow_rate: float = 0.0, slow_bandwidth: float = 256 * 1024,
+                 fail_rate: float = 0.0, error_rate: float = 0.0, ranges: bool = True, seed: int = 0):
+        super().__init__((host, port), MirrorHandler)
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.slow_rate = slow_rate
+        self.slow_bandwidth = slow_bandwidth
+        self.fail_rate = fail_rate
+        self.error_rate = error_rate
+        self.ranges = ranges
+        self.random = random.Random(seed)
+        self.requests: List[Tuple[str, Optional[str], int]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MirrorServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def local_path(self, path: str) -> Optional[str]:
+        path = unquote(urlsplit(path).path)
+        match = RESOLVE_PATH.match(path)
+        if match:
+            path = f"/{match.group(1)}/{match.group(2)}"
+        full = os.path.abspath(os.path.join(self.root, path.lstrip('/')))
+        if not full.startswith(self.root + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    def listing(self, path: str) -> Optional[Any]:
+        """Hub API JSON for a repository directory, None if it is not one"""
+        path = unquote(urlsplit(path).path)
+        tree, info = TREE_PATH.match(path), INFO_PATH.match(path)
+        match = tree or info
+        if not match:
+            return None
+        repo = os.path.abspath(os.path.join(self.root, match.group(1)))
+        if not repo.startswith(self.root + os.sep) or not os.path.isdir(repo):
+            return None
+        files = []
+        for directory, _, names in os.walk(repo):
+            for name in names:
+                full = os.path.join(directory, name)
+                files.append((os.path.relpath(full, repo).replace(os.sep, '/'), os.path.getsize(full)))
+        files.sort()
+        if info:
+            return {'id': match.group(1), 'sha': 'main', 'siblings': [{'rfilename': name} for name, _ in files]}
+        prefix = (tree.group(2) or '').strip('/')
+        return [{'type': 'file', 'path': name, 'size': size, 'oid': ''} for name, size in files
+                if not prefix or name.startswith(prefix + '/')]
+
+
+class MirrorHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MirrorServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body: bool):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency / 1000)
+        if self.path.startswith('/api/'):
+            return self.send_listing(send_body)
+        path = server.local_path(self.path)
+        requested = self.headers.get('Range')
+        if path is None:
+            return self.send_empty(404)
+        if server.error_rate and server.draw() < server.error_rate:
+            server.requests.append((self.path, requested, 503))
+            return self.send_empty(503)
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r'bytes=(\d*)-(\d*)$', requested or '')
+        if match and server.ranges:
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2) or 0))
+            if start >= size or start > end:
+                server.requests.append((self.path, requested, 416))
+                return self.send_empty(416, {'Content-Range': f'bytes */{size}'})
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            status = 206
+        else:
+            self.send_response(200)
+            status = 200
+        server.requests.append((self.path, requested, status))
+        length = end - start + 1
+        self.send_header('Content-Length', str(length))
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes' if server.ranges else 'none')
+        self.end_headers()
+        if not send_body:
+            return
+
+        bandwidth = server.bandwidth
+        if server.slow_rate and server.draw() < server.slow_rate:
+            bandwidth = server.slow_bandwidth
+        cut = length
+        if server.fail_rate and length > 1 and server.draw() < server.fail_rate:
+            cut = int(length * server.draw())
+        sent, started = 0, time.perf_counter()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while sent < cut:
+                chunk = f.read(min(64 * 1024, cut - sent))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return
+                sent += len(chunk)
+                if bandwidth:
+                    ahead = sent / bandwidth - (time.perf_counter() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        if cut < length:
+            # Drop the connection mid-body, as a flaky CDN edge would
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+    def send_listing(self, send_body: bool):
+        listing = self.server.listing(self.path)
+        if listing is None:
+            self.server.requests.append((self.path, None, 404))
+            return self.send_empty(404)
+        self.server.requests.append((self.path, None, 200))
+        body = json.dumps(listing).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_empty(self, status: int, headers: Optional[dict] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve a model directory for offline download tests")
+    parser.add_argument('root', help="directory to serve, laid out as <owner>/<repo>/<file> for HF_ENDPOINT; "
+                        "each <owner>/<repo> is also listed for list_repo_files")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency', type=float, default=0.0, help="added latency per request in ms")
+    parser.add_argument('--bandwidth', type=float, default=0.0,
+                        help="per-connection limit in MB/s, 0 for none")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of responses sent slowly")
+    parser.add_argument('--slow-bandwidth', type=float, default=0.25, help="rate of slow responses in MB/s")
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help="share of responses cut off partway through the body")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument('--no-range', action='store_true', help="ignore Range headers")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    server = MirrorServer(args.root, args.host, args.port, latency=args.latency,
+                          bandwidth=args.bandwidth * 1048576, slow_rate=args.slow_rate,
+                          slow_bandwidth=args.slow_bandwidth * 1048576, fail_rate=args.fail_rate,
+                          error_rate=args.error_rate, ranges=not args.no_range, seed=args.seed)
+    print(f"📡 Serving {server.root} at {server.url} (HF_ENDPOINT={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
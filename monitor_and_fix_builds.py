@@ -6,17 +6,48 @@ Continuously monitors builds and automatically fixes common issues
 
 import os
 import sys
+import codecs
+import difflib
+import gzip
+import hmac
+import hashlib
 import time
 import json
 import re
+import random
+import queue
+import sqlite3
+import threading
 import subprocess
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+import signal
+import mmap
+import tempfile
+import pstats
+import cProfile
+import argparse
+import multiprocessing
+import http.client
+import http.server
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
 
 # GitHub repository info
 REPO_OWNER = "bd01010"
 REPO_NAME = "flirtframe-app"
 
+# GitHub REST API endpoint (override with GITHUB_API_URL to point at a local stand-in)
+DEFAULT_API_URL = "https://api.github.com"
+
+# Directory the monitored workflows are discovered from
+WORKFLOWS_DIR = '.github/workflows'
+
+# Where the monitor keeps caches and state between restarts (git-ignored)
+STATE_DIR = os.environ.get('BUILD_MONITOR_STATE_DIR', '.build_monitor')
+
 # Common build errors and their fixes
 ERROR_PATTERNS = {
     "No such module 'Firebase'": {
@@ -53,84 +84,2229 @@ ERROR_PATTERNS = {
     }
 }
 
-class BuildMonitor:
+class GitHubAPIError(Exception):
+    """Raised when the GitHub API answers with an unexpected status"""
+
+    def __init__(self, status: int, url: str, body: bytes = b""):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.body = body
+
+
+class RequestBudgetExhausted(GitHubAPIError):
+    """Raised instead of sending a request once GitHubClient.request_limit is reached"""
+
+    def __init__(self, url: str, limit: int):
+        super().__init__(0, url)
+        self.args = (f"request budget used up ({limit} requests), not requesting {url}",)
+
+
+class ApiResponse:
+    """Fully read HTTP response returned by GitHubClient"""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, url: str):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+
+class ResponseCache:
+    """URL-keyed store of validators (ETag / Last-Modified) and bodies for conditional GETs"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load previously saved entries, ignoring a missing or corrupt file"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable response cache {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write the cache to disk if anything changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {'entries': self.entries}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers that let the server answer 304 for an unchanged URL"""
+        entry = self.entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def lookup(self, url: str) -> Optional[bytes]:
+        """Record a 304 for ``url`` and return the cached body"""
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry['body'].encode('utf-8')
+
+    def store(self, url: str, response: 'ApiResponse'):
+        """Remember a fresh 200 response if it carries a validator"""
+        with self._lock:
+            self.misses += 1
+            etag = response.headers.get('ETag') or response.headers.get('etag')
+            last_modified = response.headers.get('Last-Modified') or response.headers.get('last-modified')
+            if not etag and not last_modified:
+                return
+            self.entries.pop(url, None)
+            self.entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body': response.text(),
+            }
+            # Entries are kept in insertion order, so the first one is the stalest
+            while len(self.entries) > self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self._dirty = True
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return f"cache hits: {self.hits}, misses: {self.misses} ({ratio:.0f}% hit rate)"
+
+
+class GitHubClient:
+    """GitHub REST client that keeps a pool of keep-alive connections per host"""
+
+    MAX_REDIRECTS = 5
+
+    def __init__(self, token: str = '', base_url: Optional[str] = None,
+                 owner: str = REPO_OWNER, repo: str = REPO_NAME,
+                 pool_size: int = 4, timeout: float = 30.0,
+                 cache: Optional[ResponseCache] = None):
+        self.token = token
+        self.cache = cache
+        self.base_url = (base_url or os.environ.get('GITHUB_API_URL') or DEFAULT_API_URL).rstrip('/')
+        self.owner = owner
+        self.repo = repo
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.requests_made = 0
+        self.bytes_received = 0
+        # When set, no request is sent that could bring requests_made past it
+        self.request_limit: Optional[int] = None
+        self._in_flight = 0
+        # Latest X-RateLimit-* values seen from the API: limit, remaining, reset (epoch seconds)
+        self.rate_limit: Dict[str, int] = {}
+        self._count_lock = threading.Lock()
+        self._pools: Dict[Tuple[str, str, int], queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+
+    # -- connection pool --------------------------------------------------
+
+    def _pool(self, key: Tuple[str, str, int]) -> queue.LifoQueue:
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _acquire(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        try:
+            return self._pool(key).get_nowait()
+        except queue.Empty:
+            scheme, host, port = key
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse):
+        if response.will_close:
+            conn.close()
+            return
+        try:
+            self._pool(key).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    # -- requests ---------------------------------------------------------
+
+    def url(self, path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build an absolute API URL from a path relative to the base URL"""
+        if not path.startswith(('http://', 'https://')):
+            path = self.base_url + '/' + path.lstrip('/')
+        if params:
+            path += ('&' if '?' in path else '?') + urlencode(params)
+        return path
+
+    def repo_url(self, suffix: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build an API URL under /repos/{owner}/{repo}"""
+        return self.url(f"/repos/{self.owner}/{self.repo}/{suffix.lstrip('/')}", params)
+
+    def _headers(self, url: str, extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+        headers = {
+            'Accept': 'application/vnd.github+json',
+            'User-Agent': f'{REPO_NAME}-build-monitor',
+        }
+        # Never forward the token to hosts other than the API (e.g. log blob storage redirects)
+        if self.token and urlsplit(url).netloc == urlsplit(self.base_url).netloc:
+            headers['Authorization'] = f'token {self.token}'
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _send(self, method: str, url: str, headers: Dict[str, str]):
+        """Send one request on a pooled connection, retrying once on a stale socket"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname or '', port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        for attempt in range(2):
+            with self._count_lock:
+                if self.request_limit is not None and self.requests_made + self._in_flight >= self.request_limit:
+                    raise RequestBudgetExhausted(url, self.request_limit)
+                self._in_flight += 1
+            conn = self._acquire(key)
+            try:
+                conn.request(method, target, headers=headers)
+                response = conn.getresponse()
+                with self._count_lock:
+                    self.requests_made += 1
+                    self._track_rate_limit(response)
+                return key, conn, response
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+            finally:
+                with self._count_lock:
+                    self._in_flight -= 1
+
+    def _track_rate_limit(self, response: http.client.HTTPResponse):
+        values = {}
+        for name in ('limit', 'remaining', 'reset'):
+            value = response.getheader(f'X-RateLimit-{name.title()}')
+            if value is not None and value.isdigit():
+                values[name] = int(value)
+        if values:
+            self.rate_limit.update(values)
+
+    def open(self, method: str, url: str, headers: Optional[Dict[str, str]] = None):
+        """Send a request, follow redirects and return the unread final response
+
+        The caller must pass the returned ``(key, conn, response)`` to
+        ``finish`` once the body has been consumed.
+        """
+        for _ in range(self.MAX_REDIRECTS + 1):
+            key, conn, response = self._send(method, url, self._headers(url, headers))
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader('Location')
+                response.read()
+                self._release(key, conn, response)
+                if not location:
+                    raise GitHubAPIError(response.status, url)
+                url = urljoin(url, location)
+                continue
+            return key, conn, response, url
+        raise GitHubAPIError(310, url)
+
+    def finish(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection,
+               response: http.client.HTTPResponse):
+        """Return a connection to its pool after its response was read"""
+        self._release(key, conn, response)
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None) -> ApiResponse:
+        """Perform a request and read the whole response body"""
+        key, conn, response, final_url = self.open(method, url, headers)
+        try:
+            body = response.read()
+        except Exception:
+            conn.close()
+            raise
+        with self._count_lock:
+            self.bytes_received += len(body)
+        self.finish(key, conn, response)
+        return ApiResponse(response.status, dict(response.getheaders()), body, final_url)
+
+    def stream(self, url: str, chunk_size: int = 64 * 1024,
+               headers: Optional[Dict[str, str]] = None,
+               info: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """GET a URL and yield its body in chunks without buffering it whole
+
+        If the consumer stops early the connection is closed instead of being
+        returned to the pool, since its body was not fully read. When ``info``
+        is given it receives the response ``status`` and ``headers`` before
+        the first chunk is yielded.
+        """
+        key, conn, response, final_url = self.open('GET', url, headers)
+        if info is not None:
+            info['status'] = response.status
+            info['headers'] = dict(response.getheaders())
+        if not 200 <= response.status < 300:
+            body = response.read()
+            self.finish(key, conn, response)
+            raise GitHubAPIError(response.status, final_url, body)
+        completed = False
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                with self._count_lock:
+                    self.bytes_received += len(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                self.finish(key, conn, response)
+            else:
+                conn.close()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            use_cache: bool = False) -> ApiResponse:
+        """GET a URL and raise GitHubAPIError on a non-2xx answer
+
+        With ``use_cache`` the request is made conditional on the cached
+        validators and a 304 answer is served from the response cache.
+        """
+        cache = self.cache if use_cache else None
+        if cache:
+            headers = {**cache.conditional_headers(url), **(headers or {})}
+        response = self.request('GET', url, headers)
+        if cache and response.status == 304:
+            body = cache.lookup(url)
+            if body is not None:
+                return ApiResponse(200, response.headers, body, url)
+        if not 200 <= response.status < 300:
+            raise GitHubAPIError(response.status, url, response.body)
+        if cache:
+            cache.store(url, response)
+        return response
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None,
+                 use_cache: bool = False) -> Any:
+        """GET a URL and decode its JSON body"""
+        return self.get(url, headers, use_cache).json()
+
+
+class StateStore:
+    """SQLite record of processed runs, their failed jobs, detected errors and applied fixes"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER NOT NULL,
+        run_attempt INTEGER NOT NULL DEFAULT 1,
+        workflow TEXT,
+        status TEXT,
+        conclusion TEXT,
+        created_at TEXT,
+        processed_at TEXT,
+        PRIMARY KEY (run_id, run_attempt)
+    );
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id INTEGER PRIMARY KEY,
+        run_id INTEGER NOT NULL,
+        name TEXT,
+        conclusion TEXT
+    );
+    CREATE TABLE IF NOT EXISTS errors (
+        run_id INTEGER NOT NULL,
+        pattern TEXT NOT NULL,
+        description TEXT,
+        fix TEXT,
+        detected_at TEXT,
+        PRIMARY KEY (run_id, pattern)
+    );
+    CREATE TABLE IF NOT EXISTS fixes (
+        fix_type TEXT PRIMARY KEY,
+        run_id INTEGER,
+        applied_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS fingerprints (
+        signature TEXT PRIMARY KEY,
+        pattern TEXT,
+        example TEXT,
+        occurrences INTEGER NOT NULL DEFAULT 0,
+        first_seen TEXT,
+        last_seen TEXT,
+        last_run_id INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS handled_fingerprints (
+        signature TEXT PRIMARY KEY,
+        fix_type TEXT,
+        handled_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS unknown_failures (
+        signature TEXT PRIMARY KEY,
+        example TEXT,
+        occurrences INTEGER NOT NULL DEFAULT 0,
+        first_seen TEXT,
+        last_seen TEXT,
+        last_run_id INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(self.SCHEMA)
+
+    def snapshot(self) -> 'StateStore':
+        """In-memory copy of this store; writes to the copy never reach the original"""
+        copy = StateStore()
+        with self._lock:
+            self._db.backup(copy._db)
+        return copy
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def is_run_processed(self, run: Dict) -> bool:
+        """True if this run (and attempt) was already fully analyzed"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT processed_at FROM runs WHERE run_id = ? AND run_attempt = ?",
+                (run['id'], run.get('run_attempt', 1))).fetchone()
+        return bool(row and row[0])
+
+    def record_jobs(self, run_id: int, jobs: List[Dict]):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO jobs (job_id, run_id, name, conclusion) VALUES (?, ?, ?, ?)",
+                [(job['id'], run_id, job.get('name'), job.get('conclusion')) for job in jobs])
+
+    def record_errors(self, run_id: int, errors: List[Tuple[str, Dict]]):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO errors (run_id, pattern, description, fix, detected_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, pattern, info['description'], info['fix'], self._now()) for pattern, info in errors])
+
+    def record_run(self, workflow: str, run: Dict):
+        """Note a run whose errors were recorded as history, without marking it processed"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO runs (run_id, run_attempt, workflow, status, conclusion, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run['id'], run.get('run_attempt', 1), workflow, run.get('status'),
+                 run.get('conclusion'), run.get('created_at')))
+
+    def is_run_recorded(self, run: Dict) -> bool:
+        """True if this run (and attempt) was recorded, processed or not"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM runs WHERE run_id = ? AND run_attempt = ?",
+                (run['id'], run.get('run_attempt', 1))).fetchone()
+        return row is not None
+
+    def mark_run_processed(self, workflow: str, run: Dict):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO runs "
+                "(run_id, run_attempt, workflow, status, conclusion, created_at, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run['id'], run.get('run_attempt', 1), workflow, run.get('status'),
+                 run.get('conclusion'), run.get('created_at'), self._now()))
+
+    def record_fix(self, fix_type: str, run_id: Optional[int] = None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fixes (fix_type, run_id, applied_at) VALUES (?, ?, ?)",
+                (fix_type, run_id, self._now()))
+
+    def record_fingerprint(self, signature: str, pattern: str, example: str, run_id: int) -> int:
+        """Count an occurrence of a failure signature; returns the occurrences so far"""
+        now = self._now()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO fingerprints (signature, pattern, example, occurrences, first_seen, last_seen, last_run_id) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT(signature) DO UPDATE SET "
+                "occurrences = occurrences + 1, last_seen = excluded.last_seen, last_run_id = excluded.last_run_id",
+                (signature, pattern, example[:500], now, now, run_id))
+            return self._db.execute(
+                "SELECT occurrences FROM fingerprints WHERE signature = ?", (signature,)).fetchone()[0]
+
+    def mark_fingerprint_handled(self, signature: str, fix_type: str):
+        """Note that the fix for a failure signature has gone out"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO handled_fingerprints (signature, fix_type, handled_at) VALUES (?, ?, ?)",
+                (signature, fix_type, self._now()))
+
+    def handled_fingerprints(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT signature FROM handled_fingerprints")}
+
+    def record_unknown_failure(self, signature: str, example: str, run_id: int) -> int:
+        """Count a failure that no signature explains; returns how often its cluster was seen"""
+        now = self._now()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO unknown_failures (signature, example, occurrences, first_seen, last_seen, last_run_id) "
+                "VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT(signature) DO UPDATE SET "
+                "occurrences = occurrences + 1, last_seen = excluded.last_seen, last_run_id = excluded.last_run_id",
+                (signature, example[:500], now, now, run_id))
+            return self._db.execute(
+                "SELECT occurrences FROM unknown_failures WHERE signature = ?", (signature,)).fetchone()[0]
+
+    def unknown_clusters(self, limit: int = 20) -> List[Tuple[str, str, int, str, str]]:
+        """(signature, example, occurrences, first_seen, last_seen) of unexplained failures, most frequent first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT signature, example, occurrences, first_seen, last_seen FROM unknown_failures "
+                "ORDER BY occurrences DESC, last_seen DESC LIMIT ?", (limit,)).fetchall()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def applied_fixes(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT fix_type FROM fixes ORDER BY applied_at").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Volatile parts of log lines that must not change a failure fingerprint
+_NORMALIZERS = [
+    (re.compile(r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?Z?\s*'), ''),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE), '<uuid>'),
+    (re.compile(r'(?:[A-Za-z]:)?(?:[\w.@+~-]*/)+[\w.@+~-]*'), '<path>'),
+    (re.compile(r'\b[0-9a-f]{7,64}\b', re.IGNORECASE), '<hash>'),
+    (re.compile(r'\d+'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# Lines on each side of a signature hit that go into its fingerprint
+FINGERPRINT_CONTEXT = 2
+
+# Lower-case markers of lines that look like a failure even when no ERROR_PATTERNS
+# signature matches; SignatureEngine finds them in its signature pass
+ERROR_MARKERS = ('##[error]', 'error:')
+
+
+def normalize_log_line(line: str) -> str:
+    """Strip timestamps, paths, hashes, ids and numbers from a log line"""
+    for regex, replacement in _NORMALIZERS:
+        line = regex.sub(replacement, line)
+    return line.strip()
+
+
+def failure_fingerprint(pattern: str, lines: Sequence[str]) -> str:
+    """Stable signature of failing lines, independent of run-specific details"""
+    normalized = '\n'.join(normalize_log_line(line) for line in lines)
+    return hashlib.sha1(f'{pattern}\n{normalized}'.encode('utf-8')).hexdigest()
+
+
+def context_lines(text: str, pos: int, lead: Sequence[str] = ()) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Up to FINGERPRINT_CONTEXT lines before and after the line of text at pos
+
+    ``lead`` holds the lines that came before text. Fewer lines after are
+    returned when text ends first; a final line break does not start a line.
+    """
+    before: List[str] = []
+    end = text.rfind('\n', 0, pos)
+    while end >= 0 and len(before) < FINGERPRINT_CONTEXT:
+        start = text.rfind('\n', 0, end) + 1
+        before.append(text[start:end])
+        end = start - 1
+    missing = FINGERPRINT_CONTEXT - len(before)
+    if missing and lead:
+        before.extend(reversed(list(lead)[-missing:]))
+    after: List[str] = []
+    start = text.find('\n', pos)
+    while 0 <= start < len(text) - 1 and len(after) < FINGERPRINT_CONTEXT:
+        stop = text.find('\n', start + 1)
+        after.append(text[start + 1:stop if stop >= 0 else len(text)])
+        start = stop
+    return tuple(reversed(before)), tuple(after)
+
+
+class SignatureHit(NamedTuple):
+    """First occurrence of a signature in a log, with the lines around it"""
+    pattern: str
+    source: str
+    offset: int
+    line_no: int
+    line: str
+    before: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+
+    @property
+    def window(self) -> Tuple[str, ...]:
+        """The hit line and its context, as fingerprinted"""
+        return self.before + (self.line,) + self.after
+
+
+class SignatureEngine:
+    """Precompiled single-pass matcher for a signature table
+
+    Literal signatures, and the longest literal run of each regex signature,
+    are merged into a prefix trie that is compiled into one regular
+    expression, so the text is scanned once in C instead of once per pattern
+    (Aho-Corasick style). True regexes are then only run on lines where their
+    literal anchor matched. Regexes without a usable anchor fall back to a
+    plain search. The generic ERROR_MARKERS are part of the same automaton,
+    so collecting error lines costs no extra pass.
+    """
+
+    _META = set('.^$*+?{}[]\\|()')
+    _WILDCARD = re.compile(r'\.[*+]')
+
+    def __init__(self, patterns: Dict[str, Dict]):
+        self.patterns = patterns
+        self.regexes = {pattern: re.compile(pattern, re.IGNORECASE) for pattern in patterns}
+        # Lower-cased anchor -> signatures it stands for
+        self.anchors: Dict[str, List[str]] = {}
+        self.literal = set()
+        self.unanchored: List[str] = []
+        for pattern in patterns:
+            anchor = self._anchor(pattern)
+            if anchor is None:
+                self.unanchored.append(pattern)
+                continue
+            if anchor == pattern:
+                self.literal.add(pattern)
+            self.anchors.setdefault(anchor.lower(), []).append(pattern)
+        for marker in ERROR_MARKERS:
+            self.anchors.setdefault(marker, [])
+        # The trie regex reports the longest anchor at a position; also credit its prefixes
+        self._prefixed = {
+            anchor: [p for other in self.anchors if anchor.startswith(other) for p in self.anchors[other]]
+            for anchor in self.anchors
+        }
+        # Marker an anchor starts with, if any
+        self._marker = {
+            anchor: next((marker for marker in ERROR_MARKERS if anchor.startswith(marker)), None)
+            for anchor in self.anchors
+        }
+        self.automaton = re.compile(self._trie_regex(list(self.anchors))) if self.anchors else None
+
+    @classmethod
+    def _anchor(cls, pattern: str) -> Optional[str]:
+        """Literal the pattern must contain: itself, or its longest run between .* / .+ wildcards"""
+        pieces = cls._WILDCARD.split(pattern)
+        if any(char in cls._META for piece in pieces for char in piece):
+            return None
+        anchor = max(pieces, key=len)
+        return anchor or None
+
+    @staticmethod
+    def _trie_regex(words: List[str]) -> str:
+        trie: Dict[str, Any] = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        def build(node: Dict[str, Any]) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def scan(self, text: str, skip=frozenset(), source: str = '', base_offset: int = 0, base_line: int = 1,
+             error_lines: Optional[List[str]] = None,
+             error_limit: int = 0) -> Tuple[Dict[str, SignatureHit], Dict[str, int]]:
+        """Find signatures in complete lines of text
+
+        Returns the first hit of every signature not in ``skip`` and the
+        number of hits per signature. Lines with an ERROR_MARKERS match are
+        appended to ``error_lines`` until it holds ``error_limit`` of them.
+        """
+        hits: Dict[str, SignatureHit] = {}
+        counts: Dict[str, int] = {}
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lower-case to two code points; keep offsets aligned
+            lowered = ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+        line_pos, line_no = 0, base_line
+
+        def record(pattern: str, offset: int):
+            nonlocal line_pos, line_no
+            counts[pattern] = counts.get(pattern, 0) + 1
+            if pattern in hits or pattern in skip:
+                return
+            # Line numbers are tracked incrementally from the previous hit
+            if offset >= line_pos:
+                line_no += text.count('\n', line_pos, offset)
+            else:
+                line_no -= text.count('\n', offset, line_pos)
+            line_pos = offset
+            start = text.rfind('\n', 0, offset) + 1
+            stop = text.find('\n', offset)
+            line = text[start:stop if stop >= 0 else len(text)]
+            # A base line of 0 means the position in the log is only known in bytes
+            hits[pattern] = SignatureHit(pattern, source, base_offset + offset, line_no if base_line > 0 else 0, line)
+
+        pos = 0
+        error_line_end = -1
+        while self.automaton is not None:
+            match = self.automaton.search(lowered, pos)
+            if not match:
+                break
+            # Restart one past the match start so overlapping signatures are still seen
+            pos = match.start() + 1
+            marker = self._marker[match.group()]
+            if (marker and error_lines is not None and len(error_lines) < error_limit
+                    and match.start() > error_line_end
+                    and not (marker == 'error:' and match.start() and
+                             (lowered[match.start() - 1].isalnum() or lowered[match.start() - 1] == '_'))):
+                start = text.rfind('\n', 0, match.start()) + 1
+                stop = text.find('\n', match.start())
+                error_line_end = stop if stop >= 0 else len(text)
+                error_lines.append(text[start:error_line_end])
+            for pattern in self._prefixed[match.group()]:
+                if pattern in self.literal:
+                    record(pattern, match.start())
+                    continue
+                start = text.rfind('\n', 0, match.start()) + 1
+                stop = text.find('\n', match.start())
+                found = self.regexes[pattern].search(text, start, stop if stop >= 0 else len(text))
+                if found:
+                    record(pattern, found.start())
+
+        for pattern in self.unanchored:
+            if pattern in skip:
+                continue
+            for found in self.regexes[pattern].finditer(text):
+                record(pattern, found.start())
+
+        return hits, counts
+
+
+_ENGINES: Dict[int, SignatureEngine] = {}
+
+
+def signature_engine(patterns: Optional[Dict[str, Dict]] = None) -> SignatureEngine:
+    """Compiled engine for a signature table, built once per table"""
+    patterns = patterns if patterns is not None else ERROR_PATTERNS
+    engine = _ENGINES.get(id(patterns))
+    if engine is None or engine.patterns is not patterns:
+        engine = _ENGINES[id(patterns)] = SignatureEngine(patterns)
+    return engine
+
+
+class LogMatcher:
+    """Incremental ERROR_PATTERNS matcher fed by one or more log streams
+
+    Every signature matches within a single line, so each stream only keeps
+    the trailing partial line of its last chunk (capped at MAX_CARRY) as
+    overlap. Memory use is bounded by the chunk size, not the log size.
+
+    The first hit of every signature is fingerprinted together with the
+    FINGERPRINT_CONTEXT lines on each side of it. Once every hit so far has
+    a fingerprint in ``handled`` (its fix already went out) the matcher is
+    ``settled`` and reading can stop.
+    """
+
+    MAX_CARRY = 64 * 1024
+    MAX_ERROR_LINES = 20
+
+    def __init__(self, patterns: Optional[Dict[str, Dict]] = None, handled: Optional[Set[str]] = None):
+        self.engine = signature_engine(patterns)
+        self.patterns = self.engine.patterns
+        self.handled = handled or set()
+        self.found: Dict[str, Dict] = {}
+        self.hits: Dict[str, SignatureHit] = {}
+        self.counts: Dict[str, int] = {}
+        # Fingerprint of every hit whose context window is complete
+        self.fingerprints: Dict[str, str] = {}
+        # First generic error lines, used to cluster failures no signature explains
+        self.error_lines: List[str] = []
+        # Set when a log could not be read to its end (API error, dropped connection)
+        self.incomplete = False
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """True once every known signature has been seen"""
+        return len(self.found) == len(self.patterns)
+
+    @property
+    def settled(self) -> bool:
+        """True once there are hits and every one of them is a failure already handled"""
+        with self._lock:
+            return (bool(self.hits) and len(self.fingerprints) == len(self.hits)
+                    and all(fingerprint in self.handled for fingerprint in self.fingerprints.values()))
+
+    def scan(self, text: str, source: str = '', base_offset: int = 0, base_line: int = 1,
+             new_hits: Optional[List[SignatureHit]] = None) -> int:
+        """Match complete lines of text against the signature table and return the hit count
+
+        First hits of a signature are appended to ``new_hits`` for the caller
+        to add their context to (see ``complete``). Without it, text is taken
+        to be a whole log and the context comes from text.
+        """
+        error_lines: List[str] = []
+        hits, counts = self.engine.scan(text, frozenset(self.found), source, base_offset, base_line,
+                                        error_lines, self.MAX_ERROR_LINES - len(self.error_lines))
+        with self._lock:
+            self.error_lines.extend(error_lines[:self.MAX_ERROR_LINES - len(self.error_lines)])
+            for pattern, count in counts.items():
+                self.counts[pattern] = self.counts.get(pattern, 0) + count
+            for pattern, hit in hits.items():
+                if pattern not in self.hits:
+                    if new_hits is None:
+                        before, after = context_lines(text, hit.offset - base_offset)
+                        hit = hit._replace(before=before, after=after)
+                        self.fingerprints[pattern] = failure_fingerprint(pattern, hit.window)
+                    else:
+                        new_hits.append(hit)
+                    self.hits[pattern] = hit
+                    self.found[pattern] = self.patterns[pattern]
+        return sum(counts.values())
+
+    def complete(self, hit: SignatureHit):
+        """Replace a first hit with a copy carrying its context window, and fingerprint it"""
+        with self._lock:
+            current = self.hits.get(hit.pattern)
+            if current is not None and (current.source, current.offset) == (hit.source, hit.offset):
+                self.hits[hit.pattern] = hit
+                self.fingerprints[hit.pattern] = failure_fingerprint(hit.pattern, hit.window)
+
+    def merge(self, hits: Dict[str, SignatureHit], counts: Dict[str, int], error_lines: List[str]):
+        """Add results scanned elsewhere, e.g. by ParallelLogScanner, with complete hits; call in log order"""
+        with self._lock:
+            for pattern, count in counts.items():
+                self.counts[pattern] = self.counts.get(pattern, 0) + count
+            for pattern, hit in hits.items():
+                if pattern not in self.hits:
+                    self.hits[pattern] = hit
+                    self.found[pattern] = self.patterns[pattern]
+                    self.fingerprints[pattern] = failure_fingerprint(pattern, hit.window)
+            self.error_lines.extend(error_lines[:self.MAX_ERROR_LINES - len(self.error_lines)])
+
+    def results(self) -> List[Tuple[str, Dict]]:
+        """Found errors, in ERROR_PATTERNS order"""
+        return [(pattern, info) for pattern, info in self.patterns.items() if pattern in self.found]
+
+    def stream(self, source: str = '', selector: Optional['StepSelector'] = None) -> 'LogStream':
+        return LogStream(self, source, selector)
+
+
+class StepSelector:
+    """Picks the failing step out of a timestamped GitHub job log
+
+    Every job log line starts with an ISO timestamp, and the job's ``steps``
+    metadata gives each step's start and end time, so the failing step is
+    the run of lines between those times. Lines around ``##[error]`` markers
+    up to the end of the step are kept too. Whole chunks outside the step are
+    skipped without looking at individual lines, and nothing after the step
+    is selected, so reading can stop there.
+    """
+
+    ERROR_MARKER = '##[error]'
+    TIMESTAMP = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d')
+
+    def __init__(self, started_at: str, completed_at: str, context: int = 5):
+        # Log timestamps are UTC with sub-second precision; step times may carry an
+        # offset such as -08:00, so normalize them to UTC and compare whole seconds
+        self.start = self._utc_seconds(started_at)
+        self.end = self._utc_seconds(completed_at)
+        self.context = context
+        self.seen_timestamps = False
+        # True once the log is past the step and no error context is pending
+        self.finished = False
+        self._timestamp = ''
+        self._after = 0
+        self._before: deque = deque(maxlen=context)
+
+    @classmethod
+    def for_job(cls, job: Dict, context: int = 5) -> Optional['StepSelector']:
+        """Selector for the failed steps of a job, or None if the job has no usable step data"""
+        failed = [step for step in job.get('steps') or []
+                  if step.get('conclusion') == 'failure' and step.get('started_at') and step.get('completed_at')]
+        if not failed:
+            return None
+        return cls(failed[0]['started_at'], failed[-1]['completed_at'], context)
+
+    @staticmethod
+    def _utc_seconds(value: str) -> str:
+        return parse_timestamp(value).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def _line_timestamp(self, line: str) -> Optional[str]:
+        if len(line) >= 19 and line[10] == 'T' and self.TIMESTAMP.match(line):
+            return line[:19]
+        return None
+
+    def select(self, text: str, base_offset: int, base_line: int) -> List[Tuple[str, int, int]]:
+        """(text, offset, line number) blocks of complete lines that should be scanned"""
+        if self.ERROR_MARKER not in text and not self._after:
+            first = self._line_timestamp(text)
+            last_start = text.rfind('\n') + 1
+            last = self._line_timestamp(text[last_start:])
+            if first and last:
+                self.seen_timestamps = True
+                if last < self.start:
+                    self._timestamp = last
+                    self._remember_tail(text, base_offset, base_line)
+                    return []
+                if first > self.end:
+                    self._timestamp = last
+                    self.finished = True
+                    return []
+                if first >= self.start and last <= self.end:
+                    self._timestamp = last
+                    self._before.clear()
+                    return [(text, base_offset, base_line)]
+        return self._select_lines(text, base_offset, base_line)
+
+    def _remember_tail(self, text: str, base_offset: int, base_line: int):
+        """Keep the last lines of a skipped chunk as context for an error in the next one"""
+        end = len(text)
+        line_no = base_line + text.count('\n')
+        for _ in range(self.context):
+            start = text.rfind('\n', 0, end) + 1
+            self._before.appendleft((text[start:end], base_offset + start, line_no))
+            if start == 0:
+                break
+            end = start - 1
+            line_no -= 1
+
+    def _select_lines(self, text: str, base_offset: int, base_line: int) -> List[Tuple[str, int, int]]:
+        blocks: List[Tuple[str, int, int]] = []
+        block_start: Optional[int] = None
+        block_line = 0
+        pos, line_no = 0, base_line
+        for line in text.split('\n'):
+            timestamp = self._line_timestamp(line)
+            if timestamp:
+                self.seen_timestamps = True
+                self._timestamp = timestamp
+            in_step = self.start <= self._timestamp <= self.end
+            if self.ERROR_MARKER in line and self._timestamp <= self.end:
+                if block_start is None:
+                    blocks.extend(self._before)
+                self._before.clear()
+                selected = True
+                self._after = self.context
+            elif self._after:
+                selected = True
+                self._after -= 1
+            else:
+                selected = in_step
+
+            if selected:
+                if block_start is None:
+                    block_start, block_line = pos, line_no
+            else:
+                if block_start is not None:
+                    blocks.append((text[block_start:pos - 1], base_offset + block_start, block_line))
+                    block_start = None
+                self._before.append((line, base_offset + pos, line_no))
+            pos += len(line) + 1
+            line_no += 1
+        if block_start is not None:
+            blocks.append((text[block_start:], base_offset + block_start, block_line))
+        self.finished = self._timestamp > self.end and not self._after
+        return blocks
+
+
+class LogStream:
+    """Per-log decoder and line carry feeding a shared LogMatcher"""
+
+    def __init__(self, matcher: LogMatcher, source: str = '', selector: Optional[StepSelector] = None):
+        self.matcher = matcher
+        self.source = source
+        self.selector = selector
+        # Signature hits found in this log
+        self.matches = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._carry = ''
+        self.bytes_read = 0
+        self.lines_read = 0
+        # Character offset and line number of the start of the carried text
+        self._offset = 0
+        self._line = 1
+        # Last lines scanned, the context before hits at the start of the next text
+        self._tail: deque = deque(maxlen=FINGERPRINT_CONTEXT)
+        # First hits still waiting for the lines after them
+        self.pending: List[SignatureHit] = []
+
+    def reposition(self, offset: int):
+        """Continue from a known offset into the log whose line number is unknown"""
+        self._offset = offset
+        self._line = 0
+
+    def _scan(self, text: str):
+        if self.pending:
+            self._extend_pending(text.split('\n', FINGERPRINT_CONTEXT)[:FINGERPRINT_CONTEXT])
+        new_hits: List[SignatureHit] = []
+        if self.selector is None:
+            self.matches += self.matcher.scan(text, self.source, self._offset, self._line, new_hits)
+        else:
+            for block, offset, line_no in self.selector.select(text, self._offset, self._line):
+                self.matches += self.matcher.scan(block, self.source, offset, line_no, new_hits)
+        for hit in new_hits:
+            # Context comes from the whole text, also where the selector skipped lines
+            before, after = context_lines(text, hit.offset - self._offset, self._tail)
+            hit = hit._replace(before=before, after=after)
+            if len(after) < FINGERPRINT_CONTEXT:
+                self.pending.append(hit)
+            else:
+                self.matcher.complete(hit)
+        self._tail.extend(text.rsplit('\n', FINGERPRINT_CONTEXT)[-FINGERPRINT_CONTEXT:])
+        self._offset += len(text) + 1
+        lines = text.count('\n') + 1
+        self.lines_read += lines
+        if self._line > 0:
+            self._line += lines
+
+    def feed(self, chunk: bytes):
+        self.bytes_read += len(chunk)
+        text = self._carry + self._decoder.decode(chunk)
+        cut = text.rfind('\n')
+        if cut < 0:
+            if len(text) > LogMatcher.MAX_CARRY:
+                # Overlong line: drop its head, positions after it become approximate
+                self._offset += len(text) - LogMatcher.MAX_CARRY
+            self._carry = text[-LogMatcher.MAX_CARRY:]
+            return
+        self._scan(text[:cut])
+        self._carry = text[cut + 1:]
+        if len(self._carry) > LogMatcher.MAX_CARRY:
+            self._offset += len(self._carry) - LogMatcher.MAX_CARRY
+            self._carry = self._carry[-LogMatcher.MAX_CARRY:]
+
+    def _extend_pending(self, lines: List[str], final: bool = False):
+        waiting = []
+        for hit in self.pending:
+            hit = hit._replace(after=hit.after + tuple(lines[:FINGERPRINT_CONTEXT - len(hit.after)]))
+            if final or len(hit.after) >= FINGERPRINT_CONTEXT:
+                self.matcher.complete(hit)
+            else:
+                waiting.append(hit)
+        self.pending = waiting
+
+    def close(self):
+        text = self._carry + self._decoder.decode(b'', final=True)
+        self._carry = ''
+        if text:
+            self._scan(text)
+        # The log ended (or reading stopped): the hits get the context there is
+        self._extend_pending([], final=True)
+
+
+_SEGMENT_ENGINES: Dict[Tuple[str, ...], SignatureEngine] = {}
+
+
+def _scan_log_segment(path: str, start: int, end: int,
+                      patterns: Dict[str, Dict]) -> Tuple[Dict[str, SignatureHit], Dict[str, int], int, int, List[str]]:
+    """Process pool task: match bytes [start, end) of a memory-mapped log
+
+    Returns the hits (relative to the segment start and line 1), hit counts,
+    the number of characters and line breaks in the segment and its first
+    error lines.
+    """
+    # The pattern table arrives pickled, so cache engines by content rather than identity
+    key = tuple(patterns)
+    engine = _SEGMENT_ENGINES.get(key)
+    if engine is None:
+        engine = _SEGMENT_ENGINES[key] = SignatureEngine(patterns)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:end].decode('utf-8', errors='replace')
+        # Lines on either side of the segment, for the context of hits near its edges
+        lead_start = max(0, start - LogMatcher.MAX_CARRY)
+        lead = mapped[lead_start:start].decode('utf-8', errors='replace').split('\n')[:-1]
+        if lead_start > 0:
+            lead = lead[1:]
+        trail_end = min(len(mapped), end + LogMatcher.MAX_CARRY)
+        trail = mapped[end:trail_end].decode('utf-8', errors='replace').split('\n')
+        if trail_end < len(mapped) or not trail[-1]:
+            trail = trail[:-1]
+    error_lines: List[str] = []
+    hits, counts = engine.scan(text, error_lines=error_lines, error_limit=LogMatcher.MAX_ERROR_LINES)
+    for pattern, hit in hits.items():
+        before, after = context_lines(text, hit.offset, lead)
+        after += tuple(trail[:FINGERPRINT_CONTEXT - len(after)])
+        hits[pattern] = hit._replace(before=before, after=after)
+    return hits, counts, len(text), text.count('\n'), error_lines
+
+
+class ParallelLogScanner:
+    """Signature matching of large logs spread over a process pool
+
+    The log is spooled to a temporary file that the workers memory-map, so
+    only (path, start, end) ranges are pickled, never log bytes. Ranges end
+    on line breaks, and since every signature matches within one line each
+    range can be scanned on its own; the per-range hits are merged in file
+    order with the characters and lines of the preceding ranges added. The
+    result is exactly that of one single-threaded pass over the whole log.
+    Logs below ``threshold`` bytes are not worth the round trip.
+    """
+
+    def __init__(self, processes: Optional[int] = None, threshold: int = 32 * 1024 * 1024,
+                 segment_size: int = 8 * 1024 * 1024):
+        self.processes = processes or os.cpu_count() or 1
+        self.threshold = threshold
+        self.segment_size = segment_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.processes)
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def segments(self, path: str) -> List[Tuple[int, int]]:
+        """Byte ranges covering the file, each ending just after a line break (or at EOF)"""
+        size = os.path.getsize(path)
+        if not size:
+            return []
+        # Enough segments to keep every process busy, none larger than segment_size
+        step = min(self.segment_size, -(-size // self.processes))
+        ranges = []
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                cut = mapped.find(b'\n', min(start + step, size) - 1)
+                end = size if cut < 0 else cut + 1
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def scan_file(self, path: str, matcher: LogMatcher, source: str = '') -> Tuple[int, int]:
+        """Match a log file into the matcher and return the (bytes, lines) scanned"""
+        ranges = self.segments(path)
+        futures = [self.pool.submit(_scan_log_segment, path, start, end, matcher.patterns)
+                   for start, end in ranges]
+        offset, line = 0, 0
+        for future in futures:
+            hits, counts, chars, breaks, error_lines = future.result()
+            hits = {pattern: hit._replace(source=source, offset=hit.offset + offset, line_no=hit.line_no + line)
+                    for pattern, hit in hits.items()}
+            matcher.merge(hits, counts, error_lines)
+            offset += chars
+            line += breaks
+        if not ranges:
+            return 0, 0
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            # Counted like LogStream: a final line break does not start another line
+            trailing = f.read(1) != b'\n'
+        return ranges[-1][1], line + trailing
+
+    def scan_text(self, text: str, matcher: LogMatcher, source: str = '') -> Tuple[int, int]:
+        """Match an in-memory log by spooling it to a temporary file"""
+        with tempfile.NamedTemporaryFile(prefix='build-log-', suffix='.log') as spool:
+            # Unpaired surrogates become '?', which keeps character offsets unchanged
+            spool.write(text.encode('utf-8', errors='replace'))
+            spool.flush()
+            return self.scan_file(spool.name, matcher, source)
+
+
+class PollScheduler:
+    """Adaptive poll interval driven by run activity and the API rate limit
+
+    Polls every ``active_interval`` seconds while any run is queued or in
+    progress, and backs off exponentially (with jitter) towards
+    ``max_interval`` while everything is idle. When the remaining rate-limit
+    budget would not last until the reset time at the current pace, the
+    interval is stretched so it does.
+    """
+
+    def __init__(self, active_interval: float = 10.0, idle_interval: float = 30.0,
+                 max_interval: float = 300.0, backoff: float = 1.5, jitter: float = 0.2,
+                 reserve: int = 100, history_size: int = 1000):
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.reserve = reserve
+        self.idle_cycles = 0
+        self.history_size = history_size
+        # (timestamp, interval, api calls this cycle, remaining budget) per cycle
+        self.history: List[Tuple[float, float, int, Optional[int]]] = []
+
+    def next_interval(self, active: bool, calls: int, rate_limit: Dict[str, int],
+                      now: Optional[float] = None) -> float:
+        """Seconds to wait before the next cycle"""
+        now = time.time() if now is None else now
+        if active:
+            self.idle_cycles = 0
+            interval = self.active_interval
+        else:
+            interval = min(self.max_interval, self.idle_interval * self.backoff ** self.idle_cycles)
+            self.idle_cycles += 1
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+
+        remaining = rate_limit.get('remaining')
+        reset = rate_limit.get('reset')
+        if remaining is not None and reset is not None and calls > 0:
+            until_reset = max(0.0, reset - now)
+            usable = remaining - self.reserve
+            if usable < calls:
+                # Not even one more cycle fits in the budget: wait for the window to reset
+                interval = max(interval, until_reset + 1)
+            else:
+                # Spread the usable budget evenly over the rest of the window
+                interval = max(interval, until_reset / (usable / calls))
+
+        self.history.append((now, interval, calls, remaining))
+        del self.history[:-self.history_size]
+        return interval
+
+    def summary(self) -> str:
+        if not self.history:
+            return "no cycles yet"
+        _, interval, calls, remaining = self.history[-1]
+        budget = f", {remaining} API calls left" if remaining is not None else ""
+        return f"{calls} API call(s) this cycle{budget}, next poll in {interval:.0f}s"
+
+
+class LogArchive:
+    """Compressed store of downloaded job logs with a token-level inverted index
+
+    Each job log is written once as ``<root>/<run_id>/<job_id>.log.gz``. The
+    distinct words of every log are recorded in a SQLite posting table, so
+    phrase searches only need to intersect posting lists. Words longer than
+    MAX_TOKEN and random-looking ones (DerivedData suffixes, hex digests) are
+    not indexed, since they would only grow the table. The archive is
+    trimmed to ``max_bytes`` of compressed data, oldest logs first.
+    """
+
+    TOKEN = re.compile(r'[A-Za-z][A-Za-z0-9_]+')
+    MAX_TOKEN = 32
+    # All-lowercase runs of 20+ letters (DerivedData hashes) and lowercase letter/digit mixes (digests, ids)
+    RANDOM_TOKEN = re.compile(r'[a-z]{20,}|(?=[a-z]*[0-9])(?=[0-9]*[a-z])[a-z0-9]{8,}')
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS logs (
+        job_id INTEGER PRIMARY KEY,
+        run_id INTEGER NOT NULL,
+        workflow TEXT,
+        job_name TEXT,
+        created_at TEXT,
+        size INTEGER,
+        stored_size INTEGER,
+        archived_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS postings (
+        token TEXT NOT NULL,
+        job_id INTEGER NOT NULL,
+        PRIMARY KEY (token, job_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS postings_job ON postings (job_id);
+    """
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(self.SCHEMA)
+
+    @classmethod
+    def tokens(cls, text: str) -> List[str]:
+        """Lower-cased words of a text that are worth indexing"""
+        return [token.lower() for token in cls.TOKEN.findall(text)
+                if len(token) <= cls.MAX_TOKEN and not cls.RANDOM_TOKEN.fullmatch(token)]
+
+    def path(self, run_id: int, job_id: int) -> str:
+        return os.path.join(self.root, str(run_id), f'{job_id}.log.gz')
+
+    def contains(self, job_id: int) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM logs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def writer(self, run: Dict, job: Dict) -> Optional['ArchiveWriter']:
+        """Writer for a job log, or None if it is already archived"""
+        if self.contains(job['id']):
+            return None
+        return ArchiveWriter(self, run, job)
+
+    def add(self, run: Dict, job: Dict, size: int, tokens: set):
+        """Index a log whose compressed file was just written"""
+        stored_size = os.path.getsize(self.path(run['id'], job['id']))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO logs "
+                "(job_id, run_id, workflow, job_name, created_at, size, stored_size, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], run['id'], os.path.basename(run.get('path', '')), job.get('name'),
+                 run.get('created_at'), size, stored_size, time.time()))
+            self._db.executemany("INSERT OR IGNORE INTO postings (token, job_id) VALUES (?, ?)",
+                                 ((token, job['id']) for token in tokens))
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        """Delete the oldest archived logs until the archive fits in max_bytes"""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM logs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            oldest = self._db.execute(
+                "SELECT job_id, run_id, stored_size FROM logs ORDER BY archived_at").fetchall()
+            with self._db:
+                for job_id, run_id, stored_size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM postings WHERE job_id = ?", (job_id,))
+                    self._db.execute("DELETE FROM logs WHERE job_id = ?", (job_id,))
+                    try:
+                        os.remove(self.path(run_id, job_id))
+                        os.rmdir(os.path.dirname(self.path(run_id, job_id)))
+                    except OSError:
+                        # Missing file, or other jobs of the run are still archived
+                        pass
+                    total -= stored_size
+
+    def search(self, phrase: str, since: Optional[str] = None, verify: bool = True) -> List[Dict]:
+        """Archived job logs containing ``phrase``
+
+        The index narrows the search to logs holding every indexed word of
+        the phrase; those candidates are then decompressed and checked for
+        the exact phrase. With ``verify`` off only the index is consulted,
+        so the words may appear anywhere in a log.
+        ``since`` is an ISO timestamp compared to the run creation time.
+        """
+        words = sorted(set(self.tokens(phrase)))
+        if not phrase.strip() or not words and not verify:
+            return []
+        query = "SELECT l.run_id, l.job_id, l.workflow, l.job_name, l.created_at FROM logs l WHERE 1"
+        params: List[Any] = []
+        if words:
+            query += (" AND l.job_id IN (SELECT job_id FROM postings WHERE token IN ({}) "
+                      "GROUP BY job_id HAVING COUNT(*) = ?)").format(','.join('?' * len(words)))
+            params += words + [len(words)]
+        if since:
+            query += " AND l.created_at >= ?"
+            params.append(since)
+        query += " ORDER BY l.created_at"
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        results = [dict(zip(('run_id', 'job_id', 'workflow', 'job_name', 'created_at'), row)) for row in rows]
+        if verify:
+            needle = phrase.lower()
+            results = [row for row in results if self._contains_phrase(row, needle)]
+        return results
+
+    def read_chunks(self, run_id: int, job_id: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Decompressed content of an archived log, in chunks"""
+        with gzip.open(self.path(run_id, job_id), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _contains_phrase(self, row: Dict, needle: str) -> bool:
+        try:
+            with gzip.open(self.path(row['run_id'], row['job_id']), 'rt', errors='replace') as f:
+                return any(needle in line.lower() for line in f)
+        except OSError:
+            return False
+
+    def usage(self) -> Tuple[int, int, int]:
+        """(logs, original bytes, stored bytes)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM logs").fetchone()
+
+
+class ArchiveWriter:
+    """Compresses one job log to the archive while collecting its tokens"""
+
+    def __init__(self, archive: LogArchive, run: Dict, job: Dict):
+        self.archive = archive
+        self.run = run
+        self.job = job
+        self.size = 0
+        self.tokens: set = set()
+        self._path = archive.path(run['id'], job['id'])
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._tmp_path = self._path + '.tmp'
+        self._file = gzip.open(self._tmp_path, 'wb')
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._carry = ''
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.size += len(chunk)
+        text = self._carry + self._decoder.decode(chunk)
+        # Keep a trailing partial word for the next chunk
+        match = re.search(r'[A-Za-z0-9_]*$', text)
+        self._carry = text[match.start():][-256:]
+        self.tokens.update(LogArchive.tokens(text[:match.start()]))
+
+    def close(self):
+        self.tokens.update(LogArchive.tokens(self._carry + self._decoder.decode(b'', final=True)))
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+        self.archive.add(self.run, self.job, self.size, self.tokens)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
     def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.samples = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.samples += 1
+
+
+class MonitorMetrics:
+    """Per-phase timings and counters for the build monitor, exported as Prometheus text"""
+
+    PREFIX = 'build_monitor'
+    PHASES = ('poll', 'log_download', 'analyze', 'time_to_first_match', 'apply_fix', 'git', 'cycle',
+              'detection_latency')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in self.PHASES}
+        self.counters: Dict[str, float] = {
+            'api_calls_total': 0,
+            'bytes_downloaded_total': 0,
+            'log_lines_scanned_total': 0,
+            'cycles_total': 0,
+        }
+        self.gauges: Dict[str, float] = {
+            'api_calls_last_cycle': 0,
+            'poll_interval_seconds': 0,
+            'rate_limit_remaining': -1,
+            'log_lines_per_second': 0,
+        }
+        self.pattern_matches: Dict[str, int] = {}
+        self.api_calls_per_cycle = Histogram()
+
+    @contextmanager
+    def time(self, phase: str):
+        """Time the enclosed block into the histogram of a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases.setdefault(phase, Histogram()).observe(seconds)
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def count_matches(self, counts: Dict[str, int]):
+        with self._lock:
+            for pattern, count in counts.items():
+                self.pattern_matches[pattern] = self.pattern_matches.get(pattern, 0) + count
+
+    def end_cycle(self, api_calls: int, interval: float, rate_limit: Dict[str, int]):
+        with self._lock:
+            self.counters['cycles_total'] += 1
+            self.counters['api_calls_total'] += api_calls
+            self.api_calls_per_cycle.observe(api_calls)
+            self.gauges['api_calls_last_cycle'] = api_calls
+            self.gauges['poll_interval_seconds'] = interval
+            self.gauges['rate_limit_remaining'] = rate_limit.get('remaining', -1)
+            analyze = self.phases['analyze'].total
+            if analyze > 0:
+                self.gauges['log_lines_per_second'] = self.counters['log_lines_scanned_total'] / analyze
+
+    @staticmethod
+    def _label(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _histogram_lines(self, name: str, histogram: Histogram, labels: str = '') -> List[str]:
+        lines = []
+        cumulative = 0
+        sep = ',' if labels else ''
+        for bound, count in zip(list(Histogram.BUCKETS) + ['+Inf'], histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {histogram.total:.6f}')
+        lines.append(f'{name}_count{suffix} {histogram.samples}')
+        return lines
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        prefix = self.PREFIX
+        with self._lock:
+            lines = [f'# TYPE {prefix}_phase_seconds histogram']
+            for phase, histogram in self.phases.items():
+                lines += self._histogram_lines(f'{prefix}_phase_seconds', histogram, f'phase="{phase}"')
+            lines.append(f'# TYPE {prefix}_api_calls_per_cycle histogram')
+            lines += self._histogram_lines(f'{prefix}_api_calls_per_cycle', self.api_calls_per_cycle)
+            for name, value in self.counters.items():
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                lines.append(f'{prefix}_{name} {value:g}')
+            for name, value in self.gauges.items():
+                lines.append(f'# TYPE {prefix}_{name} gauge')
+                lines.append(f'{prefix}_{name} {value:g}')
+            lines.append(f'# TYPE {prefix}_pattern_matches_total counter')
+            for pattern, count in self.pattern_matches.items():
+                lines.append(f'{prefix}_pattern_matches_total{{pattern="{self._label(pattern)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Atomically write the metrics to a file (node_exporter textfile style)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> http.server.HTTPServer:
+        """Serve the metrics on http://host:port/metrics from a daemon thread"""
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+        return server
+
+
+class FixTransaction:
+    """File writes planned by fixes, applied together and only where content changes
+
+    Fixes read through the transaction so several fixes touching the same
+    file see each other's pending edits. Writes whose SHA-256 matches the
+    file on disk are dropped, so re-applying a fix is a no-op.
+    """
+
+    def __init__(self):
+        self.writes: Dict[str, str] = {}
+        self.fix_types: List[str] = []
+
+    @staticmethod
+    def _digest(text: Optional[str]) -> Optional[str]:
+        return None if text is None else hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _read_disk(path: str) -> Optional[str]:
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read(self, path: str) -> Optional[str]:
+        """Content of a file including pending writes, or None if it does not exist"""
+        if path in self.writes:
+            return self.writes[path]
+        return self._read_disk(path)
+
+    def write(self, path: str, content: str):
+        self.writes[path] = content
+
+    def changes(self) -> List[Tuple[str, Optional[str], str]]:
+        """(path, current content, new content) for every write that changes a file"""
+        changes = []
+        for path, content in self.writes.items():
+            current = self._read_disk(path)
+            if self._digest(current) != self._digest(content):
+                changes.append((path, current, content))
+        return changes
+
+    def diff(self) -> str:
+        """Unified diff of the planned changes"""
+        chunks = []
+        for path, current, content in self.changes():
+            chunks.extend(difflib.unified_diff(
+                (current or '').splitlines(keepends=True), content.splitlines(keepends=True),
+                fromfile=f'a/{path}' if current is not None else '/dev/null', tofile=f'b/{path}'))
+        return ''.join(chunks)
+
+    def apply(self) -> List[str]:
+        """Write the changed files and return their paths"""
+        touched = []
+        for path, _, content in self.changes():
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+            touched.append(path)
+        self.writes = {}
+        return touched
+
+
+class WebhookReceiver:
+    """Local HTTP endpoint for GitHub workflow_run / workflow_job webhook deliveries
+
+    Deliveries are checked against the X-Hub-Signature-256 HMAC of the shared
+    secret and failed runs are put on ``events`` as ``(workflow, run)`` or
+    ``('job', run_id)`` items for the monitor thread to process.
+    """
+
+    def __init__(self, secret: str, host: str = '127.0.0.1', port: int = 8787,
+                 repository: str = f"{REPO_OWNER}/{REPO_NAME}", allow_unsigned: bool = False):
+        if not secret and not allow_unsigned:
+            raise ValueError("a webhook secret is required (set GITHUB_WEBHOOK_SECRET)")
+        self.secret = secret.encode('utf-8')
+        self.repository = repository
+        self.events: queue.Queue = queue.Queue()
+        self.deliveries = 0
+        self.rejected = 0
+        receiver = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length', ''))
+                except ValueError:
+                    length = -1
+                if length >= 0:
+                    status = receiver.receive(self.headers.get('X-GitHub-Event', ''),
+                                              self.headers.get('X-Hub-Signature-256', ''),
+                                              self.rfile.read(length))
+                else:
+                    # Without a valid length the body cannot be read, so drop the connection too
+                    status = 400
+                    self.close_connection = True
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='webhooks').start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def verify(self, signature: str, body: bytes) -> bool:
+        if not self.secret:
+            return True
+        expected = 'sha256=' + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def receive(self, event: str, signature: str, body: bytes) -> int:
+        """Validate one delivery, queue it if it reports a failure and return the HTTP status"""
+        if not self.verify(signature, body):
+            self.rejected += 1
+            return 401
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(payload, dict):
+            return 400
+        # Valid JSON of the wrong shape is as malformed as invalid JSON
+        if any(payload.get(field) is not None and not isinstance(payload[field], dict)
+               for field in ('repository', 'workflow_run', 'workflow_job')):
+            return 400
+        if not isinstance((payload.get('workflow_run') or {}).get('path', ''), str):
+            return 400
+        self.deliveries += 1
+
+        repository = (payload.get('repository') or {}).get('full_name')
+        if repository and repository != self.repository:
+            return 202
+        if event == 'workflow_run':
+            run = payload.get('workflow_run') or {}
+            if payload.get('action') == 'completed' and run.get('conclusion') == 'failure':
+                self.events.put((os.path.basename(run.get('path', '')), run))
+        elif event == 'workflow_job':
+            job = payload.get('workflow_job') or {}
+            if payload.get('action') == 'completed' and job.get('conclusion') == 'failure':
+                self.events.put(('job', job.get('run_id')))
+        return 202
+
+
+def discover_workflows(directory: str = WORKFLOWS_DIR) -> List[str]:
+    """File names of the active workflows in a workflows directory"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name for name in names if name.endswith(('.yml', '.yaml')))
+
+
+class BuildMonitor:
+    def __init__(self, client: Optional[GitHubClient] = None, max_workers: int = 1,
+                 state: Optional[StateStore] = None, scheduler: Optional[PollScheduler] = None,
+                 metrics: Optional[MonitorMetrics] = None, dry_run: bool = False,
+                 archive: Optional[LogArchive] = None):
         self.github_token = os.environ.get('GITHUB_TOKEN', '')
-        self.fixes_applied = []
+        self.max_workers = max(1, max_workers)
+        self.client = client or GitHubClient(
+            self.github_token, pool_size=max(4, 2 * self.max_workers),
+            cache=ResponseCache(os.path.join(STATE_DIR, 'http_cache.json')))
+        self.state = state or StateStore(os.path.join(STATE_DIR, 'monitor.db'))
+        if dry_run:
+            # A dry run sees what earlier runs recorded, but what it records itself
+            # (processed runs, errors, fingerprints, cursors) must not outlive it
+            self.state = self.state.snapshot()
+        self.scheduler = scheduler or PollScheduler()
+        self.metrics = metrics or MonitorMetrics()
+        self.dry_run = dry_run
+        self.archive = archive
+        # Match only the failing step of a job log, falling back to a full scan
+        self.focus_failed_steps = True
+        # When set, fetch job logs tail-first with HTTP Range requests of this many bytes
+        self.tail_bytes = 0
+        # Spreads full scans of large logs over a process pool when set
+        self.parallel_scanner: Optional[ParallelLogScanner] = None
+        self._unknown_failures: Dict[int, Tuple[str, int, str]] = {}
+        # Runs whose jobs or logs could not all be read; analyzed again on the next poll
+        self._incomplete_runs: Set[int] = set()
+        # Latest analyzed failed runs: when they were detected and what that cost
+        self.detections: deque = deque(maxlen=1000)
+        # Fix writes of the current cycle, committed together by commit_fixes
+        self.transaction = FixTransaction()
+        self.metrics_file: Optional[str] = None
+        # Set (e.g. by SIGUSR1) to run the next cycle under cProfile
+        self.profile_next_cycle = False
+        # Resume with the fixes a previous run of the monitor already applied
+        self.fixes_applied = self.state.applied_fixes()
+        self._fix_lock = threading.Lock()
+        # Separate pools so log downloads submitted from a polling worker can never starve it
+        self._poll_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='poll')
+        self._log_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='logs')
         
     def get_latest_workflow_run(self, workflow_name: str) -> Optional[Dict]:
         """Get the latest run for a specific workflow"""
-        cmd = f"""
-        curl -s -H "Authorization: token {self.github_token}" \
-        "https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/actions/workflows/{workflow_name}/runs?per_page=1" \
-        | python3 -c "import sys, json; data=json.load(sys.stdin); print(json.dumps(data['workflow_runs'][0] if data.get('workflow_runs') else None))"
-        """
-        
+        url = self.client.repo_url(f"actions/workflows/{workflow_name}/runs", {'per_page': 1})
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0 and result.stdout.strip():
-                return json.loads(result.stdout.strip())
-        except:
-            pass
+            with self.metrics.time('poll'):
+                data = self.client.get_json(url, use_cache=True)
+            if data and data.get('workflow_runs'):
+                return data['workflow_runs'][0]
+        except (GitHubAPIError, OSError, ValueError, http.client.HTTPException) as e:
+            print(f"Error getting runs for {workflow_name}: {e}")
         return None
     
+    def get_failed_jobs(self, run_id: int) -> List[Dict]:
+        """Return the failed or cancelled jobs of a run"""
+        with self.metrics.time('poll'):
+            jobs_data = self.client.get_json(self.client.repo_url(f"actions/runs/{run_id}/jobs"))
+        return [job for job in (jobs_data or {}).get('jobs', [])
+                if job.get('conclusion') in ['failure', 'cancelled']]
+    
+    def _download_job_log(self, job: Dict) -> Optional[str]:
+        """Download the log of a single job"""
+        log_url = job.get('logs_url') or self.client.repo_url(f"actions/jobs/{job['id']}/logs")
+        try:
+            return self.client.get(log_url).text()
+        except (GitHubAPIError, OSError, http.client.HTTPException) as e:
+            print(f"Error getting log for job {job['name']}: {e}")
+            return None
+    
     def get_job_logs(self, run_id: int) -> str:
         """Download and return job logs"""
-        # First get the jobs for this run
-        cmd = f"""
-        curl -s -H "Authorization: token {self.github_token}" \
-        "https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/actions/runs/{run_id}/jobs"
-        """
-        
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                jobs_data = json.loads(result.stdout)
-                
-                # Download logs for each failed job
-                all_logs = []
-                for job in jobs_data.get('jobs', []):
-                    if job['conclusion'] in ['failure', 'cancelled']:
-                        log_url = job['logs_url']
-                        log_cmd = f'curl -s -H "Authorization: token {self.github_token}" "{log_url}"'
-                        log_result = subprocess.run(log_cmd, shell=True, capture_output=True, text=True)
-                        if log_result.returncode == 0:
-                            all_logs.append(f"=== Job: {job['name']} ===\n{log_result.stdout}")
-                
-                return "\n\n".join(all_logs)
+            # Download logs for each failed job, in parallel when workers are available
+            jobs = self.get_failed_jobs(run_id)
+            self.state.record_jobs(run_id, jobs)
+            if self.max_workers > 1 and len(jobs) > 1:
+                log_texts = list(self._log_pool.map(self._download_job_log, jobs))
+            else:
+                log_texts = [self._download_job_log(job) for job in jobs]
+            
+            all_logs = []
+            for job, log_text in zip(jobs, log_texts):
+                if log_text is not None:
+                    all_logs.append(f"=== Job: {job['name']} ===\n{log_text}")
+            
+            return "\n\n".join(all_logs)
         except Exception as e:
             print(f"Error getting logs: {e}")
         
         return ""
     
+    def _scan_job_log(self, job: Dict, matcher: LogMatcher, run: Optional[Dict] = None) -> int:
+        """Stream one job log into the matcher, stopping once every signature is found
+
+        Unless focus_failed_steps is off, only the failing step and the lines
+        around ##[error] markers are matched; the whole log is scanned as a
+        fallback when that finds nothing. When the log archive is enabled the
+        whole log is read and archived.
+        """
+        log_url = job.get('logs_url') or self.client.repo_url(f"actions/jobs/{job['id']}/logs")
+        writer = self.archive.writer(run, job) if self.archive is not None and run else None
+        if (matcher.done or matcher.settled) and writer is None:
+            return 0
+        if self.tail_bytes and writer is None:
+            return self._scan_job_log_tail(job, matcher, log_url)
+        selector = StepSelector.for_job(job) if self.focus_failed_steps else None
+        if selector is None and writer is None:
+            return self._scan_full_log(job, matcher, log_url)
+        stream = matcher.stream(job.get('name', ''), selector)
+        # Keep what the step pass reads, so a fallback scan does not download it again
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) if writer is None else None
+        progress = {'complete': False}
+        chunks = self.client.stream(log_url)
+        if spool is not None:
+            chunks = self._tee(chunks, spool, progress)
+        try:
+            bytes_read = self._feed_log(job, chunks, stream, writer)
+            
+            if selector and not stream.matches and not matcher.done and not matcher.settled:
+                # Nothing in the failing step (or the log has no timestamps): scan everything
+                if self.archive is not None and run and self.archive.contains(job['id']):
+                    stream = matcher.stream(job.get('name', ''))
+                    bytes_read += self._feed_log(job, self.archive.read_chunks(run['id'], job['id']), stream, None)
+                elif spool is not None:
+                    bytes_read += self._rescan_spooled(job, matcher, log_url, spool, progress['complete'])
+                else:
+                    bytes_read += self._scan_full_log(job, matcher, log_url)
+        finally:
+            if spool is not None:
+                spool.close()
+        return bytes_read
+    
+    @staticmethod
+    def _tee(chunks: Iterator[bytes], spool, progress: Dict[str, bool]) -> Iterator[bytes]:
+        """Yield chunks while copying them to spool; progress['complete'] is set at the end of the body"""
+        for chunk in chunks:
+            spool.write(chunk)
+            yield chunk
+        progress['complete'] = True
+    
+    def _rescan_spooled(self, job: Dict, matcher: LogMatcher, log_url: str, spool, complete: bool) -> int:
+        """Scan a whole log from the bytes already read, fetching only the rest with a Range request
+
+        Returns the bytes downloaded.
+        """
+        reused = spool.tell()
+        spool.seek(0)
+        chunks: Iterator[bytes] = iter(lambda: spool.read(64 * 1024), b'')
+        if not complete:
+            chunks = self._chain(chunks, self._log_remainder(job, log_url, reused))
+        stream = matcher.stream(job.get('name', ''))
+        return self._feed_log(job, chunks, stream, None, reused=reused)
+    
+    @staticmethod
+    def _chain(*iterators: Iterator[bytes]) -> Iterator[bytes]:
+        for iterator in iterators:
+            yield from iterator
+    
+    def _log_remainder(self, job: Dict, log_url: str, offset: int) -> Iterator[bytes]:
+        """Log bytes from offset on; skips the known part itself if the server ignores Range"""
+        info: Dict[str, Any] = {}
+        chunks = self.client.stream(log_url, headers={'Range': f'bytes={offset}-'}, info=info)
+        try:
+            first = next(chunks, b'')
+        except GitHubAPIError as e:
+            if e.status == 416:
+                # The spooled bytes were already the whole log
+                return
+            raise
+        skip = offset if info.get('status') != 206 else 0
+        for chunk in self._prepend(first, chunks):
+            if skip:
+                dropped = min(skip, len(chunk))
+                chunk, skip = chunk[dropped:], skip - dropped
+            if chunk:
+                yield chunk
+    
+    def _scan_full_log(self, job: Dict, matcher: LogMatcher, log_url: str) -> int:
+        """Match a whole job log, on the process pool when its Content-Length reaches the threshold"""
+        stream = matcher.stream(job.get('name', ''))
+        scanner = self.parallel_scanner
+        if scanner is None:
+            return self._feed_log(job, self.client.stream(log_url), stream, None)
+        info: Dict[str, Any] = {}
+        chunks = self.client.stream(log_url, info=info)
+        try:
+            first = next(chunks, b'')
+        except (GitHubAPIError, OSError, http.client.HTTPException) as e:
+            print(f"Error getting log for job {job['name']}: {e}")
+            matcher.incomplete = True
+            return 0
+        headers = info.get('headers', {})
+        size = int(headers.get('Content-Length') or headers.get('content-length') or 0)
+        if size < scanner.threshold:
+            return self._feed_log(job, self._prepend(first, chunks), stream, None)
+        
+        started = time.perf_counter()
+        with tempfile.NamedTemporaryFile(prefix='build-log-', suffix='.log') as spool:
+            try:
+                for chunk in self._prepend(first, chunks):
+                    spool.write(chunk)
+            except (GitHubAPIError, OSError, http.client.HTTPException) as e:
+                print(f"Error getting log for job {job['name']}: {e}")
+                matcher.incomplete = True
+            spool.flush()
+            self.metrics.observe('log_download', time.perf_counter() - started)
+            with self.metrics.time('analyze'):
+                bytes_read, lines = scanner.scan_file(spool.name, matcher, job.get('name', ''))
+        self.metrics.inc('bytes_downloaded_total', bytes_read)
+        self.metrics.inc('log_lines_scanned_total', lines)
+        return bytes_read
+    
+    def _scan_job_log_tail(self, job: Dict, matcher: LogMatcher, log_url: str) -> int:
+        """Match a job log from its end, widening the fetched window until a signature is found
+
+        The last ``tail_bytes`` are requested with an HTTP Range header; each
+        further request fetches the preceding segment, twice as large as the
+        previous one, until something matches or the start of the log is
+        reached. The partial first line of every segment is carried over to
+        the end of the next (earlier) one. A server that ignores Range sends
+        the whole log, which is then simply scanned. Offsets of hits are byte
+        offsets and their line numbers are unknown (0).
+        """
+        started = time.perf_counter()
+        name = job.get('name', '')
+        bytes_read = 0
+        size = self.tail_bytes
+        carry = b''
+        end: Optional[int] = None
+        total: Optional[int] = None
+        first_match: Optional[float] = None
+        segments = 0
+        covered = 0
+        
+        while True:
+            info: Dict[str, Any] = {}
+            range_header = f'bytes=-{size}' if end is None else f'bytes={max(0, end - size)}-{end - 1}'
+            chunks = self.client.stream(log_url, headers={'Range': range_header}, info=info)
+            try:
+                first = next(chunks, b'')
+            except GitHubAPIError as e:
+                if e.status == 416:
+                    # Empty log: nothing to match
+                    break
+                print(f"Error getting log for job {name}: {e}")
+                matcher.incomplete = True
+                break
+            except (OSError, http.client.HTTPException) as e:
+                print(f"Error getting log for job {name}: {e}")
+                matcher.incomplete = True
+                break
+            segments += 1
+            
+            if info.get('status') != 206:
+                # Range ignored: this is the whole log
+                stream = matcher.stream(name)
+                bytes_read += self._feed_log(job, self._prepend(first, chunks), stream, None)
+                total = bytes_read
+                start = 0
+            else:
+                content_range = info['headers'].get('Content-Range') or info['headers'].get('content-range', '')
+                match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', content_range)
+                if not match:
+                    print(f"Unexpected Content-Range for job {name}: {content_range!r}")
+                    chunks.close()
+                    break
+                start, last = int(match.group(1)), int(match.group(2))
+                if match.group(3) != '*':
+                    total = int(match.group(3))
+                covered += last - start + 1
+                head: List[bytes] = []
+                stream = matcher.stream(name)
+                bytes_read += self._feed_log(
+                    job, self._segment_chunks(self._prepend(first, chunks), start, head, carry, stream), stream, None)
+                carry = b''.join(head)
+            
+            if stream.matches and first_match is None:
+                first_match = time.perf_counter() - started
+            if stream.matches or matcher.done or start == 0:
+                break
+            # Each widening doubles the part of the log covered so far
+            end = start
+            size = covered
+        
+        self.metrics.inc('tail_fetches_total')
+        self.metrics.inc('tail_segments_total', segments)
+        if total:
+            self.metrics.inc('log_bytes_skipped_total', max(0, total - bytes_read))
+        if first_match is not None:
+            self.metrics.observe('time_to_first_match', first_match)
+        size_note = f" of {total / 1048576:.1f} MB" if total else ""
+        match_note = f", first match after {first_match:.2f}s" if first_match is not None else ", no match"
+        print(f"   tail fetch {name}: {bytes_read / 1048576:.1f} MB{size_note} in {segments} request(s){match_note}")
+        return bytes_read
+    
+    @staticmethod
+    def _prepend(first: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        if first:
+            yield first
+        yield from chunks
+    
+    @staticmethod
+    def _segment_chunks(chunks: Iterator[bytes], start: int, head: List[bytes],
+                        carry: bytes, stream: LogStream) -> Iterator[bytes]:
+        """Yield a log segment without its partial first line (saved to ``head``), then ``carry``"""
+        in_head = start > 0
+        head_size = 0
+        for chunk in chunks:
+            if in_head:
+                cut = chunk.find(b'\n')
+                if cut < 0:
+                    head.append(chunk)
+                    head_size += len(chunk)
+                    continue
+                head.append(chunk[:cut])
+                stream.reposition(start + head_size + cut + 1)
+                chunk = chunk[cut + 1:]
+                in_head = False
+            if chunk:
+                yield chunk
+        if in_head:
+            # No line break in the whole segment: it all continues into the carried line
+            head.append(carry)
+        elif carry:
+            yield carry
+    
+    def _feed_log(self, job: Dict, chunks: Iterator[bytes], stream: LogStream,
+                  writer: Optional[ArchiveWriter], reused: int = 0) -> int:
+        """Feed log chunks to a stream (and archive writer), recording download/analysis metrics
+
+        Returns the bytes downloaded: what the stream read less the first
+        ``reused`` bytes, which came from an earlier read of the same log.
+        """
+        started = time.perf_counter()
+        analyzing = 0.0
+        try:
+            for chunk in chunks:
+                if writer:
+                    writer.write(chunk)
+                feed_started = time.perf_counter()
+                stream.feed(chunk)
+                analyzing += time.perf_counter() - feed_started
+                # Hits near the end of a chunk still need the lines after them for their fingerprint
+                if writer is None and not stream.pending and (
+                        stream.matcher.done or stream.matcher.settled or (stream.selector and stream.selector.finished)):
+                    break
+            if writer:
+                writer.close()
+                writer = None
+        except (GitHubAPIError, OSError, http.client.HTTPException) as e:
+            print(f"Error getting log for job {job['name']}: {e}")
+            stream.matcher.incomplete = True
+        if writer:
+            writer.abort()
+        feed_started = time.perf_counter()
+        stream.close()
+        analyzing += time.perf_counter() - feed_started
+        # Download and analysis are interleaved; split the wall time between the two phases
+        self.metrics.observe('log_download', time.perf_counter() - started - analyzing)
+        self.metrics.observe('analyze', analyzing)
+        # A stream that stopped inside the reused part downloaded nothing new
+        downloaded = max(0, stream.bytes_read - reused)
+        self.metrics.inc('bytes_downloaded_total', downloaded)
+        self.metrics.inc('log_lines_scanned_total', stream.lines_read)
+        return downloaded
+    
+    def scan_job_logs(self, run_id: int, run: Optional[Dict] = None) -> List[Tuple[str, Dict]]:
+        """Stream the failed job logs of a run through the matcher with bounded memory
+
+        Reading stops, and later jobs are skipped, as soon as every hit is a
+        failure whose fix already went out; those hits are returned with
+        ``handled`` set. When the jobs or a log could not be read completely
+        the run is noted in ``_incomplete_runs`` and handle_result leaves it
+        for the next poll.
+        """
+        matcher = LogMatcher(handled=self.state.handled_fingerprints())
+        try:
+            jobs = self.get_failed_jobs(run_id)
+        except (GitHubAPIError, OSError, ValueError, http.client.HTTPException) as e:
+            print(f"Error getting jobs for run {run_id}: {e}")
+            self._incomplete_runs.add(run_id)
+            return []
+        self.state.record_jobs(run_id, jobs)
+        if self.max_workers > 1 and len(jobs) > 1:
+            list(self._log_pool.map(lambda job: self._scan_job_log(job, matcher, run), jobs))
+        else:
+            for job in jobs:
+                self._scan_job_log(job, matcher, run)
+        self.metrics.count_matches(matcher.counts)
+        if matcher.incomplete:
+            self._incomplete_runs.add(run_id)
+        if matcher.settled:
+            self.metrics.inc('runs_short_circuited_total')
+        if not matcher.found and matcher.error_lines:
+            self._record_unknown_failure(run_id, matcher.error_lines)
+        # Attach where each signature was first seen, and its fingerprint, so it can be reported
+        errors = []
+        for pattern, info in matcher.results():
+            hit = matcher.hits[pattern]
+            fingerprint = matcher.fingerprints.get(pattern) or failure_fingerprint(pattern, hit.window)
+            errors.append((pattern, {**info, 'hit': hit, 'fingerprint': fingerprint,
+                                     'handled': fingerprint in matcher.handled}))
+        return errors
+    
+    def _record_unknown_failure(self, run_id: int, error_lines: List[str]):
+        """Cluster a failure no signature matched by the fingerprint of its first error line"""
+        line = error_lines[0]
+        signature = failure_fingerprint('', [line])
+        occurrences = self.state.record_unknown_failure(signature, normalize_log_line(line), run_id)
+        # Reported by handle_result so it is printed under its run
+        self._unknown_failures[run_id] = (signature, occurrences, line)
+    
     def analyze_logs(self, logs: str) -> List[Tuple[str, Dict]]:
         """Analyze logs and identify errors"""
-        found_errors = []
+        matcher = LogMatcher()
+        with self.metrics.time('analyze'):
+            if self.parallel_scanner is not None and len(logs) >= self.parallel_scanner.threshold:
+                self.parallel_scanner.scan_text(logs, matcher)
+            else:
+                matcher.scan(logs)
+        self.metrics.inc('log_lines_scanned_total', logs.count('\n') + 1 if logs else 0)
+        self.metrics.count_matches(matcher.counts)
+        return matcher.results()
+    
+    def _read_file(self, path: str) -> Optional[str]:
+        """Read a file as the pending fix transaction sees it"""
+        return self.transaction.read(path)
+    
+    def _write_file(self, path: str, content: str):
+        """Plan a file write in the current fix transaction"""
+        self.transaction.write(path, content)
+    
+    def commit_fixes(self) -> List[str]:
+        """Write the fixes planned this cycle and push them as a single commit
+
+        Files whose content is already correct are not rewritten, only the
+        touched paths are staged, and nothing is committed when no file
+        changed. In dry-run mode the planned diff is printed instead.
+        """
+        transaction, self.transaction = self.transaction, FixTransaction()
+        if not transaction.writes:
+            return []
         
-        for pattern, error_info in ERROR_PATTERNS.items():
-            if re.search(pattern, logs, re.IGNORECASE):
-                found_errors.append((pattern, error_info))
-                
-        return found_errors
+        if self.dry_run:
+            diff = transaction.diff()
+            print("\n🔍 Dry run, planned changes:" if diff else "\n🔍 Dry run, no file would change")
+            if diff:
+                print(diff)
+            return []
+        
+        touched = transaction.apply()
+        if touched:
+            self._commit_and_push_fix(', '.join(transaction.fix_types) or 'fixes', touched)
+        else:
+            print("   Fixes already in place, nothing to commit")
+        return touched
     
     def apply_fix(self, fix_type: str) -> bool:
         """Apply a specific fix to the codebase"""
         print(f"Applying fix: {fix_type}")
         
-        if fix_type == "remove_firebase_imports":
-            return self._remove_firebase_imports()
-        elif fix_type == "fix_file_paths":
-            return self._fix_file_paths()
-        elif fix_type == "create_missing_files":
-            return self._create_missing_files()
-        elif fix_type == "simplify_swift_code":
-            return self._simplify_swift_code()
-        elif fix_type == "remove_build_phases":
-            return self._remove_build_phases()
-        elif fix_type == "disable_code_signing":
-            return self._disable_code_signing()
-        
-        return False
+        fixes = {
+            "remove_firebase_imports": self._remove_firebase_imports,
+            "create_missing_files": self._create_missing_files,
+            "simplify_swift_code": self._simplify_swift_code,
+            "disable_code_signing": self._disable_code_signing,
+        }
+        # ERROR_PATTERNS also names fixes (fix_file_paths, remove_build_phases) with no implementation yet
+        fix = fixes.get(fix_type)
+        if fix is None:
+            print(f"⚠️  No automatic fix available for {fix_type}, skipping")
+            return False
+        return fix()
     
     def _remove_firebase_imports(self) -> bool:
         """Remove or comment out Firebase imports"""
@@ -239,8 +2415,7 @@ jobs:
         path: FlirtFrame.ipa
 '''
         
-        with open('.github/workflows/build-no-firebase.yml', 'w') as f:
-            f.write(workflow_content)
+        self._write_file('.github/workflows/build-no-firebase.yml', workflow_content)
         
         return True
     
@@ -249,7 +2424,7 @@ jobs:
         print("Creating missing files...")
         
         # Ensure Info.plist exists
-        if not os.path.exists('Info.plist'):
+        if self._read_file('Info.plist') is None:
             info_plist = '''<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
@@ -278,8 +2453,7 @@ jobs:
     <string>To capture photos for analysis</string>
 </dict>
 </plist>'''
-            with open('Info.plist', 'w') as f:
-                f.write(info_plist)
+            self._write_file('Info.plist', info_plist)
         
         return True
     
@@ -381,9 +2555,7 @@ struct ImagePicker: UIViewControllerRepresentable {
 '''
         
         # Create minimal app file
-        os.makedirs('Sources/Minimal', exist_ok=True)
-        with open('Sources/Minimal/MinimalApp.swift', 'w') as f:
-            f.write(minimal_app)
+        self._write_file('Sources/Minimal/MinimalApp.swift', minimal_app)
         
         # Create workflow for minimal build
         self._create_minimal_workflow()
@@ -450,8 +2622,7 @@ jobs:
         path: FlirtFrame.ipa
 '''
         
-        with open('.github/workflows/build-minimal.yml', 'w') as f:
-            f.write(workflow)
+        self._write_file('.github/workflows/build-minimal.yml', workflow)
     
     def _disable_code_signing(self) -> bool:
         """Ensure code signing is completely disabled"""
@@ -464,76 +2635,529 @@ jobs:
         ]
         
         for workflow_file in workflow_files:
-            if os.path.exists(workflow_file):
-                with open(workflow_file, 'r') as f:
-                    content = f.read()
-                
-                # Add more code signing disable flags
-                content = content.replace(
-                    'CODE_SIGNING_REQUIRED=NO',
-                    'CODE_SIGNING_REQUIRED=NO CODE_SIGNING_ALLOWED=NO DEVELOPMENT_TEAM="" CODE_SIGN_IDENTITY=""'
+            content = self._read_file(workflow_file)
+            if content is not None:
+                # Add more code signing disable flags, skipping lines that already have them
+                content = re.sub(
+                    r'CODE_SIGNING_REQUIRED=NO(?! CODE_SIGNING_ALLOWED=NO)',
+                    'CODE_SIGNING_REQUIRED=NO CODE_SIGNING_ALLOWED=NO DEVELOPMENT_TEAM="" CODE_SIGN_IDENTITY=""',
+                    content
                 )
                 
-                with open(workflow_file, 'w') as f:
-                    f.write(content)
+                self._write_file(workflow_file, content)
         
         return True
     
-    def monitor_and_fix(self):
-        """Main monitoring loop"""
-        print(f"Starting build monitor for {REPO_OWNER}/{REPO_NAME}")
+    def check_workflow(self, workflow: str) -> Tuple[str, Optional[Dict], List[Tuple[str, Dict]]]:
+        """Fetch the latest run of a workflow and, if it failed, download and analyze its logs
+
+        Only performs network I/O and analysis, so it is safe to call from
+        worker threads; fixes are applied by the caller. Runs that the state
+        store already marks as processed are returned as ``None``.
+        """
+        return self.check_run(workflow, self.get_latest_workflow_run(workflow))
+    
+    def check_run(self, workflow: str, run: Optional[Dict]) -> Tuple[str, Optional[Dict], List[Tuple[str, Dict]]]:
+        """Download and analyze the logs of a run if it failed and was not processed yet"""
+        errors = []
+        if run and run['status'] == 'completed':
+            if self.state.is_run_processed(run):
+                return workflow, None, errors
+            if run['conclusion'] == 'failure':
+                calls, received = self.client.requests_made, self.client.bytes_received
+                errors = self.scan_job_logs(run['id'], run)
+                if run['id'] not in self._incomplete_runs:
+                    self._record_detection(workflow, run, errors, self.client.requests_made - calls,
+                                           self.client.bytes_received - received)
+        return workflow, run, errors
+    
+    def _record_detection(self, workflow: str, run: Dict, errors: List[Tuple[str, Dict]],
+                          calls: int, received: int):
+        """Note when a failed run was analyzed, relative to its completion (updated_at)
+
+        API calls and bytes are client totals over the analysis, so they
+        include other workflows' traffic when polling concurrently.
+        """
+        detected = time.time()
+        latency = None
+        if run.get('updated_at'):
+            completed = datetime.strptime(run['updated_at'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+            latency = max(0.0, detected - completed.timestamp())
+            self.metrics.observe('detection_latency', latency)
+        self.detections.append({
+            'run_id': run['id'],
+            'workflow': workflow,
+            'detected_at': detected,
+            'latency': latency,
+            'errors': [pattern for pattern, _ in errors],
+            'api_calls': calls,
+            'bytes': received,
+        })
+    
+    def handle_result(self, workflow: str, run: Optional[Dict], errors: List[Tuple[str, Dict]],
+                      history: bool = False) -> bool:
+        """Report a workflow check and apply fixes for the errors it found
+
+        With ``history`` (backfill) the errors and fingerprints are recorded
+        but no fix is applied and the run is not marked processed, so the
+        live monitor still fixes it if it is the latest run of its workflow.
+        Returns False, without reporting or marking the run processed, when
+        its logs could not be read completely; the next poll analyzes it again.
+        """
+        if run and run['id'] in self._incomplete_runs:
+            self._incomplete_runs.discard(run['id'])
+            self._unknown_failures.pop(run['id'], None)
+            print(f"\n⚠️  Could not read all logs of run {run['id']} ({workflow}), it will be analyzed again")
+            return False
+        self._report_and_fix(workflow, run, errors, apply_fixes=not history)
+        if run and run['status'] == 'completed' and history:
+            self.state.record_run(workflow, run)
+        elif run and run['status'] == 'completed':
+            # Fixes are planned by now (commit_fixes writes them at the end of the cycle);
+            # marking after them means a crash while fixing analyzes the run again
+            self.state.mark_run_processed(workflow, run)
+        return True
+    
+    def _report_and_fix(self, workflow: str, run: Optional[Dict], errors: List[Tuple[str, Dict]],
+                        apply_fixes: bool = True):
+        """Print the outcome of a run and apply any fixes not applied yet (unless apply_fixes is off)"""
+        if run and run['status'] == 'completed' and run['conclusion'] == 'failure':
+            self.state.record_errors(run['id'], errors)
+            print(f"\n❌ Failed build detected: {workflow}")
+            print(f"   Run ID: {run['id']}")
+            print(f"   Started: {run['created_at']}")
+            
+            if errors:
+                print(f"   Found {len(errors)} error(s):")
+                for pattern, error_info in errors:
+                    print(f"   - {error_info['description']}")
+                    hit = error_info.get('hit')
+                    signature = error_info.get('fingerprint')
+                    if hit:
+                        where = f"line {hit.line_no} (offset {hit.offset})" if hit.line_no > 0 else f"byte {hit.offset}"
+                        print(f"     at {hit.source} {where}: {hit.line.strip()[:200]}")
+                    if signature:
+                        occurrences = self.state.record_fingerprint(signature, pattern, hit.line if hit else '', run['id'])
+                        if error_info.get('handled'):
+                            # Same underlying failure as one whose fix already went out: skip the fix path
+                            print(f"     known failure {signature[:12]} (seen {occurrences}x), already handled")
+                            continue
+                        if occurrences > 1:
+                            print(f"     recurring failure {signature[:12]} (seen {occurrences}x)")
+                    
+                    # Apply fix if not already applied
+                    fix_type = error_info['fix']
+                    if signature and fix_type in self.fixes_applied and not self.dry_run:
+                        self.state.mark_fingerprint_handled(signature, fix_type)
+                    if fix_type not in self.fixes_applied and apply_fixes:
+                        # Fixes touch the working tree and git, never run them concurrently
+                        with self._fix_lock:
+                            with self.metrics.time('apply_fix'):
+                                applied = self.apply_fix(fix_type)
+                            if applied:
+                                self.fixes_applied.append(fix_type)
+                                self.transaction.fix_types.append(fix_type)
+                                if not self.dry_run:
+                                    self.state.record_fix(fix_type, run['id'])
+                                    if signature:
+                                        self.state.mark_fingerprint_handled(signature, fix_type)
+                                print(f"   ✅ Applied fix: {fix_type}")
+            
+            unknown = self._unknown_failures.pop(run['id'], None)
+            if unknown:
+                signature, occurrences, line = unknown
+                print(f"   ❔ No known error pattern; unknown failure {signature[:12]} (seen {occurrences}x):")
+                print(f"      {line.strip()[:200]}")
+        
+        elif run and run['status'] == 'completed' and run['conclusion'] == 'success':
+            print(f"✅ Successful build: {workflow}")
+    
+    def get_repository_runs(self, workflows: List[str], per_page: int = 100,
+                            max_pages: int = 10) -> List[Tuple[str, Dict]]:
+        """Fetch new runs of every monitored workflow with one paginated repository query
+
+        Only runs created since the stored cursor are requested. The cursor
+        never moves past a run that is still queued or in progress, so such
+        runs keep being returned until they complete (run_cycle likewise
+        holds it at runs whose logs could not be read). Without a cursor only
+        the latest run of each workflow is returned, like per-workflow polling.
+        When max_pages cuts a listing short, the runs it did not reach (from
+        the cursor to the oldest run listed) are kept as a backlog range that
+        the next cycles page through, oldest part last, until it is drained.
+        """
+        cursor = self.state.get_meta('runs_cursor')
+        # Created range [since, until] that a listing cut short at max_pages did not reach
+        backlog = json.loads(self.state.get_meta('runs_backlog') or 'null')
+        
+        def list_pages(created: Optional[str], use_cache: bool) -> Tuple[List[Dict], bool]:
+            """Runs of up to max_pages pages, and whether that was all of them"""
+            params: Dict[str, Any] = {'per_page': per_page}
+            if created:
+                params['created'] = created
+            listed: List[Dict] = []
+            for page in range(1, max_pages + 1):
+                params['page'] = page
+                # Only the first page is stable enough to be worth a conditional request
+                with self.metrics.time('poll'):
+                    data = self.client.get_json(self.client.repo_url('actions/runs', params),
+                                                use_cache=use_cache and page == 1)
+                page_runs = (data or {}).get('workflow_runs', [])
+                listed.extend(page_runs)
+                if len(page_runs) < per_page or len(listed) >= (data or {}).get('total_count', 0):
+                    return listed, True
+            return listed, False
+        
+        try:
+            runs, complete = list_pages(f'>={cursor}' if cursor else None, True)
+            if cursor and not complete and runs:
+                # The API lists runs newest first: the ones between the cursor and the
+                # oldest listed run are left for the following cycles
+                oldest = min(run['created_at'] for run in runs)
+                backlog = {'since': backlog['since'] if backlog else cursor,
+                           'until': max(oldest, backlog['until']) if backlog else oldest}
+            elif backlog:
+                older, done = list_pages(f"{backlog['since']}..{backlog['until']}", False)
+                known = {run['id'] for run in runs}
+                runs.extend(run for run in older if run['id'] not in known)
+                until = min((run['created_at'] for run in older), default=backlog['until'])
+                # Stop once drained, or if a whole listing shares one timestamp and paging cannot get past it
+                backlog = None if done or until >= backlog['until'] else {**backlog, 'until': until}
+        except (GitHubAPIError, OSError, ValueError, http.client.HTTPException) as e:
+            print(f"Error listing repository runs: {e}")
+            return []
+        
+        monitored = set(workflows)
+        grouped: List[Tuple[str, Dict]] = []
+        latest_only = set()
+        # The API lists runs newest first
+        for run in runs:
+            workflow = os.path.basename(run.get('path', ''))
+            if workflow not in monitored:
+                continue
+            if not cursor:
+                if workflow in latest_only:
+                    continue
+                latest_only.add(workflow)
+            grouped.append((workflow, run))
+        
+        if runs:
+            pending = [run['created_at'] for run in runs if run['status'] != 'completed']
+            newest = max(run['created_at'] for run in runs)
+            self.state.set_meta('runs_cursor', min(pending) if pending else newest)
+        self.state.set_meta('runs_backlog', json.dumps(backlog) if backlog else '')
+        return grouped
+    
+    def _list_runs_between(self, start: datetime, end: datetime, per_page: int = 100,
+                           allowance: Optional[Callable[[], float]] = None) -> Tuple[List[Dict], datetime]:
+        """Failed runs created in [start, end), listing the pages of a window concurrently
+
+        The API answers at most 1000 runs per query, so windows holding more
+        are split in half. ``allowance`` returns the API requests still
+        available; it is checked before every page and split, and listing
+        stops early when a window no longer fits. Returns the runs and the
+        time up to which they were completely listed (``end`` when done).
+        """
+        def left() -> float:
+            return allowance() if allowance else float('inf')
+        
+        if left() < 1:
+            return [], start
+        created = f"{start.strftime('%Y-%m-%dT%H:%M:%SZ')}..{(end - timedelta(seconds=1)).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        params: Dict[str, Any] = {'status': 'failure', 'created': created, 'per_page': per_page}
+        
+        def page(number: int) -> Dict:
+            with self.metrics.time('poll'):
+                return self.client.get_json(self.client.repo_url('actions/runs', {**params, 'page': number})) or {}
+        
+        first = page(1)
+        total = first.get('total_count', 0)
+        if total > 1000 and end - start > timedelta(minutes=1):
+            middle = start + (end - start) / 2
+            early, reached = self._list_runs_between(start, middle, per_page, allowance)
+            if reached < middle:
+                return early, reached
+            late, reached = self._list_runs_between(middle, end, per_page, allowance)
+            return early + late, reached
+        pages = range(2, -(-min(total, 1000) // per_page) + 1)
+        if len(pages) > left():
+            # A partial window cannot be checkpointed, so leave all of it for later
+            return [], start
+        runs = list(first.get('workflow_runs', []))
+        for data in self._log_pool.map(page, pages):
+            runs.extend(data.get('workflow_runs', []))
+        return runs, end
+    
+    def backfill(self, since: datetime, until: datetime, budget: int = 1000,
+                 window: timedelta = timedelta(days=1), restart: bool = False) -> Dict[str, Any]:
+        """Analyze the failed runs created between since and until that were never processed
+
+        The range is walked oldest first in windows; the failed runs of each
+        window are listed with concurrent paginated queries and analyzed
+        through the normal pipeline (max_workers at a time). Their errors and
+        fingerprints are recorded as history: no fix is applied and no run is
+        marked processed, so the live monitor still fixes the latest ones.
+        After every window the ``backfill`` checkpoint in the state store
+        moves to its end, so an interrupted backfill of the same range
+        resumes there. The client never sends more than ``budget`` API
+        requests: listing checks it before every page and split
+        (checkpointing the part of a split window already listed), each run
+        is only started while the requests made so far leave room for the
+        average cost of a run, and a run cut short by the limit is not
+        recorded and ends the backfill.
+        """
+        workflows = set(discover_workflows())
+        checkpoint = json.loads(self.state.get_meta('backfill') or '{}')
+        key = {'since': since.strftime('%Y-%m-%dT%H:%M:%SZ'), 'until': until.strftime('%Y-%m-%dT%H:%M:%SZ')}
+        start = since
+        if not restart and {k: checkpoint.get(k) for k in key} == key and checkpoint.get('cursor'):
+            start = datetime.strptime(checkpoint['cursor'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+            print(f"Resuming backfill from {checkpoint['cursor']}")
+        
+        summary = {'windows': 0, 'runs_listed': 0, 'runs_analyzed': 0, 'runs_skipped': 0,
+                   'requests': 0, 'complete': False}
+        requests_before = self.client.requests_made
+        analysis_requests = 0
+        run_cost = 4.0
+        
+        def used() -> int:
+            return self.client.requests_made - requests_before
+        
+        # The client refuses any request past the budget; a run cut short by that is left for the resume
+        request_limit, self.client.request_limit = self.client.request_limit, requests_before + budget
+        try:
+            while start < until:
+                end = min(until, start + window)
+                try:
+                    runs, listed = self._list_runs_between(start, end, allowance=lambda: budget - used())
+                except (GitHubAPIError, OSError, ValueError, http.client.HTTPException) as e:
+                    print(f"Error listing runs from {start:%Y-%m-%d %H:%M}: {e}")
+                    break
+                if listed <= start:
+                    # Budget spent before any part of the window was listed
+                    break
+                summary['runs_listed'] += len(runs)
+                waiting = deque()
+                for run in sorted(runs, key=lambda run: run['created_at']):
+                    workflow = os.path.basename(run.get('path', ''))
+                    if workflow not in workflows or run.get('conclusion') != 'failure' or self.state.is_run_recorded(run):
+                        summary['runs_skipped'] += 1
+                        continue
+                    waiting.append((workflow, run))
+                
+                finished = True
+                analysis_before = used()
+                running: Set[Any] = set()
+                while waiting or running:
+                    # Admit runs on the requests actually made so far, max_workers at a time
+                    while finished and waiting and len(running) < self.max_workers:
+                        if used() + run_cost * (len(running) + 1) > budget:
+                            finished = False
+                            break
+                        workflow, run = waiting.popleft()
+                        running.add(self._poll_pool.submit(self.check_run, workflow, run))
+                    if not running:
+                        break
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    results = list(self._completed(done))
+                    finished = finished and len(results) == len(done)
+                    for workflow, run, errors in results:
+                        if self.handle_result(workflow, run, errors, history=True):
+                            summary['runs_analyzed'] += 1
+                        else:
+                            finished = False
+                    if summary['runs_analyzed']:
+                        run_cost = (analysis_requests + used() - analysis_before) / summary['runs_analyzed']
+                analysis_requests += used() - analysis_before
+                if not finished:
+                    # Runs already recorded in this window are skipped on resume
+                    break
+                start = listed
+                self.state.set_meta('backfill', json.dumps({**key, 'cursor': start.strftime('%Y-%m-%dT%H:%M:%SZ')}))
+                if listed < end:
+                    # Only the first part of a split window fitted in the budget
+                    break
+                summary['windows'] += 1
+        finally:
+            self.client.request_limit = request_limit
+        
+        summary['requests'] = used()
+        summary['complete'] = start >= until
+        summary['cursor'] = start.strftime('%Y-%m-%dT%H:%M:%SZ')
+        return summary
+    
+    def run_cycle(self, workflows: List[str], repo_wide: bool = False) -> int:
+        """Check every workflow once, polling them concurrently when max_workers > 1
+
+        With ``repo_wide`` the runs of all workflows come from a single
+        repository query instead of one request per workflow.
+        Returns the number of runs that are still queued or in progress.
+        """
+        if repo_wide:
+            runs = self.get_repository_runs(workflows)
+            if self.max_workers <= 1:
+                results = (self.check_run(workflow, run) for workflow, run in runs)
+            else:
+                futures = [self._poll_pool.submit(self.check_run, workflow, run) for workflow, run in runs]
+                results = self._completed(futures)
+        elif self.max_workers <= 1:
+            results = (self.check_workflow(workflow) for workflow in workflows)
+        else:
+            futures = [self._poll_pool.submit(self.check_workflow, workflow) for workflow in workflows]
+            results = self._completed(futures)
+        
+        active = 0
+        retry: List[str] = []
+        # Results are handled on this thread as they complete, so fixes stay serialized
+        for workflow, run, errors in results:
+            if run and run['status'] != 'completed':
+                active += 1
+            if not self.handle_result(workflow, run, errors):
+                retry.append(run['created_at'])
+        if repo_wide and retry:
+            # Keep the runs to retry inside the next repository query
+            cursor = self.state.get_meta('runs_cursor')
+            self.state.set_meta('runs_cursor', min(retry + ([cursor] if cursor else [])))
+        
+        # All fixes of the cycle go out as one commit and push
+        with self._fix_lock:
+            self.commit_fixes()
+        return active
+    
+    def _completed(self, futures) -> Iterator[Tuple[str, Optional[Dict], List[Tuple[str, Dict]]]]:
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"Error checking workflow: {e}")
+    
+    def monitor_and_fix(self, repo_wide: bool = False, max_cycles: Optional[int] = None):
+        """Main monitoring loop, stopping after ``max_cycles`` cycles if given"""
+        print(f"Starting build monitor for {self.client.owner}/{self.client.repo}")
         print("Monitoring workflows...")
+        if self.max_workers > 1:
+            print(f"Polling concurrently with up to {self.max_workers} workers")
+        if repo_wide:
+            print("Using one repository-wide runs query per cycle")
         
-        workflows = [
-            'build-flirtframe-app.yml',
-            'simple-flirtframe-build.yml',
-            'build-no-firebase.yml',
-            'build-minimal.yml'
-        ]
+        cycles = 0
+        while True:
+            interval = self.monitor_cycle(repo_wide)
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            print(f"\nWaiting {interval:.0f} seconds before next check...")
+            time.sleep(interval)
+    
+    def run_report(self) -> Dict[str, Any]:
+        """API usage and per-failed-run detection latency so far, e.g. after a bounded run"""
+        return {
+            'cycles': int(self.metrics.counters['cycles_total']),
+            'api_calls': self.client.requests_made,
+            'bytes_received': self.client.bytes_received,
+            'detections': list(self.detections),
+        }
+    
+    def print_run_report(self):
+        report = self.run_report()
+        print(f"\n📊 {report['cycles']} cycle(s), {report['api_calls']} API call(s), "
+              f"{report['bytes_received'] / 1048576:.2f} MB received")
+        for detection in report['detections']:
+            latency = f"{detection['latency']:.1f}s" if detection['latency'] is not None else "unknown"
+            print(f"   run {detection['run_id']} ({detection['workflow']}): detected after {latency}, "
+                  f"{detection['api_calls']} call(s), {detection['bytes'] / 1024:.0f} KB, "
+                  f"{len(detection['errors'])} known error(s)")
+    
+    def handle_webhook_event(self, event: Tuple[str, Any]):
+        """Send a failed run reported by a webhook through the normal analysis path"""
+        workflow, run = event
+        if workflow == 'job':
+            # A failed job only names its run; the run itself may still be in progress,
+            # in which case its workflow_run completion event will follow
+            try:
+                with self.metrics.time('poll'):
+                    run = self.client.get_json(self.client.repo_url(f"actions/runs/{run}"))
+            except (GitHubAPIError, OSError, ValueError, http.client.HTTPException) as e:
+                print(f"Error getting run {run}: {e}")
+                return
+            workflow = os.path.basename(run.get('path', ''))
+        if workflow not in discover_workflows():
+            return
+        self.handle_result(*self.check_run(workflow, run))
+        with self._fix_lock:
+            self.commit_fixes()
+    
+    def monitor_webhooks(self, receiver: WebhookReceiver, reconcile_interval: float = 600.0,
+                         repo_wide: bool = False):
+        """Handle webhook deliveries as they arrive, polling only as a slow reconciliation"""
+        receiver.start()
+        print(f"Starting build monitor for {self.client.owner}/{self.client.repo}")
+        print(f"Listening for workflow_run/workflow_job webhooks on port {receiver.port}")
+        print(f"Reconciling by polling every {reconcile_interval:.0f} seconds")
         
+        next_poll = time.time()
         while True:
-            for workflow in workflows:
-                run = self.get_latest_workflow_run(workflow)
-                
-                if run and run['status'] == 'completed' and run['conclusion'] == 'failure':
-                    print(f"\n❌ Failed build detected: {workflow}")
-                    print(f"   Run ID: {run['id']}")
-                    print(f"   Started: {run['created_at']}")
-                    
-                    # Get and analyze logs
-                    logs = self.get_job_logs(run['id'])
-                    errors = self.analyze_logs(logs)
-                    
-                    if errors:
-                        print(f"   Found {len(errors)} error(s):")
-                        for pattern, error_info in errors:
-                            print(f"   - {error_info['description']}")
-                            
-                            # Apply fix if not already applied
-                            fix_type = error_info['fix']
-                            if fix_type not in self.fixes_applied:
-                                if self.apply_fix(fix_type):
-                                    self.fixes_applied.append(fix_type)
-                                    print(f"   ✅ Applied fix: {fix_type}")
-                                    
-                                    # Commit and push the fix
-                                    self._commit_and_push_fix(fix_type)
-                
-                elif run and run['status'] == 'completed' and run['conclusion'] == 'success':
-                    print(f"✅ Successful build: {workflow}")
-            
-            print("\nWaiting 30 seconds before next check...")
-            time.sleep(30)
+            timeout = next_poll - time.time()
+            if timeout <= 0:
+                self.monitor_cycle(repo_wide)
+                next_poll = time.time() + reconcile_interval
+                continue
+            try:
+                event = receiver.events.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            self.handle_webhook_event(event)
+    
+    def monitor_cycle(self, repo_wide: bool = False) -> float:
+        """Run one monitoring cycle, record its metrics and return the next poll interval"""
+        profiler = None
+        if self.profile_next_cycle:
+            self.profile_next_cycle = False
+            profiler = cProfile.Profile()
+            profiler.enable()
+        
+        # Re-discovered every cycle so workflows written by fixes are picked up
+        workflows = discover_workflows()
+        calls_before = self.client.requests_made
+        with self.metrics.time('cycle'):
+            active = self.run_cycle(workflows, repo_wide)
+        calls = self.client.requests_made - calls_before
+        
+        if profiler:
+            profiler.disable()
+            self._dump_profile(profiler)
+        
+        if self.client.cache:
+            self.client.cache.save()
+            print(f"\nAPI {self.client.cache.stats()}")
+        
+        interval = self.scheduler.next_interval(active > 0, calls, self.client.rate_limit)
+        print(f"{self.scheduler.summary()}")
+        self.metrics.end_cycle(calls, interval, self.client.rate_limit)
+        if self.metrics_file:
+            self.metrics.write(self.metrics_file)
+        return interval
     
-    def _commit_and_push_fix(self, fix_type: str):
+    def _dump_profile(self, profiler: cProfile.Profile):
+        """Save a cycle profile under STATE_DIR and print its hottest functions"""
+        os.makedirs(STATE_DIR, exist_ok=True)
+        path = os.path.join(STATE_DIR, f"cycle-{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof")
+        profiler.dump_stats(path)
+        print(f"\n📈 Cycle profile written to {path}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    
+    def _commit_and_push_fix(self, fix_type: str, paths: List[str]):
         """Commit and push the applied fix"""
+        with self.metrics.time('git'):
+            self._git_commit_and_push(fix_type, paths)
+    
+    def _git_commit_and_push(self, fix_type: str, paths: List[str]):
         try:
-            # Stage all changes
-            subprocess.run(['git', 'add', '-A'], check=True)
+            # Stage only the files the fixes touched
+            subprocess.run(['git', 'add', '--'] + paths, check=True)
             
             # Commit
             commit_msg = f"Auto-fix: {fix_type.replace('_', ' ').title()}\n\nAutomatically applied by build monitor"
-            subprocess.run(['git', 'commit', '-m', commit_msg], check=True)
+            subprocess.run(['git', 'commit', '-m', commit_msg, '--'] + paths, check=True)
             
             # Push
             subprocess.run(['git', 'push', 'origin', 'main'], check=True)
@@ -543,13 +3167,288 @@ jobs:
             print(f"   ⚠️  Could not push fix: {e}")
 
 
+def load_repositories(path: str) -> List[Dict[str, str]]:
+    """Read the repositories to monitor from a JSON file
+
+    The file holds a list of objects with ``repo`` ("owner/name"), ``path``
+    (a local checkout that fixes are applied to) and optionally
+    ``token_env``, the environment variable holding that repository's token.
+    """
+    with open(path, 'r') as f:
+        repos = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for entry in repos:
+        if '/' not in entry.get('repo', ''):
+            raise ValueError(f"repository entry needs 'repo': 'owner/name': {entry}")
+        entry['path'] = os.path.normpath(os.path.join(base, entry.get('path', '.')))
+        entry.setdefault('token_env', 'GITHUB_TOKEN')
+    return repos
+
+
+def build_repository_monitor(entry: Dict[str, str], options: Dict[str, Any]) -> BuildMonitor:
+    """BuildMonitor for one repository with its own client, rate-limit budget and state"""
+    owner, name = entry['repo'].split('/', 1)
+    state_dir = os.path.join(entry['path'], STATE_DIR)
+    client = GitHubClient(os.environ.get(entry['token_env'], ''), owner=owner, repo=name,
+                          pool_size=max(4, 2 * options.get('concurrency', 1)),
+                          cache=ResponseCache(os.path.join(state_dir, 'http_cache.json')))
+    scheduler = PollScheduler(options.get('active_interval', 10.0), options.get('idle_interval', 30.0),
+                              options.get('max_interval', 300.0))
+    archive = None
+    if options.get('archive'):
+        archive = LogArchive(os.path.join(state_dir, 'archive'), options.get('archive_max_mb', 1024) * 1024 * 1024)
+    monitor = BuildMonitor(client, max_workers=options.get('concurrency', 1),
+                           state=StateStore(os.path.join(state_dir, 'monitor.db')),
+                           scheduler=scheduler, dry_run=options.get('dry_run', False), archive=archive)
+    monitor.focus_failed_steps = not options.get('full_scan', False)
+    monitor.tail_bytes = options.get('tail_bytes', 0)
+    if options.get('metrics_file'):
+        # One file per repository, e.g. metrics.owner--name.prom for a textfile collector
+        root, ext = os.path.splitext(options['metrics_file'])
+        monitor.metrics_file = f"{root}.{owner}--{name}{ext}"
+    return monitor
+
+
+def _shard_worker(work: multiprocessing.Queue, results: multiprocessing.Queue, options: Dict[str, Any]):
+    """Worker process: run one monitor cycle for each repository taken from its own work queue
+
+    Only this process ever sees its repositories, so each keeps a single
+    monitor with its fix history, response cache, backoff and rate-limit
+    budget. Large logs of all of them share one process pool.
+    """
+    monitors: Dict[str, BuildMonitor] = {}
+    scanner = None
+    if options.get('scan_processes', 1) > 1:
+        scanner = ParallelLogScanner(options['scan_processes'], options.get('parallel_scan_bytes', 32 * 1024 * 1024))
+    try:
+        while True:
+            entry = work.get()
+            if entry is None:
+                break
+            repo = entry['repo']
+            interval = options.get('idle_interval', 30.0)
+            try:
+                # Fixes, workflow discovery and git all work relative to the checkout
+                os.chdir(entry['path'])
+                if repo not in monitors:
+                    monitors[repo] = build_repository_monitor(entry, options)
+                    monitors[repo].parallel_scanner = scanner
+                print(f"\n[{os.getpid()}] {repo}")
+                interval = monitors[repo].monitor_cycle(options.get('repo_wide', False))
+            except Exception as e:
+                print(f"[{os.getpid()}] Error monitoring {repo}: {e}")
+            results.put((repo, interval))
+    finally:
+        if scanner is not None:
+            scanner.close()
+
+
+def monitor_repositories(repos: List[Dict[str, str]], workers: int, options: Dict[str, Any]):
+    """Shard the repositories over worker processes, each with its own work queue
+
+    Repositories are pinned to workers round-robin in file order, so all
+    cycles of a repository run in the same process against the same
+    monitor state. A repository is queued again only after its previous
+    cycle has reported back, so its fixes and pushes never run
+    concurrently, while different repositories are polled and analyzed in
+    parallel.
+    """
+    if options.get('metrics_file'):
+        # Workers change into each checkout, so resolve the path here
+        options = {**options, 'metrics_file': os.path.abspath(options['metrics_file'])}
+    count = max(1, min(workers, len(repos)))
+    queues: List[multiprocessing.Queue] = [multiprocessing.Queue() for _ in range(count)]
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    # Not daemonic: a worker may start its own log scanning process pool
+    processes = [multiprocessing.Process(target=_shard_worker, args=(work, results, options))
+                 for work in queues]
+    for process in processes:
+        process.start()
+    shard = {entry['repo']: index % count for index, entry in enumerate(repos)}
+    print(f"Monitoring {len(repos)} repositories with {len(processes)} worker processes")
+    
+    due = {entry['repo']: 0.0 for entry in repos}
+    by_name = {entry['repo']: entry for entry in repos}
+    in_flight = set()
+    try:
+        while True:
+            now = time.time()
+            for repo, when in due.items():
+                if when <= now and repo not in in_flight:
+                    in_flight.add(repo)
+                    queues[shard[repo]].put(by_name[repo])
+            waiting = [when for repo, when in due.items() if repo not in in_flight]
+            timeout = max(0.1, min(waiting) - now) if waiting else None
+            try:
+                repo, interval = results.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            in_flight.discard(repo)
+            due[repo] = time.time() + interval
+    finally:
+        for work in queues:
+            work.put(None)
+        for process in processes:
+            process.join(timeout=60)
+            if process.is_alive():
+                process.terminate()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Monitor GitHub Actions builds and auto-fix common failures")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="poll workflows and download failed job logs with up to N workers (default: 1, sequential)")
+    parser.add_argument('--active-interval', type=float, default=10.0,
+                        help="seconds between polls while a run is queued or in progress (default: 10)")
+    parser.add_argument('--idle-interval', type=float, default=30.0,
+                        help="first poll interval once everything is idle (default: 30)")
+    parser.add_argument('--max-interval', type=float, default=300.0,
+                        help="upper bound for the idle backoff (default: 300)")
+    parser.add_argument('--repo-wide', action='store_true',
+                        help="fetch all runs with one /actions/runs query per cycle instead of one request per workflow")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="write Prometheus text metrics to PATH after every cycle")
+    parser.add_argument('--metrics-port', type=int,
+                        help="serve Prometheus text metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--profile-first-cycle', action='store_true',
+                        help="run the first cycle under cProfile (send SIGUSR1 to profile the next one later)")
+    parser.add_argument('--webhook-port', type=int,
+                        help="receive workflow_run/workflow_job webhooks on this port and only poll to reconcile")
+    parser.add_argument('--webhook-host', default='127.0.0.1',
+                        help="address the webhook receiver binds to (default: 127.0.0.1)")
+    parser.add_argument('--reconcile-interval', type=float, default=600.0,
+                        help="seconds between reconciliation polls in webhook mode (default: 600)")
+    parser.add_argument('--archive', action='store_true',
+                        help="keep every downloaded job log compressed and indexed under the state directory")
+    parser.add_argument('--archive-max-mb', type=int, default=1024,
+                        help="size cap for the compressed log archive, oldest logs are dropped first (default: 1024)")
+    parser.add_argument('--search', metavar='PHRASE',
+                        help="list archived runs whose logs contain PHRASE, then exit")
+    parser.add_argument('--since-days', type=float,
+                        help="with --search, only consider runs created in the last N days")
+    parser.add_argument('--report-unknown', action='store_true',
+                        help="list clusters of failures that no known error pattern matches, then exit")
+    parser.add_argument('--full-scan', action='store_true',
+                        help="match whole job logs instead of only the failing step and ##[error] context")
+    parser.add_argument('--tail-mb', type=float, default=0,
+                        help="fetch job logs tail-first, starting with the last N MB and widening only without a match")
+    parser.add_argument('--scan-processes', type=int, default=os.cpu_count() or 1,
+                        help="processes for matching large logs (default: one per CPU, 1 disables)")
+    parser.add_argument('--parallel-scan-mb', type=float, default=32,
+                        help="logs at least this large are matched on the process pool (default: 32)")
+    parser.add_argument('--repos', metavar='FILE',
+                        help="monitor every repository listed in a JSON file with worker processes")
+    parser.add_argument('--workers', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help="worker processes for --repos (default: up to 4)")
+    parser.add_argument('--backfill-since', metavar='DATE',
+                        help="analyze the failed runs created since DATE (YYYY-MM-DD or ISO time) and exit")
+    parser.add_argument('--backfill-until', metavar='DATE',
+                        help="end of the backfill range (default: now)")
+    parser.add_argument('--backfill-window-hours', type=float, default=24,
+                        help="length of the date windows the backfill walks (default: 24)")
+    parser.add_argument('--budget', type=int, default=1000,
+                        help="API requests a backfill may use (default: 1000)")
+    parser.add_argument('--restart-backfill', action='store_true',
+                        help="ignore the checkpoint of an interrupted backfill of the same range")
+    parser.add_argument('--max-cycles', type=int, metavar='N',
+                        help="stop after N polling cycles and print API usage and detection latency")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the diff fixes would make instead of writing, committing and pushing; "
+                             "nothing is recorded in the state database")
+    return parser.parse_args(argv)
+
+
+def search_archive(archive: LogArchive, phrase: str, since_days: Optional[float] = None):
+    """Print the archived runs whose logs contain a phrase"""
+    since = None
+    if since_days is not None:
+        since = datetime.fromtimestamp(time.time() - since_days * 86400, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    started = time.perf_counter()
+    results = archive.search(phrase, since)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{len(results)} archived job log(s) contain '{phrase}' ({elapsed:.1f} ms)")
+    for row in results:
+        print(f"  {row['created_at']}  run {row['run_id']}  {row['workflow']}  job {row['job_name']}")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """UTC datetime from YYYY-MM-DD or an ISO 8601 timestamp"""
+    value = value.strip().replace('Z', '+00:00')
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def report_unknown_failures(state: StateStore):
+    """Print the clusters of failures that no ERROR_PATTERNS signature explains"""
+    clusters = state.unknown_clusters()
+    print(f"{len(clusters)} unknown failure cluster(s)")
+    for signature, example, occurrences, first_seen, last_seen in clusters:
+        print(f"  {signature[:12]}  {occurrences:>4}x  {first_seen} .. {last_seen}")
+        print(f"      {example[:200]}")
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    
+    archive = None
+    if args.archive or args.search:
+        archive = LogArchive(os.path.join(STATE_DIR, 'archive'), args.archive_max_mb * 1024 * 1024)
+    if args.search:
+        search_archive(archive, args.search, args.since_days)
+        sys.exit(0)
+    if args.report_unknown:
+        report_unknown_failures(StateStore(os.path.join(STATE_DIR, 'monitor.db')))
+        sys.exit(0)
+    
+    if args.repos:
+        monitor_repositories(load_repositories(args.repos), args.workers, {
+            'concurrency': args.concurrency,
+            'active_interval': args.active_interval,
+            'idle_interval': args.idle_interval,
+            'max_interval': args.max_interval,
+            'repo_wide': args.repo_wide,
+            'full_scan': args.full_scan,
+            'tail_bytes': int(args.tail_mb * 1024 * 1024),
+            'dry_run': args.dry_run,
+            'archive': args.archive,
+            'archive_max_mb': args.archive_max_mb,
+            'metrics_file': args.metrics_file,
+            'scan_processes': args.scan_processes,
+            'parallel_scan_bytes': int(args.parallel_scan_mb * 1024 * 1024),
+        })
+        sys.exit(0)
+    
     # Check for GitHub token
     if not os.environ.get('GITHUB_TOKEN'):
         print("⚠️  Warning: GITHUB_TOKEN not set. Some features may not work.")
         print("Set it with: export GITHUB_TOKEN=your_token")
     
-    monitor = BuildMonitor()
+    scheduler = PollScheduler(args.active_interval, args.idle_interval, args.max_interval)
+    monitor = BuildMonitor(max_workers=args.concurrency, scheduler=scheduler, dry_run=args.dry_run,
+                           archive=archive)
+    monitor.metrics_file = args.metrics_file
+    monitor.focus_failed_steps = not args.full_scan
+    monitor.tail_bytes = int(args.tail_mb * 1024 * 1024)
+    if args.scan_processes > 1:
+        monitor.parallel_scanner = ParallelLogScanner(args.scan_processes,
+                                                      int(args.parallel_scan_mb * 1024 * 1024))
+    monitor.profile_next_cycle = args.profile_first_cycle
+    if args.metrics_port:
+        monitor.metrics.serve(args.metrics_port)
+        print(f"Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: setattr(monitor, 'profile_next_cycle', True))
+    
+    if args.backfill_since:
+        until = parse_timestamp(args.backfill_until) if args.backfill_until else datetime.now(timezone.utc)
+        summary = monitor.backfill(parse_timestamp(args.backfill_since), until, args.budget,
+                                   timedelta(hours=args.backfill_window_hours), args.restart_backfill)
+        print(f"\n📚 Backfill {'complete' if summary['complete'] else 'stopped at ' + summary['cursor']}: "
+              f"{summary['runs_analyzed']} failed run(s) analyzed, {summary['runs_skipped']} skipped, "
+              f"{summary['windows']} window(s), {summary['requests']} of {args.budget} request(s)")
+        sys.exit(0)
     
     # First, apply some preventive fixes
     print("Applying preventive fixes...")
@@ -558,7 +3457,14 @@ if __name__ == "__main__":
     monitor._remove_firebase_imports()
     
     # Commit initial fixes
-    monitor._commit_and_push_fix("initial_preventive_fixes")
+    monitor.transaction.fix_types.append("initial_preventive_fixes")
+    monitor.commit_fixes()
     
     # Start monitoring
-    monitor.monitor_and_fix()
\ No newline at end of file
+    if args.webhook_port:
+        receiver = WebhookReceiver(os.environ.get('GITHUB_WEBHOOK_SECRET', ''),
+                                   args.webhook_host, args.webhook_port)
+        monitor.monitor_webhooks(receiver, args.reconcile_interval, repo_wide=args.repo_wide)
+    else:
+        monitor.monitor_and_fix(repo_wide=args.repo_wide, max_cycles=args.max_cycles)
+        monitor.print_run_report()
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Replay recorded GitHub webhook deliveries against the monitor's receiver
+Each file in webhook_fixtures/ holds one delivery (event, payload or raw body,
+optional signature and Content-Length overrides) and the expected HTTP status
+and number of queued failures. Without --url a receiver is started in-process
+with a throwaway secret and every expectation is checked.
+"""
+import os
+import sys
+import glob
+import hmac
+import json
+import hashlib
+import argparse
+import http.client
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from monitor_and_fix_builds import WebhookReceiver
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webhook_fixtures')
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, Dict]:
+    """Fixtures by name, sorted"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as f:
+            fixtures[os.path.basename(path)[:-len('.json')]] = json.load(f)
+    return fixtures
+
+
+def post(url: str, secret: str, fixture: Dict) -> int:
+    """Send one delivery the way GitHub does and return the response status"""
+    body = fixture['body'].encode() if 'body' in fixture else json.dumps(fixture['payload']).encode()
+    signature = fixture.get('signature') or 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    try:
+        # putrequest instead of request() so Content-Length can be left out or mangled
+        connection.putrequest('POST', parts.path or '/')
+        connection.putheader('Content-Type', 'application/json')
+        connection.putheader('User-Agent', 'GitHub-Hookshot/replay')
+        connection.putheader('X-GitHub-Event', fixture['event'])
+        connection.putheader('X-Hub-Signature-256', signature)
+        length = fixture.get('content_length', str(len(body)))
+        if length is not None:
+            connection.putheader('Content-Length', length)
+        connection.endheaders(body)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay recorded webhook deliveries against the receiver")
+    parser.add_argument('--url', help="running receiver to post to, e.g. http://127.0.0.1:8787/ "
+                                      "(signed with GITHUB_WEBHOOK_SECRET; statuses are only printed)")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="directory of delivery fixtures")
+    parser.add_argument('--only', action='append', default=[], help="replay only fixtures with this name prefix")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    fixtures = {name: fixture for name, fixture in load_fixtures(args.fixtures).items()
+                if not args.only or name.startswith(tuple(args.only))}
+    if not fixtures:
+        print(f"❌ No fixtures found in {args.fixtures}")
+        return 1
+
+    if args.url:
+        secret = os.environ.get('GITHUB_WEBHOOK_SECRET', '')
+        for name, fixture in fixtures.items():
+            print(f"{name}: HTTP {post(args.url, secret, fixture)}")
+        return 0
+
+    secret = 'replay-secret'
+    receiver = WebhookReceiver(secret, port=0)
+    receiver.start()
+    failures = 0
+    try:
+        for name, fixture in fixtures.items():
+            status = post(f"http://127.0.0.1:{receiver.port}/", secret, fixture)
+            queued = 0
+            while not receiver.events.empty():
+                receiver.events.get_nowait()
+                queued += 1
+            ok = status == fixture['status'] and queued == fixture['queued']
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name}: HTTP {status}, {queued} queued"
+                  + ('' if ok else f" (expected HTTP {fixture['status']}, {fixture['queued']} queued)"))
+    finally:
+        receiver.stop()
+    print(f"\n{len(fixtures) - failures} of {len(fixtures)} deliveries as expected")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
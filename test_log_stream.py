@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the streaming log matcher
+Feeding a job log to LogStream in chunks of any size must find the same
+signatures, at the same positions, as running re.search over the whole log
+once per ERROR_PATTERNS entry (what analyze_logs used to do).
+Run with: python -m unittest test_log_stream
+"""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from benchmark_analyzer import write_corpus
+from monitor_and_fix_builds import ERROR_PATTERNS, LogMatcher
+
+
+def whole_log_hits(text: str):
+    """First match of every signature as (offset, line number, line), found with re.search"""
+    hits = {}
+    for pattern in ERROR_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            start = text.rfind('\n', 0, match.start()) + 1
+            stop = text.find('\n', match.start())
+            hits[pattern] = (match.start(), text.count('\n', 0, match.start()) + 1,
+                             text[start:stop if stop >= 0 else len(text)])
+    return hits
+
+
+def streamed_hits(data: bytes, chunk_size: int):
+    matcher = LogMatcher()
+    stream = matcher.stream('build')
+    for start in range(0, len(data), chunk_size):
+        stream.feed(data[start:start + chunk_size])
+    stream.close()
+    return {pattern: (hit.offset, hit.line_no, hit.line) for pattern, hit in matcher.hits.items()}
+
+
+class LogStreamEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='log-stream-test-')
+        cls.logs = {}
+        for placement in ('head', 'tail', 'scattered', 'none'):
+            path = os.path.join(cls.directory, f'{placement}.log')
+            write_corpus(path, 256 * 1024, 48, placement, seed=7)
+            with open(path, 'rb') as f:
+                cls.logs[placement] = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_chunk_sizes_match_whole_log_search(self):
+        for placement, data in self.logs.items():
+            expected = whole_log_hits(data.decode('utf-8'))
+            if placement != 'none':
+                self.assertEqual(set(expected), set(ERROR_PATTERNS))
+            # 7 bytes splits lines, timestamps and multi-byte characters; the last size is the whole log
+            for chunk_size in (7, 1000, 4096, 65536, len(data) or 1):
+                with self.subTest(placement=placement, chunk_size=chunk_size):
+                    self.assertEqual(streamed_hits(data, chunk_size), expected)
+
+    def test_single_byte_chunks(self):
+        data = self.logs['scattered'][:24 * 1024]
+        self.assertEqual(streamed_hits(data, 1), whole_log_hits(data.decode('utf-8')))
+
+    def test_signature_split_across_streams_is_not_joined(self):
+        # Every stream keeps its own partial line; two jobs must not match across each other
+        line = "error: No such module 'Firebase'\n".encode()
+        matcher = LogMatcher()
+        first, second = matcher.stream('first'), matcher.stream('second')
+        first.feed(line[:12])
+        second.feed(line[12:])
+        first.close()
+        second.close()
+        self.assertEqual(matcher.hits, {})
+
+    def test_log_without_trailing_newline(self):
+        data = "2024-05-01T10:00:00.0000000Z error: No account for team \"ABCDE12345\"".encode()
+        self.assertEqual(streamed_hits(data, 5), whole_log_hits(data.decode('utf-8')))
+
+
+if __name__ == '__main__':
+    unittest.main()
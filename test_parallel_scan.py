@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the process-pool log scanner
+ParallelLogScanner splits a log into line-aligned segments that worker
+processes scan from a memory map; merged, the result must be exactly that
+of one single-threaded LogMatcher pass over the whole log, whatever the
+segment size.
+Run with: python -m unittest test_parallel_scan
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmark_analyzer import write_corpus
+from monitor_and_fix_builds import LogMatcher, ParallelLogScanner
+
+
+def snapshot(matcher: LogMatcher):
+    """Everything a scan leaves in a matcher"""
+    hits = {pattern: (hit.offset, hit.line_no, hit.line, hit.window) for pattern, hit in matcher.hits.items()}
+    return hits, dict(matcher.counts), list(matcher.error_lines), dict(matcher.fingerprints)
+
+
+def single_pass(text: str):
+    matcher = LogMatcher()
+    matcher.scan(text)
+    return snapshot(matcher)
+
+
+class ParallelScanEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='parallel-scan-test-')
+        cls.paths = {}
+        for seed, placement in enumerate(('head', 'tail', 'scattered', 'none')):
+            path = os.path.join(cls.directory, f'{placement}.log')
+            write_corpus(path, 384 * 1024, 40, placement, seed=seed)
+            cls.paths[placement] = path
+        cls.scanner = ParallelLogScanner(2, threshold=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.scanner.close()
+        shutil.rmtree(cls.directory)
+
+    def scan_file(self, path: str, segment_size: int):
+        self.scanner.segment_size = segment_size
+        matcher = LogMatcher()
+        scanned = self.scanner.scan_file(path, matcher, 'build')
+        self.assertTrue(all(hit.source == 'build' for hit in matcher.hits.values()))
+        return scanned, snapshot(matcher)
+
+    def test_segment_sizes_match_single_pass(self):
+        for placement, path in self.paths.items():
+            with open(path, 'rb') as f:
+                data = f.read()
+            text = data.decode('utf-8')
+            expected = single_pass(text)
+            # Small segments put hits (and their context windows) right at segment boundaries
+            for segment_size in (1000, 4096, 65536, 8 * 1024 * 1024):
+                with self.subTest(placement=placement, segment_size=segment_size):
+                    scanned, result = self.scan_file(path, segment_size)
+                    self.assertEqual(result, expected)
+                    self.assertEqual(scanned, (len(data), text.count('\n')))
+
+    def test_segments_end_on_line_breaks(self):
+        path = self.paths['scattered']
+        self.scanner.segment_size = 1000
+        ranges = self.scanner.segments(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_scan_text_and_last_line_without_break(self):
+        with open(self.paths['tail'], encoding='utf-8') as f:
+            text = f.read().rstrip('\n')
+        self.scanner.segment_size = 4096
+        matcher = LogMatcher()
+        _, lines = self.scanner.scan_text(text, matcher)
+        self.assertEqual(snapshot(matcher), single_pass(text))
+        self.assertEqual(lines, text.count('\n') + 1)
+
+    def test_empty_log(self):
+        path = os.path.join(self.directory, 'empty.log')
+        open(path, 'wb').close()
+        self.assertEqual(self.scan_file(path, 4096), ((0, 0), single_pass('')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the single-pass signature engine
+The trie automaton with literal anchors must report the same first hit for
+every signature as compiling each pattern on its own and running
+re.search(pattern, log, re.IGNORECASE), including for overlapping,
+prefix-sharing and unanchored patterns.
+Run with: python -m unittest test_signature_engine
+"""
+import os
+import re
+import random
+import shutil
+import tempfile
+import unittest
+
+from benchmark_analyzer import write_corpus
+from monitor_and_fix_builds import ERROR_PATTERNS, SignatureEngine
+
+# Anchors that share prefixes, contain each other, start with an ERROR_MARKERS
+# entry, or cannot be anchored at all
+OVERLAPPING_PATTERNS = {
+    "No such module": {"description": "Missing module", "fix": "none"},
+    "No such module 'Firebase'": {"description": "Missing Firebase", "fix": "none"},
+    "such module 'FirebaseCore'": {"description": "Missing FirebaseCore", "fix": "none"},
+    "error: .* not found": {"description": "Not found", "fix": "none"},
+    "error: no such file": {"description": "Missing file", "fix": "none"},
+    "warning: .*deprecated": {"description": "Deprecation", "fix": "none"},
+    "Linker command failed with exit code \\d+": {"description": "Link failure", "fix": "none"},
+    "Build input file cannot be found": {"description": "Missing input", "fix": "none"},
+}
+
+FRAGMENTS = [
+    "No such module", "No such module 'Firebase'", "No such module 'FirebaseCore'", "such module",
+    "error:", "error: ", "error: symbol not found", "not found", "error: no such file", "no such",
+    "warning: 'foo' is deprecated", "deprecated", "warning:", "Linker command failed with exit code 1",
+    "Linker command failed with exit code", "Build input file cannot be found", "Build input file",
+    "CompileSwift normal arm64", "/Users/runner/work/app/Sources/View.swift:12:3:", "İstanbul", "“quoted”",
+]
+
+
+def reference_hits(text: str, patterns):
+    hits = {}
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            hits[pattern] = (match.start(), text.count('\n', 0, match.start()) + 1)
+    return hits
+
+
+def engine_hits(engine: SignatureEngine, text: str):
+    hits, _ = engine.scan(text)
+    return {pattern: (hit.offset, hit.line_no) for pattern, hit in hits.items()}
+
+
+def random_log(seed: int, lines: int = 3000) -> str:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(lines):
+        words = [rng.choice(FRAGMENTS) for _ in range(rng.randrange(1, 4))]
+        line = ' '.join(words)
+        if rng.random() < 0.3:
+            line = line.upper() if rng.random() < 0.5 else line.swapcase()
+        out.append(line)
+    return '\n'.join(out) + '\n'
+
+
+class SignatureEngineEquivalenceTest(unittest.TestCase):
+
+    def test_error_patterns_on_synthetic_logs(self):
+        engine = SignatureEngine(ERROR_PATTERNS)
+        directory = tempfile.mkdtemp(prefix='signature-engine-test-')
+        try:
+            for seed, placement in enumerate(('head', 'tail', 'scattered', 'none')):
+                path = os.path.join(directory, f'{placement}.log')
+                write_corpus(path, 512 * 1024, 32, placement, seed=seed)
+                with open(path, encoding='utf-8') as f:
+                    text = f.read()
+                with self.subTest(placement=placement):
+                    self.assertEqual(engine_hits(engine, text), reference_hits(text, ERROR_PATTERNS))
+                    _, counts = engine.scan(text)
+                    expected = {pattern: len(re.findall(pattern, text, re.IGNORECASE)) for pattern in ERROR_PATTERNS}
+                    self.assertEqual(counts, {pattern: n for pattern, n in expected.items() if n})
+        finally:
+            shutil.rmtree(directory)
+
+    def test_overlapping_and_unanchored_patterns(self):
+        engine = SignatureEngine(OVERLAPPING_PATTERNS)
+        self.assertIn("Linker command failed with exit code \\d+", engine.unanchored)
+        for seed in range(20):
+            text = random_log(seed)
+            with self.subTest(seed=seed):
+                self.assertEqual(engine_hits(engine, text), reference_hits(text, OVERLAPPING_PATTERNS))
+
+    def test_fragments_on_their_own_line(self):
+        engine = SignatureEngine(OVERLAPPING_PATTERNS)
+        for fragment in FRAGMENTS:
+            text = f"noise\n{fragment}\nnoise\n"
+            with self.subTest(fragment=fragment):
+                self.assertEqual(engine_hits(engine, text), reference_hits(text, OVERLAPPING_PATTERNS))
+
+    def test_skip(self):
+        engine = SignatureEngine(ERROR_PATTERNS)
+        text = "error: No such module 'Firebase'\nerror: No account for team \"X\"\n"
+        hits, _ = engine.scan(text, skip={"No such module 'Firebase'"})
+        self.assertEqual(set(hits), {"No account for team"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for failed-step log selection
+With a StepSelector the matcher must find exactly what re.search finds in
+the lines of the failing step (plus the context of ##[error] markers), for
+any chunking of the log. When the failing step holds no signature,
+BuildMonitor must fall back to the whole log and find what a whole-log
+re.search finds.
+Run with: python -m unittest test_step_selector
+"""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from typing import Dict, Optional
+
+from benchmark_analyzer import write_corpus
+from monitor_and_fix_builds import ERROR_PATTERNS, BuildMonitor, LogMatcher, StateStore, StepSelector
+
+STEP_START = '2024-05-01T10:00:03Z'
+STEP_END = '2024-05-01T10:00:06Z'
+
+
+def step_hits(text: str, start: str = STEP_START[:19], end: str = STEP_END[:19]):
+    """First hit of every signature among the lines timestamped within [start, end] (whole seconds)"""
+    hits = {}
+    offset = 0
+    for line_no, line in enumerate(text.split('\n'), 1):
+        if start <= line[:19] <= end:
+            for pattern in ERROR_PATTERNS:
+                match = re.search(pattern, line, re.IGNORECASE)
+                if match and pattern not in hits:
+                    hits[pattern] = (offset + match.start(), line_no)
+        offset += len(line) + 1
+    return hits
+
+
+def selected_hits(data: bytes, chunk_size: int, selector: StepSelector):
+    matcher = LogMatcher()
+    stream = matcher.stream('build', selector)
+    for start in range(0, len(data), chunk_size):
+        stream.feed(data[start:start + chunk_size])
+    stream.close()
+    return {pattern: (hit.offset, hit.line_no) for pattern, hit in matcher.hits.items()}
+
+
+def failed_job(job_id: int, started_at: str = STEP_START, completed_at: str = STEP_END) -> Dict:
+    return {'id': job_id, 'name': 'build', 'conclusion': 'failure', 'logs_url': f'logs/{job_id}',
+            'steps': [{'name': 'Checkout', 'conclusion': 'success',
+                       'started_at': '2024-05-01T10:00:00Z', 'completed_at': '2024-05-01T10:00:01Z'},
+                      {'name': 'Build', 'conclusion': 'failure',
+                       'started_at': started_at, 'completed_at': completed_at}]}
+
+
+class LogServer:
+    """Just enough of GitHubClient to serve job listings and logs, with Range support"""
+
+    def __init__(self, jobs, logs: Dict[str, bytes]):
+        self.jobs = jobs
+        self.logs = logs
+        self.bytes_sent = 0
+        self.requests_made = 0
+        self.bytes_received = 0
+
+    def repo_url(self, suffix: str, params: Optional[Dict] = None) -> str:
+        return suffix
+
+    def get_json(self, url: str, headers=None, use_cache: bool = False):
+        return {'jobs': self.jobs}
+
+    def stream(self, url: str, chunk_size: int = 4096, headers=None, info=None):
+        data = self.logs[url]
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', (headers or {}).get('Range', ''))
+        if match:
+            start = int(match.group(1))
+        if info is not None:
+            info['status'] = 206 if match else 200
+            info['headers'] = {'Content-Length': str(len(data) - start)}
+        for position in range(start, len(data), chunk_size):
+            chunk = data[position:position + chunk_size]
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+
+class StepSelectorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='step-selector-test-')
+        cls.logs = {}
+        # About ten seconds of timestamps; each signature once when scattered, all of them in the head
+        for placement, density in (('head', 64), ('scattered', 16)):
+            path = os.path.join(cls.directory, f'{placement}.log')
+            write_corpus(path, 512 * 1024, density, placement, seed=3)
+            with open(path, 'rb') as f:
+                cls.logs[placement] = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_selection_matches_search_over_the_step(self):
+        data = self.logs['scattered']
+        expected = step_hits(data.decode('utf-8'))
+        # Some signatures are in the step, others only outside of it
+        self.assertTrue(0 < len(expected) < len(ERROR_PATTERNS))
+        for chunk_size in (7, 1000, 4096, 65536, len(data)):
+            with self.subTest(chunk_size=chunk_size):
+                selector = StepSelector(STEP_START, STEP_END)
+                self.assertEqual(selected_hits(data, chunk_size, selector), expected)
+                self.assertTrue(selector.finished)
+
+    def test_step_times_with_utc_offset(self):
+        data = self.logs['scattered']
+        selector = StepSelector('2024-05-01T03:00:03-07:00', '2024-05-01T03:00:06-07:00')
+        self.assertEqual(selected_hits(data, 4096, selector), step_hits(data.decode('utf-8')))
+
+    def test_error_marker_context_outside_the_step(self):
+        lines = [f'2024-05-01T10:00:01.{n:07d}Z compiling file {n}' for n in range(20)]
+        lines[2] = '2024-05-01T10:00:01.0000002Z error: No account for team "ABCDE12345"'
+        lines[15] = "2024-05-01T10:00:01.0000015Z error: No such module 'Firebase'"
+        lines[17] = '2024-05-01T10:00:01.0000017Z ##[error]Process completed with exit code 65.'
+        lines.append('2024-05-01T10:00:04.0000000Z ** BUILD FAILED **')
+        data = ('\n'.join(lines) + '\n').encode()
+        for chunk_size in (5, 64, len(data)):
+            with self.subTest(chunk_size=chunk_size):
+                hits = selected_hits(data, chunk_size, StepSelector(STEP_START, STEP_END))
+                # Within the marker's context: found; ten lines before it: not selected
+                self.assertEqual(set(hits), {"No such module 'Firebase'"})
+                self.assertEqual(hits["No such module 'Firebase'"][1], 16)
+
+    def test_fallback_to_whole_log(self):
+        # All hits are in the first 5% of the log, long before the failing step
+        data = self.logs['head']
+        text = data.decode('utf-8')
+        self.assertEqual(step_hits(text), {})
+        expected = {pattern for pattern in ERROR_PATTERNS if re.search(pattern, text, re.IGNORECASE)}
+        self.assertEqual(expected, set(ERROR_PATTERNS))
+        for focus in (True, False):
+            with self.subTest(focus_failed_steps=focus):
+                server = LogServer([failed_job(1)], {'logs/1': data})
+                monitor = BuildMonitor(server, state=StateStore())
+                monitor.focus_failed_steps = focus
+                found = {pattern for pattern, _ in monitor.scan_job_logs(1)}
+                self.assertEqual(found, expected)
+                # The fallback reuses what the step pass read instead of downloading it again
+                self.assertLessEqual(server.bytes_sent, len(data))
+
+    def test_failed_step_stops_reading(self):
+        data = self.logs['scattered']
+        server = LogServer([failed_job(1)], {'logs/1': data})
+        monitor = BuildMonitor(server, state=StateStore())
+        found = {pattern for pattern, _ in monitor.scan_job_logs(1)}
+        self.assertEqual(found, set(step_hits(data.decode('utf-8'))))
+        self.assertLess(server.bytes_sent, len(data))
+
+    def test_job_without_step_data(self):
+        self.assertIsNone(StepSelector.for_job({'id': 1, 'steps': []}))
+        self.assertIsNone(StepSelector.for_job({'id': 1, 'steps': [{'conclusion': 'failure'}]}))
+        selector = StepSelector.for_job(failed_job(1))
+        self.assertEqual((selector.start, selector.end), (STEP_START[:19], STEP_END[:19]))
+
+
+if __name__ == '__main__':
+    unittest.main()